@@ -1,10 +1,74 @@
 """colibri source code for image analysis.
+
+The functions of colibri are imported from their modules when they are first
+used, so that importing colibri does not import the heavy dependencies
+(SimpleITK, lmfit, matplotlib, ...) until they are needed.
 """
 
-from .image import *  # noqa
-from .core import *  # noqa
+import importlib
+from typing import Any
 
-from . import tasks
-from . import model
+# The module of every public function and class
+_exports = {
+    'DynamicSeries': 'series',
+    'Table': 'table',
+    'read_series_info': 'image',
+    'load_dynamic_series': 'image',
+    'load_dynamic_array': 'image',
+    'convert_dynamic_series': 'image',
+    'is_series_cache': 'image',
+    'load_series_cache': 'image',
+    'resample_series_to_reference': 'image',
+    'series_roi_means': 'image',
+    'lazy_series_multi_roi_means': 'image',
+    'lazy_series_roi_means': 'image',
+    'read_dicom_header': 'core',
+    'dicom_datetime': 'core',
+    'get_acq_datetime': 'core',
+    'shift_time': 'core',
+    'save_table': 'core',
+    'load_table': 'core',
+    'get_cache_dir': 'cache',
+    'get_series_index': 'cache',
+    'run_cached_task': 'cache',
+    'clear_task_cache': 'cache',
+    'get_task_functions': 'batch',
+    'run_xml': 'batch',
+    'read_manifest': 'batch',
+    'fill_template': 'batch',
+    'run_batch': 'batch',
+    'print_batch_summary': 'batch',
+    'save_batch_summary': 'batch',
+    'parametric_maps': 'parametric',
+    'fit_kws': 'fitting',
+    'fit_result_table': 'fitting',
+    'fit_tacs': 'fitting',
+    'default_workers': 'fitting',
+    'process_pool': 'fitting',
+    'multi_start_fit': 'fitting',
+    'bootstrap_fit': 'fitting',
+    'bootstrap_intervals': 'fitting',
+    'save_figure': 'plotting',
+    'collect_figures': 'plotting',
+    'wait_for_figures': 'plotting'
+}
 
 __all__ = ["tasks", "model"]
+
+
+def __getattr__(name: str) -> Any:
+    # Import the subpackages and the public functions on first use
+    if name in ("tasks", "model"):
+        return importlib.import_module('.' + name, __name__)
+    if name not in _exports:
+        raise AttributeError(
+            f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module('.' + _exports[name], __name__),
+                    name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(list(globals().keys()) + list(_exports.keys()) +
+                  __all__)
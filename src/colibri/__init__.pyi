@@ -1,36 +1,235 @@
 import SimpleITK as sitk
+import concurrent.futures
+import contextlib
+import lmfit
+import matplotlib.axes
+import numpy as np
+from collections.abc import Iterator, Mapping, MutableMapping
 from datetime import datetime
-from typing import Any, Optional, Union
+from typing import Any, Callable, Optional, OrderedDict, Union, overload
 
 from colibri import tasks, model
 
 # From core.py
 
+def read_dicom_header(dicom_path: str) -> sitk.ImageFileReader: ...
+
+def dicom_datetime(img_date: str, img_time: str) -> datetime: ...
+
 def get_acq_datetime(dicom_path: str) -> datetime: ...
 
 def shift_time(y: list[float], t: list[float],
-               deltat: float) -> list[float]: ...
+               deltat: float) -> np.ndarray: ...
+
+def save_table(table: Mapping[Any, Any], path: str,
+               table_format: Optional[str] = ...): ...
+
+def load_table(path: str, table_format: Optional[str] = ...,
+               mmap: bool = ...) -> Table: ...
+
+# From cache.py
+
+def get_cache_dir() -> str: ...
+
+def get_series_index(dicom_path: str,
+                     use_cache: bool = ...) -> dict[str, Any]: ...
+
+def run_cached_task(func: Callable[..., Any],
+                    task: OrderedDict[str, Any],
+                    named_obj: dict[str, Any]): ...
+
+def clear_task_cache(): ...
+
+# From parametric.py
+
+def parametric_maps(series: DynamicSeries,
+                    mask: sitk.Image,
+                    time_data: list[float],
+                    input_data: list[float],
+                    model: Callable[..., list[float]],
+                    params: dict[str, dict[str, float]],
+                    tcut: Optional[int] = ...,
+                    mask_label: Optional[int] = ...,
+                    workers: Optional[int] = ...,
+                    chunk_size: int = ...) -> dict[str, sitk.Image]: ...
+
+# From fitting.py
+
+def default_workers() -> int: ...
+
+def process_pool(workers: int,
+                 initializer: Callable[..., None],
+                 initargs: tuple[Any, ...]) \
+        -> concurrent.futures.ProcessPoolExecutor: ...
+
+def fit_kws(model: Callable[..., list[float]],
+            fit_model: lmfit.Model) -> dict[str, Any]: ...
+
+def fit_result_table(labels: list[str],
+                     fits: list[Optional[lmfit.model.ModelResult]],
+                     names: list[str]) -> Table: ...
+
+def fit_tacs(time_data: Union[list[float], np.ndarray],
+             tacs: Mapping[str, Any],
+             input_data: Union[list[float], np.ndarray],
+             model: Callable[..., list[float]],
+             params: dict[str, dict[str, float]],
+             tcut: Optional[int] = ...,
+             model_kws: Optional[dict[str, Any]] = ...,
+             workers: Optional[int] = ...,
+             label_params: Optional[
+                 Mapping[str, dict[str, dict[str, float]]]] = ...) \
+        -> Table: ...
+
+def multi_start_fit(time_data: Union[list[float], np.ndarray],
+                    tissue_data: Union[list[float], np.ndarray],
+                    input_data: Union[list[float], np.ndarray],
+                    model: Callable[..., list[float]],
+                    params: dict[str, dict[str, float]],
+                    starts: int,
+                    sampling: str = ...,
+                    target_chisqr: Optional[float] = ...,
+                    tcut: Optional[int] = ...,
+                    model_kws: Optional[dict[str, Any]] = ...,
+                    workers: Optional[int] = ...,
+                    seed: Optional[int] = ...,
+                    rtol: float = ...,
+                    max_starts: int = ...) -> Table: ...
+
+def bootstrap_fit(time_data: Union[list[float], np.ndarray],
+                  tissue_data: Union[list[float], np.ndarray],
+                  input_data: Union[list[float], np.ndarray],
+                  model: Callable[..., list[float]],
+                  params: dict[str, dict[str, float]],
+                  samples: int,
+                  method: str = ...,
+                  tcut: Optional[int] = ...,
+                  model_kws: Optional[dict[str, Any]] = ...,
+                  workers: Optional[int] = ...,
+                  seed: Optional[int] = ...,
+                  chunk_size: int = ...) -> Table: ...
+
+def bootstrap_intervals(samples: Mapping[str, Any],
+                        level: float = ...) \
+        -> dict[str, tuple[float, float]]: ...
 
-def save_table(table: dict[Union[str, int], list[float]], path: str): ...
+# From plotting.py
 
-def load_table(path: str) -> dict[str, list[float]]: ...
+def save_figure(draw: Callable[[matplotlib.axes.Axes], None],
+                path: str) -> concurrent.futures.Future[Any]: ...
+
+def collect_figures() \
+        -> contextlib.AbstractContextManager[
+            list[concurrent.futures.Future[Any]]]: ...
+
+def wait_for_figures(
+        futures: Optional[list[concurrent.futures.Future[Any]]] = ...): ...
+
+# From batch.py
+
+def get_task_functions() -> dict[str, Callable[..., Any]]: ...
+
+def run_xml(xml_text: str,
+            serial: bool = ...,
+            workers: Optional[int] = ...,
+            cache: Optional[bool] = ...) -> dict[str, Any]: ...
+
+def read_manifest(manifest_path: str) -> list[dict[str, str]]: ...
+
+def fill_template(template: str, study: dict[str, str]) -> str: ...
+
+def run_batch(manifest_path: str,
+              template_path: str,
+              workers: Optional[int] = ...,
+              log_dir: Optional[str] = ...) -> list[dict[str, Any]]: ...
+
+def print_batch_summary(results: list[dict[str, Any]],
+                        wall_time: float): ...
+
+def save_batch_summary(results: list[dict[str, Any]], file_path: str): ...
+
+# From series.py
+
+class DynamicSeries:
+    data: np.ndarray
+    origin: tuple[float, ...]
+    spacing: tuple[float, ...]
+    direction: tuple[float, ...]
+    acq: np.ndarray
+    frame_dur: np.ndarray
+    def __init__(self, data: np.ndarray,
+                 origin: tuple[float, ...],
+                 spacing: tuple[float, ...],
+                 direction: tuple[float, ...],
+                 acq: np.ndarray,
+                 frame_dur: Optional[np.ndarray] = ...) -> None: ...
+    def __len__(self) -> int: ...
+    def size(self) -> tuple[int, ...]: ...
+    def frame(self, i: int) -> sitk.Image: ...
+    def images(self) -> list[sitk.Image]: ...
+
+# From table.py
+
+class Table(MutableMapping[str, np.ndarray]):
+    def __init__(self,
+                 columns: Optional[Mapping[Any, Any]] = ...) -> None: ...
+    def __getitem__(self, key: Union[str, int]) -> np.ndarray: ...
+    def __setitem__(self, key: Union[str, int], value: Any) -> None: ...
+    def __delitem__(self, key: Union[str, int]) -> None: ...
+    def __iter__(self) -> Iterator[str]: ...
+    def __len__(self) -> int: ...
+    @property
+    def rows(self) -> int: ...
+    def rename(self, old: Union[str, int], new: Union[str, int]): ...
+    def slice_rows(self, start: Optional[int] = ...,
+                   stop: Optional[int] = ...) -> Table: ...
+    def copy(self) -> Table: ...
+    def to_dict(self) -> dict[str, list[Any]]: ...
 
 # From image.py
 
+def read_series_info(dcm_names: list[str]) -> dict[str, Any]: ...
+
 def load_dynamic_series(dicom_path: str) \
         -> dict[str, Any]: ...
 
+def load_dynamic_array(dicom_path: str,
+                       dtype: Any = ...) -> DynamicSeries: ...
+
+def convert_dynamic_series(dicom_path: str,
+                           out_path: str,
+                           dtype: Any = ...): ...
+
+def is_series_cache(path: str) -> bool: ...
+
+def load_series_cache(path: str) -> DynamicSeries: ...
+
+@overload
 def resample_series_to_reference(series: list[sitk.Image],
                                  ref: sitk.Image) -> list[sitk.Image]: ...
 
-def series_roi_means(series: list[sitk.Image],
-                     roi: sitk.Image) -> dict[int, list[float]]: ...
+@overload
+def resample_series_to_reference(series: DynamicSeries,
+                                 ref: sitk.Image) -> DynamicSeries: ...
+
+def series_roi_means(series: Union[list[sitk.Image], DynamicSeries],
+                     roi: sitk.Image,
+                     engine: str = ...) -> dict[int, list[float]]: ...
 
 def lazy_series_roi_means(series_path: str,
                           roi_path: str,
                           resample: Optional[str] = ...,
                           labels: Optional[dict[str, str]] = ...,
                           ignore: Optional[list[str]] = ...,
-                          frame_dur: bool = ...)\
-        -> dict[Union[str, int], list[float]]: ...
+                          frame_dur: bool = ...,
+                          prefetch: int = ...,
+                          engine: str = ...,
+                          stats: Optional[list[str]] = ...)\
+        -> Table: ...
 
+def lazy_series_multi_roi_means(series_path: str,
+                                roi_sets: list[dict[str, Any]],
+                                frame_dur: bool = ...,
+                                prefetch: int = ...,
+                                engine: str = ...)\
+        -> dict[str, Table]: ...
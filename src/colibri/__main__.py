@@ -1,10 +1,37 @@
 import sys
+import argparse
+import time
 import colibri
-import xmltodict
-from typing import Any
 import importlib.metadata
 
 
+def main_batch(argv: list[str]):
+    # Run a task template for every study in a manifest
+    parser = argparse.ArgumentParser(
+        prog="colibri --batch",
+        description="Run a task template for every study in a manifest.")
+    parser.add_argument('manifest',
+                        help="CSV- or XML-file listing the studies")
+    parser.add_argument('template',
+                        help="XML-file with the tasks of a single study")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="number of worker processes "
+                             "(default: number of CPUs)")
+    parser.add_argument('--log-dir', default=None,
+                        help="directory for the output of each study")
+    parser.add_argument('--summary', default=None,
+                        help="CSV-file for the batch summary")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    results = colibri.run_batch(args.manifest, args.template,
+                                workers=args.workers, log_dir=args.log_dir)
+    colibri.print_batch_summary(results, time.perf_counter() - start)
+    if args.summary is not None:
+        colibri.save_batch_summary(results, args.summary)
+    return results
+
+
 def main(argv: list[str]):
 
     # Get version number from pyproject.toml
@@ -13,27 +40,50 @@ def main(argv: list[str]):
     print("Starting COLIBRI", __version__)
     print()
 
-    # Define tasks
-    tasks = {
-        'ROIMeans': colibri.tasks.task_roi_means,
-        'TACFit': colibri.tasks.task_tac_fit,
-        'Correction': colibri.tasks.task_apply_correction,
-        'SaveTable': colibri.tasks.task_save_table,
-        'LoadTable': colibri.tasks.task_load_table
-    }
-
-    # Created named object container
-    named_obj: dict[str, Any] = {}
+    if len(argv) > 0 and argv[0] == '--batch':
+        results = main_batch(argv[1:])
+        print("COLIBRI ended!")
+        if not all(res['success'] for res in results):
+            exit(1)
+        return
 
     # Parse XML input file
-    if len(argv) != 1:
+    if len(argv) == 0:
         exit("Missing command line argument: path to an XML file. Exiting!")
-    xml_file = open(argv[0], "r")
-    task_tree = xmltodict.parse(xml_file.read(), force_list='task')
-    root = task_tree['colibri']
-
-    for task in root['task']:
-        tasks[task['@name']](task, named_obj)
+    parser = argparse.ArgumentParser(
+        prog="colibri",
+        description="Run the tasks of a colibri XML-file.")
+    parser.add_argument('xml_file', nargs='?', default=None,
+                        help="XML-file with the tasks")
+    parser.add_argument('--serial', action='store_true',
+                        help="run the tasks one at a time in the order of "
+                             "the file")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="largest number of tasks running at the same "
+                             "time (default: number of CPUs)")
+    cache = parser.add_mutually_exclusive_group()
+    cache.add_argument('--cache', action='store_true', default=None,
+                       help="restore the results of unchanged tasks from "
+                            "the task cache (default if COLIBRI_TASK_CACHE "
+                            "is 1)")
+    cache.add_argument('--no-cache', action='store_false', dest='cache',
+                       help="run all tasks without the task cache")
+    parser.add_argument('--clear-cache', action='store_true',
+                        help="delete all results in the task cache before "
+                             "running the tasks")
+    args = parser.parse_args(argv)
+    if args.clear_cache:
+        colibri.clear_task_cache()
+        print("Cleared the task cache.")
+        print()
+    if args.xml_file is None:
+        if not args.clear_cache:
+            parser.error("the following arguments are required: xml_file")
+        print("COLIBRI ended!")
+        return
+    with open(args.xml_file, "r") as xml_file:
+        colibri.run_xml(xml_file.read(), serial=args.serial,
+                        workers=args.workers, cache=args.cache)
 
     print("COLIBRI ended!")
 
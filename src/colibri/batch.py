@@ -0,0 +1,347 @@
+import colibri
+import colibri.cache
+import colibri.schedule
+import concurrent.futures
+import contextlib
+import csv
+import functools
+import os
+import string
+import sys
+import time
+import traceback
+import xml.sax.saxutils
+import xmltodict
+from typing import Any, Callable, Optional
+
+
+def _task_names() -> dict[str, str]:
+    # The name of the task function in colibri.tasks of every task name
+    return {
+        'ROIMeans': 'task_roi_means',
+        'TACFit': 'task_tac_fit',
+        'Correction': 'task_apply_correction',
+        'SaveTable': 'task_save_table',
+        'LoadTable': 'task_load_table',
+        'ConvertSeries': 'task_convert_series',
+        'ParametricMap': 'task_parametric_map'
+    }
+
+
+def get_task_functions() -> dict[str, Callable[..., Any]]:
+    """Get the tasks that can be used in a colibri XML-file. All tasks (and
+    their dependencies) are imported.
+
+    Return value:
+    A dict-object with the task names as keys and the task functions as
+    values.
+    """
+
+    return {name: getattr(colibri.tasks, func)
+            for name, func in _task_names().items()}
+
+
+def run_xml(xml_text: str,
+            serial: bool = False,
+            workers: Optional[int] = None,
+            cache: Optional[bool] = None) -> dict[str, Any]:
+    """Run the tasks of a colibri XML-file, and wait until the figures
+    written in the background by the tasks are done.
+    Tasks that do not depend on each other (e.g. ROIMeans-tasks on different
+    series, or a TACFit and a SaveTable of different tables) run at the same
+    time. A task depends on an earlier task if one of them writes an object
+    in the named object container, or a file, that the other reads or
+    writes. The results, and the printed output, are the same as if the
+    tasks ran one at a time in the order of the file.
+    With the task cache, a task that has run before with the same inputs is
+    not run again, but its results are restored from the cache (see
+    colibri.run_cached_task).
+
+    Arguments:
+    xml_text    --  The contents of the XML-file.
+    serial      --  If True, the tasks run one at a time in the order of the
+                    file. Default is False.
+    workers     --  The largest number of tasks running at the same time.
+                    Default is the number of CPUs.
+    cache       --  If True, the task cache is used. Default is None, in
+                    which case the task cache is used if the environment
+                    variable COLIBRI_TASK_CACHE is 1.
+
+    Return value:
+    The named object container after the last task has run.
+    """
+
+    tasks = _task_names()
+
+    # Created named object container
+    named_obj: dict[str, Any] = {}
+
+    task_tree = xmltodict.parse(xml_text, force_list='task')
+    root = task_tree['colibri']
+
+    # Only the tasks that are used are imported
+    task_list = root['task']
+    funcs = [getattr(colibri.tasks, tasks[task['@name']])
+             for task in task_list]
+
+    if cache is None:
+        cache = os.environ.get('COLIBRI_TASK_CACHE') == '1'
+    if cache:
+        funcs = [functools.partial(colibri.cache.run_cached_task, func)
+                 for func in funcs]
+
+    if serial:
+        for func, task in zip(funcs, task_list):
+            func(task, named_obj)
+    else:
+        colibri.schedule.run_tasks(funcs, task_list, named_obj,
+                                   workers=workers)
+
+    # Wait for the figures written in the background
+    if 'colibri.plotting' in sys.modules:
+        colibri.wait_for_figures()
+
+    return named_obj
+
+
+def read_manifest(manifest_path: str) -> list[dict[str, str]]:
+    """Read a batch manifest. The manifest lists the studies of a batch and
+    the values to fill into the task template for each study (see
+    colibri.run_batch). Each study must have an 'id', which is used to
+    identify the study in the batch summary and log files.
+    A manifest ending in .xml should look like this:
+
+    <manifest>
+        <study>
+            <id>STUDY_ID</id>
+            <KEY>VALUE</KEY>
+            ...
+        </study>
+        <study>
+            ...
+        </study>
+    </manifest>
+
+    Any other manifest is read as a CSV-file with a header row naming the
+    keys, e.g.:
+
+    id,img_path,roi_path
+    STUDY_ID,VALUE,VALUE
+    ...
+
+    Arguments:
+    manifest_path   --  The path to the manifest file.
+
+    Return value:
+    A list of studies in the order of the manifest. Each study is a
+    dict-object mapping the keys to their values.
+    """
+
+    if manifest_path.lower().endswith('.xml'):
+        with open(manifest_path) as f:
+            tree = xmltodict.parse(f.read(), force_list='study')
+        manifest = tree['manifest'] or {}
+        studies = [{key: '' if value is None else str(value)
+                    for key, value in study.items()}
+                   for study in manifest.get('study', [])]
+    else:
+        with open(manifest_path, newline='') as f:
+            studies = [dict(row) for row in csv.DictReader(f)]
+
+    ids = set()
+    for i, study in enumerate(studies):
+        if not study.get('id'):
+            raise ValueError(f"Study {i + 1} in manifest {manifest_path} "
+                             "has no id.")
+        if study['id'] in ids:
+            raise ValueError(f"Study id {study['id']} appears more than "
+                             f"once in manifest {manifest_path}.")
+        ids.add(study['id'])
+
+    return studies
+
+
+def fill_template(template: str, study: dict[str, str]) -> str:
+    """Fill the values of a study into a task template. The template is a
+    colibri XML-file, where $KEY or ${KEY} is replaced with the value of KEY
+    in the study. The values are escaped for use in XML.
+
+    Arguments:
+    template    --  The contents of the template file.
+    study       --  The values of the study as a dict-object.
+
+    Return value:
+    The contents of the XML-file of the study.
+    """
+
+    values = {key: xml.sax.saxutils.escape(value)
+              for key, value in study.items()}
+    return string.Template(template).substitute(values)
+
+
+def _run_study(study: dict[str, str],
+               template: str,
+               log_path: Optional[str]) -> dict[str, Any]:
+    # Run a single study of a batch. Any error is caught and reported in the
+    # result, so that a failing study does not affect the rest of the batch.
+    # The output of the tasks goes to the log file of the study (or nowhere),
+    # since the output of studies running in parallel would be mixed. The
+    # tasks of a study run one at a time, and the fitting functions use a
+    # single process, since the studies already run in parallel.
+    os.environ['COLIBRI_FIT_WORKERS'] = '1'
+    start = time.perf_counter()
+    error = None
+    with open(log_path or os.devnull, 'w') as log:
+        with contextlib.redirect_stdout(log):
+            try:
+                run_xml(fill_template(template, study), serial=True)
+            except (Exception, SystemExit) as e:
+                error = repr(e)
+                traceback.print_exc(file=log)
+    return {'id': study['id'],
+            'success': error is None,
+            'time': time.perf_counter() - start,
+            'error': error}
+
+
+# The number of times a study may be unfinished when a pool of workers
+# breaks, before it runs alone in a pool of its own
+_MAX_CRASHES = 2
+
+
+def _run_pool(indices: list[int],
+              studies: list[dict[str, str]],
+              template: str,
+              log_paths: list[Optional[str]],
+              workers: Optional[int],
+              results: list[Optional[dict[str, Any]]]) -> list[int]:
+    # Run studies in a pool of worker processes and store their results as
+    # they are done. If a worker process dies (e.g. a crash or an out of
+    # memory kill in SimpleITK), the pool breaks, and the studies that did not
+    # finish are returned, so they can run again in a new pool.
+    unfinished = []
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_run_study, studies[i], template,
+                               log_paths[i]): i
+                   for i in indices}
+        for future in concurrent.futures.as_completed(futures):
+            i = futures[future]
+            try:
+                res = future.result()
+            except concurrent.futures.process.BrokenProcessPool:
+                unfinished.append(i)
+                continue
+            except Exception as e:
+                # The study could not be sent to or from the worker
+                res = {'id': studies[i]['id'], 'success': False,
+                       'time': float('nan'), 'error': repr(e)}
+            results[i] = res
+            status = "done" if res['success'] else "FAILED"
+            print(f"Study {res['id']}: {status} ({res['time']:.1f} s)")
+    return sorted(unfinished)
+
+
+def run_batch(manifest_path: str,
+              template_path: str,
+              workers: Optional[int] = None,
+              log_dir: Optional[str] = None) -> list[dict[str, Any]]:
+    """Run a task template for every study in a manifest. The studies are run
+    in parallel in a pool of worker processes. A study that fails (e.g. due
+    to a missing file) is reported in the result, but does not stop the other
+    studies in the batch. If a worker process dies (e.g. it crashes or is
+    killed), the studies that did not finish are run again in a new pool. A
+    study that was unfinished in more than one such pool runs alone, and is
+    reported as failed if its worker process dies again.
+    The fitting functions use a single process in every study (see
+    colibri.default_workers).
+
+    Arguments:
+    manifest_path   --  The path to the manifest listing the studies (see
+                        colibri.read_manifest).
+    template_path   --  The path to the task template (see
+                        colibri.fill_template).
+    workers         --  The number of worker processes. Default is the
+                        number of CPUs.
+    log_dir         --  Optional directory for the output of each study,
+                        which is written to the file <id>.log. If not given,
+                        the output of the studies is discarded.
+
+    Return value:
+    A list with a result for every study in the order of the manifest. Each
+    result is a dict-object with the keys 'id', 'success', 'time' (the run
+    time of the study in seconds) and 'error' (a description of the error,
+    or None if the study succeeded).
+    """
+
+    studies = read_manifest(manifest_path)
+    with open(template_path) as f:
+        template = f.read()
+
+    if log_dir is not None:
+        os.makedirs(log_dir, exist_ok=True)
+    log_paths = [None if log_dir is None else
+                 os.path.join(log_dir, study['id'] + '.log')
+                 for study in studies]
+
+    results: list[Optional[dict[str, Any]]] = [None] * len(studies)
+    crashes = [0] * len(studies)
+    pending = list(range(len(studies)))
+    while pending:
+        shared = [i for i in pending if crashes[i] < _MAX_CRASHES]
+        alone = [i for i in pending if crashes[i] >= _MAX_CRASHES]
+        pending = []
+        if shared:
+            unfinished = _run_pool(shared, studies, template, log_paths,
+                                   workers, results)
+            if unfinished:
+                print(len(unfinished), "studies did not finish, since a "
+                      "worker process died. Running them again.")
+            for i in unfinished:
+                crashes[i] += 1
+            pending.extend(unfinished)
+        for i in alone:
+            if _run_pool([i], studies, template, log_paths, 1, results):
+                results[i] = {'id': studies[i]['id'], 'success': False,
+                              'time': float('nan'),
+                              'error': "The worker process died."}
+                print(f"Study {studies[i]['id']}: FAILED "
+                      "(the worker process died)")
+
+    return [res for res in results if res is not None]
+
+
+def print_batch_summary(results: list[dict[str, Any]], wall_time: float):
+    """Print a summary of a batch run.
+
+    Arguments:
+    results     --  The results of colibri.run_batch.
+    wall_time   --  The total run time of the batch in seconds.
+    """
+
+    failed = [res for res in results if not res['success']]
+    print()
+    print("Batch summary:")
+    print(len(results) - len(failed), "succeeded,", len(failed), "failed.")
+    if results:
+        times = [res['time'] for res in results]
+        print(f"Study time: total {sum(times):.1f} s, "
+              f"longest {max(times):.1f} s.")
+    print(f"Wall time: {wall_time:.1f} s.")
+    for res in failed:
+        print("Failed study", res['id'], ":", res['error'])
+
+
+def save_batch_summary(results: list[dict[str, Any]], file_path: str):
+    """Save the results of a batch run as a CSV-file with the columns id,
+    success, time and error.
+
+    Arguments:
+    results     --  The results of colibri.run_batch.
+    file_path   --  The path to the output file.
+    """
+
+    with open(file_path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, ['id', 'success', 'time', 'error'])
+        writer.writeheader()
+        for res in results:
+            writer.writerow(res)
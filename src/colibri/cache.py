@@ -0,0 +1,340 @@
+import colibri
+import colibri.schedule
+import hashlib
+import importlib.metadata
+import json
+import numpy as np
+import os
+import pickle
+import sys
+import threading
+from collections.abc import Mapping
+from typing import Any, Callable, Optional, OrderedDict
+
+
+def get_cache_dir() -> str:
+    """Get the directory where colibri stores cached data. The directory can
+    be chosen with the environment variable COLIBRI_CACHE_DIR. If the variable
+    is not set, the directory 'colibri' in the user cache directory
+    (XDG_CACHE_HOME or ~/.cache) is used.
+
+    Return value:
+    The path to the cache directory. The directory is not created.
+    """
+
+    if 'COLIBRI_CACHE_DIR' in os.environ:
+        return os.environ['COLIBRI_CACHE_DIR']
+    base = os.environ.get('XDG_CACHE_HOME',
+                          os.path.join(os.path.expanduser('~'), '.cache'))
+    return os.path.join(base, 'colibri')
+
+
+def _dir_fingerprint(dir_path: str) -> list[list[Any]]:
+    # Name, size and modification time of every file in a directory. Any
+    # added, removed or modified file changes the fingerprint.
+    fingerprint = []
+    with os.scandir(dir_path) as it:
+        for entry in it:
+            if entry.is_file():
+                st = entry.stat()
+                fingerprint.append([entry.name, st.st_size, st.st_mtime_ns])
+    fingerprint.sort()
+    return fingerprint
+
+
+def _series_index_path(dicom_path: str) -> str:
+    # The index file of a directory is named by a hash of its absolute path
+    key = hashlib.sha1(os.path.abspath(dicom_path).encode()).hexdigest()
+    return os.path.join(get_cache_dir(), 'series_index', key + '.json')
+
+
+def get_series_index(dicom_path: str,
+                     use_cache: bool = True) -> dict[str, Any]:
+    """Get the index of a dynamic image series stored as dicom files in a
+    directory. The index contains the file names sorted in order of
+    acquisition, and the acquisition information read with
+    colibri.read_series_info.
+    Creating the index requires a scan of the directory with GDCM and a read
+    of every dicom header. To avoid this on repeated runs, the index is stored
+    in the colibri cache directory (see colibri.get_cache_dir), keyed by the
+    directory path and the names, sizes and modification times of the files in
+    the directory. If any file in the directory is added, removed or
+    modified, the stored index is stale and is rebuilt automatically.
+
+    Arguments:
+    dicom_path  --  The path to the dicom files.
+    use_cache   --  If False, the stored index is neither read nor written.
+                    Default is True.
+
+    Return value:
+    A dict-object with the keys 'files' (the dicom file paths sorted in order
+    of acquisition), 'acq', 'frame_dur', 'size', 'origin', 'spacing' and
+    'direction' (see colibri.read_series_info).
+    """
+
+    index_path = _series_index_path(dicom_path)
+    fingerprint = _dir_fingerprint(dicom_path)
+
+    # Try the stored index first
+    if use_cache and os.path.isfile(index_path):
+        try:
+            with open(index_path) as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            stored = {}
+        if (stored.get('path') == os.path.abspath(dicom_path) and
+                stored.get('fingerprint') == fingerprint):
+            index: dict[str, Any] = stored['index']
+            index['files'] = [os.path.join(dicom_path, name)
+                              for name in index['files']]
+            for key in ['size', 'origin', 'spacing', 'direction']:
+                index[key] = tuple(index[key])
+            return index
+
+    # Get dicom file names in folder sorted according to acquisition time.
+    # SimpleITK is imported here, so the task cache does not need it.
+    import SimpleITK as sitk
+    dcm_names = list(sitk.ImageSeriesReader.GetGDCMSeriesFileNames(
+        dicom_path))
+    info = colibri.read_series_info(dcm_names)
+
+    index = {'files': dcm_names,
+             'acq': info['acq'],
+             'frame_dur': info['frame_dur'],
+             'size': info['size'],
+             'origin': info['origin'],
+             'spacing': info['spacing'],
+             'direction': info['direction']}
+
+    # Store the index. A cache that cannot be written is not an error.
+    if use_cache:
+        stored = {'path': os.path.abspath(dicom_path),
+                  'fingerprint': fingerprint,
+                  'index': dict(index, files=[os.path.basename(name)
+                                              for name in dcm_names])}
+        try:
+            os.makedirs(os.path.dirname(index_path), exist_ok=True)
+            tmp_path = (index_path + '.' + str(os.getpid()) + '.' +
+                        str(threading.get_ident()) + '.tmp')
+            with open(tmp_path, 'w') as f:
+                json.dump(stored, f)
+            os.replace(tmp_path, index_path)
+        except OSError:
+            pass
+
+    return index
+
+
+def _task_cache_dir() -> str:
+    # The directory of the task cache entries
+    return os.path.join(get_cache_dir(), 'tasks')
+
+
+def _task_cache_size() -> int:
+    # The largest total size of the task cache in bytes. The size can be set
+    # in megabytes with the environment variable COLIBRI_TASK_CACHE_SIZE.
+    return int(float(os.environ.get('COLIBRI_TASK_CACHE_SIZE', 1024)) *
+               1024 * 1024)
+
+
+def _path_fingerprint(path: str) -> list[Any]:
+    # The fingerprint of a file (size and modification time) or a directory
+    # (the fingerprints of its files)
+    if os.path.isdir(path):
+        return ['dir', _dir_fingerprint(path)]
+    if os.path.isfile(path):
+        st = os.stat(path)
+        return ['file', st.st_size, st.st_mtime_ns]
+    return ['missing']
+
+
+def _hash_value(h: Any, value: Any):
+    # Add a value from named_obj to a hash. Arrays are hashed by their data,
+    # so tables are hashed without converting them to other objects.
+    if isinstance(value, np.ndarray):
+        h.update(b'ndarray' + value.dtype.str.encode() +
+                 str(value.shape).encode())
+        h.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, Mapping):
+        h.update(b'mapping' + str(len(value)).encode())
+        for key, item in value.items():
+            _hash_value(h, str(key))
+            _hash_value(h, item)
+    elif isinstance(value, (list, tuple)):
+        h.update(b'list' + str(len(value)).encode())
+        for item in value:
+            _hash_value(h, item)
+    elif 'SimpleITK' in sys.modules and \
+            isinstance(value, sys.modules['SimpleITK'].Image):
+        sitk = sys.modules['SimpleITK']
+        _hash_value(h, [value.GetOrigin(), value.GetSpacing(),
+                        value.GetDirection(),
+                        sitk.GetArrayViewFromImage(value)])
+    else:
+        h.update(pickle.dumps(value))
+
+
+# The hash of the source code of colibri, computed once per process
+_source_hash: Optional[str] = None
+
+
+def _colibri_source_hash() -> str:
+    # A hash of all source files of colibri, so the results of a task are not
+    # restored after the code has changed (e.g. a model under development in
+    # an editable install)
+    global _source_hash
+    if _source_hash is None:
+        h = hashlib.sha256()
+        root = os.path.dirname(os.path.abspath(colibri.__file__))
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames.sort()
+            for name in sorted(filenames):
+                if name.endswith(('.py', '.pyi')):
+                    path = os.path.join(dirpath, name)
+                    h.update(os.path.relpath(path, root).encode())
+                    with open(path, 'rb') as f:
+                        h.update(f.read())
+        _source_hash = h.hexdigest()
+    return _source_hash
+
+
+def _task_key(task: OrderedDict[str, Any],
+              named_obj: dict[str, Any],
+              files: set[str],
+              objs: set[str]) -> str:
+    # The key of a task in the task cache: a hash of the colibri version and
+    # source code, the XML-tags of the task, the fingerprints of the files it
+    # reads and the objects in named_obj it uses
+    h = hashlib.sha256()
+    h.update(importlib.metadata.version('colibri').encode())
+    h.update(_colibri_source_hash().encode())
+    h.update(json.dumps(task, sort_keys=True).encode())
+    h.update(json.dumps([[path, _path_fingerprint(path)]
+                         for path in sorted(files)]).encode())
+    for name in sorted(objs):
+        if name in named_obj:
+            _hash_value(h, name)
+            _hash_value(h, named_obj[name])
+    return h.hexdigest()
+
+
+def _evict_task_cache(max_size: int):
+    # Delete the least recently used entries of the task cache until its
+    # total size is at most max_size bytes. The modification time of an
+    # entry is updated when it is used.
+    entries = []
+    try:
+        with os.scandir(_task_cache_dir()) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith('.pkl'):
+                    st = entry.stat()
+                    entries.append((st.st_mtime_ns, st.st_size, entry.path))
+    except OSError:
+        return
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_size:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        total -= size
+
+
+def run_cached_task(func: Callable[..., Any],
+                    task: OrderedDict[str, Any],
+                    named_obj: dict[str, Any]):
+    """Run a task of a colibri XML-file, or restore its results from the
+    task cache if the task has run before with the same inputs.
+    The results of a task are stored in the directory 'tasks' of the colibri
+    cache directory (see colibri.get_cache_dir), keyed by a hash of the
+    source code of colibri, the XML-tags of the task, the path, size and
+    modification time of every file it reads, and the contents of the
+    objects in named_obj it uses. The results are the objects the task
+    stores in named_obj. A task that writes
+    files is only restored if the files are unchanged since it ran.
+    When the cache is larger than the size in megabytes in the environment
+    variable COLIBRI_TASK_CACHE_SIZE (default 1024), the least recently used
+    results are deleted. Tasks that must run alone (see colibri.run_xml),
+    and tasks that do not store any objects or write any files, always run.
+
+    Arguments:
+    func        --  The task function.
+    task        --  The XML-tags of the task.
+    named_obj   --  The named object container.
+    """
+
+    resources = colibri.schedule._task_resources(task)
+    if resources is None:
+        func(task, named_obj)
+        return
+    reads, writes = resources
+    read_files = {name for kind, name in reads if kind == 'file'}
+    write_files = {name for kind, name in writes if kind == 'file'}
+    write_objs = {name for kind, name in writes if kind == 'obj'}
+    if not write_files and not write_objs:
+        func(task, named_obj)
+        return
+
+    # Objects that are written may also be read (e.g. by Correction)
+    objs = {name for kind, name in reads | writes if kind == 'obj'}
+    key = _task_key(task, named_obj, read_files, objs)
+    entry_path = os.path.join(_task_cache_dir(), key + '.pkl')
+
+    # Try the stored results first
+    try:
+        with open(entry_path, 'rb') as f:
+            stored = pickle.load(f)
+        hit = all(_path_fingerprint(path) == fingerprint
+                  for path, fingerprint in stored['files'].items())
+    except Exception:
+        hit = False
+    if hit:
+        print("Using the cached results of task", task['@name'], ".")
+        print()
+        named_obj.update(stored['objs'])
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+        return
+
+    with colibri.collect_figures() as figures:
+        func(task, named_obj)
+
+    # Store the results. A cache that cannot be written is not an error.
+    # The figures of the task must be written before the files are
+    # fingerprinted.
+    colibri.wait_for_figures(figures)
+    stored = {'objs': {name: named_obj[name] for name in write_objs
+                       if name in named_obj},
+              'files': {path: _path_fingerprint(path)
+                        for path in write_files}}
+    try:
+        data = pickle.dumps(stored)
+        os.makedirs(_task_cache_dir(), exist_ok=True)
+        tmp_path = (entry_path + '.' + str(os.getpid()) + '.' +
+                    str(threading.get_ident()) + '.tmp')
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, entry_path)
+    except Exception:
+        return
+    _evict_task_cache(_task_cache_size())
+
+
+def clear_task_cache():
+    """Delete all results in the task cache (see colibri.run_cached_task).
+    """
+
+    try:
+        with os.scandir(_task_cache_dir()) as it:
+            paths = [entry.path for entry in it if entry.is_file()]
+    except OSError:
+        return
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -1,14 +1,61 @@
-import SimpleITK as sitk
 from datetime import datetime
+import json
 import numpy as np
-from typing import Union
+import struct
+from collections.abc import Mapping
+from colibri.table import Table
+from typing import TYPE_CHECKING, Any, Optional
+
+if TYPE_CHECKING:
+    import SimpleITK as sitk
+
+
+def read_dicom_header(dicom_path: str) -> 'sitk.ImageFileReader':
+    """Read the header of a dicom file without decoding the pixel data.
+    The returned reader gives access to the meta data (e.g. with
+    GetMetaData('0008|0032')) and the image geometry (GetSize, GetOrigin,
+    GetSpacing and GetDirection) of the file.
+
+    Arguments:
+    dicom_path  --  The path to the dicom file.
+
+    Return value:
+    A SimpleITK ImageFileReader where the image information has been read.
+    """
+
+    # SimpleITK is imported here, so the table functions do not need it
+    import SimpleITK as sitk
+    reader = sitk.ImageFileReader()
+    reader.SetFileName(dicom_path)
+    reader.ReadImageInformation()
+    return reader
+
+
+def dicom_datetime(img_date: str, img_time: str) -> datetime:
+    """Turn the dicom date and time strings (e.g. from the tags 0008|0022 and
+    0008|0032) into a datetime object.
+
+    Arguments:
+    img_date    --  The dicom date string (YYYYMMDD).
+    img_time    --  The dicom time string (hhmmss.f).
+
+    Return value:
+    A datetime object representing the date and time.
+    """
+
+    # Format the strings into ISO 8601 format [ YYYY-MM-DD hh:mm:ss.ffffff ]
+    sd = img_date[:4] + "-" + img_date[4:6] + "-" + img_date[6:]
+    sd = sd + " " + img_time[:2] + ":" + img_time[2:4] + ":" + img_time[4:6]
+    sd = sd + "." + img_time[-1].ljust(6, "0")
+    return datetime.fromisoformat(sd)
 
 
 def get_acq_datetime(dicom_path: str) -> datetime:
     """Get an image acquisition datetime from its dicom header.
     Dicom images store the acquisition date and time in tags in the images
     dicom header. This function reads the relevant tags and turns it into a
-    datetime object.
+    datetime object. Only the header of the file is read, the pixel data is
+    not decoded.
 
     Arguments:
     dicom_path  --  The path to the dicom file.
@@ -17,22 +64,18 @@ def get_acq_datetime(dicom_path: str) -> datetime:
     A datetime object representing the date and time of the acquisition.
     """
 
-    # Read the dicom image into Simple ITK
-    img = sitk.ReadImage(dicom_path)
+    # Read the dicom header into Simple ITK
+    reader = read_dicom_header(dicom_path)
 
     # Read the relevant header tags as strings
-    img_time = img.GetMetaData('0008|0032')
-    img_date = img.GetMetaData('0008|0022')
+    img_time = reader.GetMetaData('0008|0032')
+    img_date = reader.GetMetaData('0008|0022')
 
-    # Format the strings into ISO 8601 format [ YYYY-MM-DD hh:mm:ss.ffffff ]
-    sd = img_date[:4] + "-" + img_date[4:6] + "-" + img_date[6:]
-    sd = sd + " " + img_time[:2] + ":" + img_time[2:4] + ":" + img_time[4:6]
-    sd = sd + "." + img_time[-1].ljust(6, "0")
-    return datetime.fromisoformat(sd)
+    return dicom_datetime(img_date, img_time)
 
 
 def shift_time(y: list[float], t: list[float],
-               deltat: float) -> list[float]:
+               deltat: float) -> np.ndarray:
     """Given the samples y of a function y(t) sampled at the time points t,
     this function computes the samples of another function x(t) at the same
     time points under the assumption that x(t) = y(t-deltat), i.e. that x is
@@ -53,57 +96,205 @@ def shift_time(y: list[float], t: list[float],
     deltat  --  The time shift
 
     Return value:
-    A list of the interpolated values of the function x(t) = y(t-deltat).
+    An array of the interpolated values of the function x(t) = y(t-deltat).
     """
 
     # Construct the timepoints where y should be interpolated
-    t_inter = [tt - deltat for tt in t]
+    t_inter = np.asarray(t, dtype=np.float64) - deltat
+
+    res: np.ndarray = np.interp(t_inter, t, y)
+    return res
+
+
+# The start of a binary table file (see colibri.save_table), followed by the
+# format version
+_TABLE_MAGIC = b'COLIBRI-TABLE\x00'
+_TABLE_VERSION = 1
+
+# The binary table header and every column start at a multiple of this
+_TABLE_ALIGN = 64
+
+
+def _table_format(path: str, table_format: Optional[str]) -> str:
+    # The format of a table file: given explicitly, or 'binary' for files
+    # ending in .ctab and 'text' otherwise
+    if table_format is None:
+        return 'binary' if path.lower().endswith('.ctab') else 'text'
+    if table_format not in ('text', 'binary'):
+        raise ValueError("Unknown table format '" + str(table_format) +
+                         "', expected 'text' or 'binary'.")
+    return table_format
 
-    return list(np.interp(t_inter, t, y))
 
+def _aligned(offset: int) -> int:
+    # The first multiple of _TABLE_ALIGN at or after offset
+    return -(-offset // _TABLE_ALIGN) * _TABLE_ALIGN
 
-def save_table(table: dict[Union[str, int], list[float]], path: str):
-    """Saves a table represented by a dict object to a text file
-    using numpy.savetxt.
+
+def save_table(table: Mapping[Any, Any], path: str,
+               table_format: Optional[str] = None):
+    """Saves a table represented by a dict object to a file. Two formats are
+    supported:
+
+    text    --  A text file written with numpy.savetxt, with the column
+                names in the header line. Columns of text (e.g. the labels
+                of a fit result table) are written as they are.
+    binary  --  A binary file with a header holding the column names and
+                data types, followed by the raw data of each column. Numbers
+                are stored exactly (e.g. as float64), and the columns can be
+                memory-mapped when loaded (see colibri.load_table).
 
     Arguments:
-    table   --  The table-data (e.g. from lazy_series_roi_means)
-    path    --  The filename where the data will be saved.
+    table           --  The table-data, a Table or dict-object (e.g. from
+                        lazy_series_roi_means)
+    path            --  The filename where the data will be saved.
+    table_format    --  'text' or 'binary'. Default is None, in which case
+                        files ending in .ctab are binary and all other files
+                        are text.
     """
 
     # Put data and header text into appropriate containers
     columns = []
     header = ""
     for label in table:
-        columns.append(table[label])
+        columns.append(np.asarray(table[label]))
         header = header + str(label) + "   "
 
+    if _table_format(path, table_format) == 'binary':
+        _save_binary_table([str(label) for label in table], columns, path)
+        return
+
     # Put data into columns and save to file
-    data = np.column_stack(columns)
-    np.savetxt(path, data, header=header)
+    if all(np.issubdtype(col.dtype, np.number) for col in columns):
+        np.savetxt(path, np.column_stack(columns), header=header)
+    else:
+        data = np.column_stack([col.astype(str) for col in columns])
+        np.savetxt(path, data, fmt='%s', header=header)
+
+
+def _save_binary_table(names: list[str], columns: list[np.ndarray],
+                       path: str):
+    # Write the columns of a table to a binary table file. The file starts
+    # with _TABLE_MAGIC, the format version and the length of the header
+    # (uint16 and uint32, little-endian), followed by the header as JSON and
+    # the data of each column. The header gives the number of rows and the
+    # name, data type and file offset of each column.
+    rows = len(columns[0]) if columns else 0
+    data = []
+    for name, col in zip(names, columns):
+        if col.ndim != 1 or len(col) != rows:
+            raise ValueError("Column " + name + " has shape " +
+                             str(col.shape) + ", expected (" + str(rows) +
+                             ",).")
+        if not (np.issubdtype(col.dtype, np.number) or
+                col.dtype == np.bool_):
+            col = col.astype(str)
+        data.append(np.ascontiguousarray(col))
+
+    # The offsets of the columns depend on the length of the header itself,
+    # so the header length is increased until the header fits, and the
+    # header is then padded to that length.
+    prefix = len(_TABLE_MAGIC) + 6
+    header_len = _TABLE_ALIGN
+    while True:
+        offsets = [_aligned(prefix + header_len)]
+        for col in data:
+            offsets.append(_aligned(offsets[-1] + col.nbytes))
+        entries = [{'name': name, 'dtype': col.dtype.str, 'offset': offset}
+                   for name, col, offset in zip(names, data, offsets)]
+        header = json.dumps({'rows': rows, 'columns': entries}).encode()
+        if len(header) <= header_len:
+            break
+        header_len = _aligned(len(header))
+    header = header.ljust(header_len)
 
+    with open(path, 'wb') as f:
+        f.write(_TABLE_MAGIC)
+        f.write(struct.pack('<HI', _TABLE_VERSION, header_len))
+        f.write(header)
+        for col, offset in zip(data, offsets):
+            f.write(bytes(offset - f.tell()))
+            f.write(col.tobytes())
 
-def load_table(path: str) -> dict[str, list[float]]:
-    """Loads a table saved with colibri.save_tac.
+
+def load_table(path: str, table_format: Optional[str] = None,
+               mmap: bool = False) -> Table:
+    """Loads a table saved with colibri.save_table. Columns of a text file
+    are loaded as float64 arrays, or as arrays of strings if they are not
+    numbers. Columns of a binary file are loaded with the data type they
+    were saved with.
 
     Arguments:
-    path    --  The filename of the file containing the table.
+    path            --  The filename of the file containing the table.
+    table_format    --  'text' or 'binary'. Default is None, in which case
+                        files ending in .ctab are binary and all other files
+                        are text.
+    mmap            --  If True, the columns of a binary file are
+                        memory-mapped (read-only), so only the parts of the
+                        columns that are actually used are read from disk.
+                        Default is False. Text files are always read.
 
     Return value:
-    A dict object with column headers as keys and data as values.
+    A Table with the column headers as keys and the columns as values.
     """
 
+    if _table_format(path, table_format) == 'binary':
+        return _load_binary_table(path, mmap)
+
     # Read labels from file
     with open(path) as f:
         header = f.readline()
     header_cols = header.split()
     header_cols = header_cols[1:]
 
-    # Load data (excluding header)
-    data = np.loadtxt(path)
+    # Load data (excluding header). The data is parsed as numbers first,
+    # and only parsed as strings if some of the columns are not numbers.
+    table = Table()
+    try:
+        data = np.loadtxt(path, ndmin=2, skiprows=1)
+    except ValueError:
+        with open(path) as f:
+            f.readline()
+            str_data = np.array([line.split() for line in f
+                                 if line.strip() and
+                                 not line.lstrip().startswith('#')],
+                                dtype=str).reshape(-1, len(header_cols))
+        for i in range(len(header_cols)):
+            try:
+                table[header_cols[i]] = str_data[:, i].astype(np.float64)
+            except ValueError:
+                table[header_cols[i]] = str_data[:, i]
+        return table
 
-    # Put data into a dict object with correct labels
-    data_dict = {}
+    # Put data into a table with correct labels
     for i in range(len(header_cols)):
-        data_dict[header_cols[i]] = list(data[:, i])
-    return data_dict
+        table[header_cols[i]] = data[:, i]
+    return table
+
+
+def _load_binary_table(path: str, mmap: bool) -> Table:
+    # Load the columns of a binary table file (see _save_binary_table)
+    with open(path, 'rb') as f:
+        magic = f.read(len(_TABLE_MAGIC))
+        if magic != _TABLE_MAGIC:
+            raise ValueError(path + " is not a binary colibri table.")
+        version, header_len = struct.unpack('<HI', f.read(6))
+        if version != _TABLE_VERSION:
+            raise ValueError(path + " has table format version " +
+                             str(version) + ", expected " +
+                             str(_TABLE_VERSION) + ".")
+        header = json.loads(f.read(header_len))
+
+        rows = header['rows']
+        table = Table()
+        for entry in header['columns']:
+            dtype = np.dtype(entry['dtype'])
+            if mmap and rows > 0:
+                table[entry['name']] = np.memmap(
+                    path, dtype=dtype, mode='r', offset=entry['offset'],
+                    shape=(rows,))
+            else:
+                f.seek(entry['offset'])
+                table[entry['name']] = np.fromfile(f, dtype=dtype,
+                                                   count=rows)
+    return table
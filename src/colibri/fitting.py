@@ -0,0 +1,718 @@
+import colibri.model
+import concurrent.futures
+import lmfit
+import multiprocessing
+import numpy as np
+import os
+from colibri.table import Table
+from collections.abc import Mapping
+from typing import Any, Callable, Optional, Union
+
+
+def _get_jacobians() -> dict[Callable[..., list[float]],
+                             Callable[..., np.ndarray]]:
+    # Dict of the analytic jacobians of the models
+    return {
+        colibri.model.model_step_2: colibri.model.model_step_2_jac,
+        colibri.model.model_fermi_2: colibri.model.model_fermi_2_jac,
+        colibri.model.model_step_fermi: colibri.model.model_step_fermi_jac,
+        colibri.model.model_step: colibri.model.model_step_jac,
+        colibri.model.model_patlak: colibri.model.model_patlak_jac
+    }
+
+
+def _residual_jacobian(model: lmfit.Model,
+                       jac: Callable[..., np.ndarray]) \
+        -> Callable[..., np.ndarray]:
+    # Create the jacobian of the residual of an lmfit model fit (data - model)
+    # from the jacobian of the model function. The columns are the varying
+    # parameters, in the order lmfit uses for the fit.
+    def dfun(params: lmfit.Parameters, data: Any, weights: Any,
+             **kwargs: Any) -> np.ndarray:
+        values = {name: params[name].value for name in model.param_names}
+        d = jac(**kwargs, **values)
+        cols = [model.param_names.index(name)
+                for name, par in params.items() if par.vary]
+        res: np.ndarray = -d[:, cols]
+        if weights is not None:
+            res *= np.asarray(weights)[:, np.newaxis]
+        return res
+    return dfun
+
+
+def fit_kws(model: Callable[..., list[float]],
+            fit_model: lmfit.Model) -> dict[str, Any]:
+    """Get the keyword arguments of the optimizer for fitting a model with
+    lmfit (the fit_kws argument of lmfit.Model.fit). If the model has an
+    analytic jacobian, it is passed to the optimizer, which then needs far
+    fewer model evaluations than with a numerical jacobian.
+
+    Arguments:
+    model       --  The model function (e.g. colibri.model.model_step).
+    fit_model   --  The lmfit.Model-object of the model function.
+
+    Return value:
+    A dict-object with the keyword arguments of the optimizer, which is
+    empty if the model has no analytic jacobian.
+    """
+
+    jac = _get_jacobians().get(model)
+    if jac is None:
+        return {}
+    return {'Dfun': _residual_jacobian(fit_model, jac)}
+
+
+def default_workers() -> int:
+    """Get the default number of worker processes of the fitting functions
+    (colibri.fit_tacs, colibri.multi_start_fit, colibri.bootstrap_fit and
+    colibri.parametric_maps). This is the value of the environment variable
+    COLIBRI_FIT_WORKERS, if it is set, and otherwise the number of CPUs.
+    colibri.run_batch sets COLIBRI_FIT_WORKERS to 1 in its worker processes,
+    since the studies already run in parallel.
+
+    Return value:
+    The default number of worker processes.
+    """
+
+    if os.environ.get('COLIBRI_FIT_WORKERS'):
+        return max(1, int(os.environ['COLIBRI_FIT_WORKERS']))
+    return os.cpu_count() or 1
+
+
+def process_pool(workers: int,
+                 initializer: Callable[..., None],
+                 initargs: tuple[Any, ...]) \
+        -> concurrent.futures.ProcessPoolExecutor:
+    """Create a pool of worker processes for fitting. The workers are started
+    by a fork server (or spawned, if there is no fork server) instead of
+    forked from the calling process. The calling process may run other tasks
+    in threads (see colibri.run_xml), and a process forked from a process
+    with threads can deadlock.
+
+    Arguments:
+    workers     --  The number of worker processes.
+    initializer --  The function preparing every worker process.
+    initargs    --  The arguments of the initializer.
+
+    Return value:
+    A ProcessPoolExecutor-object.
+    """
+
+    ctx: Any = multiprocessing.get_context('spawn')
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        ctx = multiprocessing.get_context('forkserver')
+        # The fork server imports the fitting code once, so the workers
+        # start without importing it again
+        ctx.set_forkserver_preload(['colibri.fitting'])
+    return concurrent.futures.ProcessPoolExecutor(max_workers=workers,
+                                                  mp_context=ctx,
+                                                  initializer=initializer,
+                                                  initargs=initargs)
+
+
+# The fit setup of a worker process. The input function and the lmfit model
+# are prepared once per process, so only the TACs are sent with every fit.
+_worker: dict[str, Any] = {}
+
+
+def _init_worker(fit_args: dict[str, Any]):
+    # Prepare the input function and the fit model
+    _worker.update(fit_args)
+    model_kws = fit_args['model_kws']
+    _worker['in_func'] = colibri.model.InputFunction(fit_args['t'],
+                                                     fit_args['in_func'])
+    fit_model = lmfit.Model(fit_args['model'],
+                            independent_vars=['t', 'in_func'] +
+                            list(model_kws.keys()))
+    _worker['fit_model'] = fit_model
+    _worker['fit_kws'] = fit_kws(fit_args['model'], fit_model)
+
+
+def _fit(tac: np.ndarray,
+         params: dict[str, dict[str, float]]) -> lmfit.model.ModelResult:
+    # Fit a TAC with the model of the worker from the given parameters
+    return _worker['fit_model'].fit(tac,
+                                    t=_worker['t'],
+                                    in_func=_worker['in_func'],
+                                    params=lmfit.create_params(**params),
+                                    fit_kws=_worker['fit_kws'],
+                                    **_worker['model_kws'])
+
+
+def _result_row(fit: Optional[lmfit.model.ModelResult],
+                names: list[str]) -> dict[str, float]:
+    # The best parameter values, their standard errors and the fit statistics
+    # of a fit as a row of a result table. A failed fit (None) is NaN.
+    row = {}
+    for name in names:
+        row[name] = np.nan
+        row[name + '_stderr'] = np.nan
+        if fit is not None:
+            row[name] = float(fit.params[name].value)
+            if fit.params[name].stderr is not None:
+                row[name + '_stderr'] = float(fit.params[name].stderr)
+    for stat in ['chisqr', 'redchi', 'rsquared', 'aic', 'bic', 'nfev']:
+        row[stat] = np.nan if fit is None else float(getattr(fit, stat))
+    return row
+
+
+def _rows_table(labels: list[str],
+                rows: list[dict[str, float]],
+                names: list[str]) -> Table:
+    # Collect the result rows of the tissue labels into a table
+    table = Table({'label': labels})
+    for key in _result_row(None, names):
+        table[key] = [row[key] for row in rows]
+    return table
+
+
+def fit_result_table(labels: list[str],
+                     fits: list[Optional[lmfit.model.ModelResult]],
+                     names: list[str]) -> Table:
+    """Collect the results of lmfit fits of tissue labels into a result
+    table with the same columns as the table of colibri.fit_tacs.
+
+    Arguments:
+    labels  --  The tissue labels.
+    fits    --  The lmfit.model.ModelResult-object of the fit of every
+                label, or None if the fit failed.
+    names   --  The names of the model parameters.
+
+    Return value:
+    A result Table with a row for every tissue label (see
+    colibri.fit_tacs).
+    """
+
+    return _rows_table(labels, [_result_row(fit, names) for fit in fits],
+                       names)
+
+
+def _fit_label(tac: np.ndarray,
+               params: Optional[dict[str, dict[str, float]]] = None) \
+        -> dict[str, float]:
+    # Fit the TAC of a tissue label, from its own parameters if given, and
+    # return the result row
+    names = list(_worker['params'].keys())
+    if params is None:
+        params = _worker['params']
+    try:
+        fit = _fit(tac, params)
+    except Exception:
+        return _result_row(None, names)
+    return _result_row(fit, names)
+
+
+def fit_tacs(time_data: Union[list[float], np.ndarray],
+             tacs: Mapping[str, Any],
+             input_data: Union[list[float], np.ndarray],
+             model: Callable[..., list[float]],
+             params: dict[str, dict[str, float]],
+             tcut: Optional[int] = None,
+             model_kws: Optional[dict[str, Any]] = None,
+             workers: Optional[int] = None,
+             label_params: Optional[
+                 Mapping[str, dict[str, dict[str, float]]]] = None) -> Table:
+    """Fit a model to the TACs of many tissue labels with the same input
+    function. The TACs are fitted in parallel in a pool of worker processes,
+    where the input function and the fit model are prepared once per
+    process. The analytic jacobian of the model is used by the optimizer, if
+    the model has one.
+
+    Arguments:
+    time_data   --  The time points of the TACs.
+    tacs        --  The TACs to fit as a dict-object with the tissue labels as
+                    keys.
+    input_data  --  The input function at the time points.
+    model       --  The model function (e.g. colibri.model.model_step).
+    params      --  The initial value and optional bounds of each model
+                    parameter, as a dict-object of the form
+                    {'amp': {'value': 1.0, 'min': 0.0}, ...}.
+    tcut        --  Only the first tcut time points are fitted. Default is
+                    None, in which case all time points are fitted.
+    model_kws   --  Fixed (non-fitted) arguments of the model function, e.g.
+                    {'grid_step': 0.1}.
+    workers     --  The number of worker processes. Default is given by
+                    colibri.default_workers (the number of CPUs). If 1,
+                    all TACs are fitted in the calling process.
+    label_params -- The initial values and bounds of the tissue labels that
+                    are not fitted from params (e.g. the best optimum of a
+                    multi-start search of every label), as a dict-object
+                    with the tissue labels as keys. The parameters must have
+                    the same names as in params.
+
+    Return value:
+    A result Table with a row for every tissue label in the order of tacs.
+    The column 'label' has the tissue labels, and the other columns have the
+    best value (PARAM_NAME) and standard error (PARAM_NAME_stderr) of every
+    parameter, and the fit statistics 'chisqr', 'redchi', 'rsquared', 'aic',
+    'bic' and 'nfev' (the number of model evaluations). The row of a label
+    where the fit failed is NaN.
+    """
+
+    if tcut is None:
+        tcut = len(time_data)
+    if model_kws is None:
+        model_kws = {}
+
+    fit_args = {'model': model,
+                'params': params,
+                't': np.asarray(time_data[0:tcut], dtype=np.float64),
+                'in_func': np.asarray(input_data[0:tcut],
+                                      dtype=np.float64),
+                'model_kws': model_kws}
+
+    labels = list(tacs.keys())
+    data = [np.asarray(tacs[label][0:tcut], dtype=np.float64)
+            for label in labels]
+    if label_params is None:
+        label_params = {}
+    start_params = [label_params.get(label) for label in labels]
+
+    if workers is None:
+        workers = default_workers()
+    workers = max(1, min(workers, len(labels)))
+
+    print("Fitting", len(labels), "TACs with", workers, "workers...")
+
+    rows: list[dict[str, float]] = []
+    try:
+        if workers == 1:
+            _init_worker(fit_args)
+            results: Any = (_fit_label(tac, p)
+                            for tac, p in zip(data, start_params))
+            rows = _report_fits(labels, results)
+        else:
+            with process_pool(workers, _init_worker,
+                              (fit_args,)) as pool:
+                results = pool.map(_fit_label, data, start_params)
+                rows = _report_fits(labels, results)
+    finally:
+        _worker.clear()
+
+    print("... done!")
+
+    return _rows_table(labels, rows, list(params.keys()))
+
+
+def _report_fits(labels: list[str], results: Any) -> list[dict[str, float]]:
+    # Collect the result rows in order and print the progress
+    rows = []
+    for label, row in zip(labels, results):
+        rows.append(row)
+        print("Fitted", label, "(" + str(len(rows)), "of",
+              str(len(labels)) + ").")
+    return rows
+
+
+def _start_values(params: dict[str, dict[str, float]],
+                  starts: int,
+                  sampling: str,
+                  seed: Optional[int],
+                  max_starts: int) -> list[dict[str, float]]:
+    # The initial values of a multi-start fit. The parameters with a minimum
+    # and a maximum are sampled in the box of the bounds, the other parameters
+    # start from their initial value.
+    names = [name for name in params
+             if np.isfinite(params[name].get('min', -np.inf)) and
+             np.isfinite(params[name].get('max', np.inf))]
+    if not names:
+        raise ValueError("A multi-start fit needs at least one parameter "
+                         "with a minimum and a maximum.")
+    lower = np.array([params[name]['min'] for name in names])
+    upper = np.array([params[name]['max'] for name in names])
+
+    if sampling == 'grid':
+        # The centres of a grid of starts x starts x ... cells. The size of
+        # the grid is checked first, since it grows exponentially with the
+        # number of parameters.
+        n_grid = starts ** len(names)
+        if n_grid > max_starts:
+            raise ValueError(
+                "A grid of " + str(starts) + " points for each of the " +
+                str(len(names)) + " bounded parameters has " + str(n_grid) +
+                " initial values, more than the maximum of " +
+                str(max_starts) + ". Use fewer grid points, or lhs sampling "
+                "with a fixed number of initial values.")
+        axis = (np.arange(starts) + 0.5) / starts
+        grids = np.meshgrid(*([axis] * len(names)), indexing='ij')
+        u = np.column_stack([g.ravel() for g in grids])
+    elif sampling == 'lhs':
+        # A Latin hypercube: every parameter range is split into starts
+        # intervals, and every interval is sampled once
+        rng = np.random.default_rng(seed)
+        u = np.column_stack([(rng.permutation(starts) + rng.random(starts)) /
+                             starts for _ in names])
+    else:
+        raise ValueError("Unknown multi-start sampling " + sampling + ".")
+
+    points = lower + u * (upper - lower)
+    values = []
+    for point in points:
+        start = {name: float(params[name]['value']) for name in params}
+        start.update(zip(names, point.tolist()))
+        values.append(start)
+    return values
+
+
+def _fit_start(start: dict[str, float]) -> Optional[dict[str, float]]:
+    # Fit the TAC of the worker from a set of initial values and return the
+    # best values and the chi-square, or None if the fit fails
+    params = {name: dict(_worker['params'][name], value=start[name])
+              for name in _worker['params']}
+    try:
+        fit = _fit(_worker['tac'], params)
+    except Exception:
+        return None
+    res = {name: float(value) for name, value in fit.best_values.items()}
+    res['chisqr'] = float(fit.chisqr)
+    return res
+
+
+def _optima(results: list[dict[str, float]],
+            params: dict[str, dict[str, float]],
+            rtol: float) -> Table:
+    # Group the fit results into distinct optima. Two results are the same
+    # optimum if every parameter agrees within rtol of the parameter scale,
+    # which is the width of the bounds (or the initial value, if the
+    # parameter is not bounded).
+    names = list(params.keys())
+    scales = np.array([
+        params[name].get('max', np.inf) - params[name].get('min', -np.inf)
+        for name in names])
+    unbounded = ~np.isfinite(scales)
+    scales[unbounded] = [max(abs(params[name]['value']), 1.0)
+                         for name, u in zip(names, unbounded) if u]
+
+    optima: list[tuple[np.ndarray, float, int]] = []
+    for res in sorted(results, key=lambda r: r['chisqr']):
+        x = np.array([res[name] for name in names])
+        for i, (y, chisqr, count) in enumerate(optima):
+            if np.all(np.abs(x - y) <= rtol * scales):
+                optima[i] = (y, chisqr, count + 1)
+                break
+        else:
+            optima.append((x, res['chisqr'], 1))
+
+    table = Table({name: [float(y[j]) for y, _, _ in optima]
+                   for j, name in enumerate(names)})
+    table['chisqr'] = [chisqr for _, chisqr, _ in optima]
+    table['count'] = [count for _, _, count in optima]
+    return table
+
+
+def multi_start_fit(time_data: Union[list[float], np.ndarray],
+                    tissue_data: Union[list[float], np.ndarray],
+                    input_data: Union[list[float], np.ndarray],
+                    model: Callable[..., list[float]],
+                    params: dict[str, dict[str, float]],
+                    starts: int,
+                    sampling: str = 'lhs',
+                    target_chisqr: Optional[float] = None,
+                    tcut: Optional[int] = None,
+                    model_kws: Optional[dict[str, Any]] = None,
+                    workers: Optional[int] = None,
+                    seed: Optional[int] = None,
+                    rtol: float = 1e-3,
+                    max_starts: int = 100000) -> Table:
+    """Fit a model to a TAC from many initial values (a multi-start global
+    search). The initial values of the parameters with a minimum and a maximum
+    are sampled within the bounds, and the fits are run in parallel in a pool
+    of worker processes. The fits that end in the same optimum are counted
+    together.
+
+    Arguments:
+    time_data       --  The time points of the TAC.
+    tissue_data     --  The TAC to fit.
+    input_data      --  The input function at the time points.
+    model           --  The model function (e.g. colibri.model.model_step).
+    params          --  The initial value and optional bounds of each model
+                        parameter, as a dict-object of the form
+                        {'amp': {'value': 1.0, 'min': 0.0}, ...}. Parameters
+                        without both bounds start from their initial value.
+    starts          --  With 'lhs' sampling, the number of fits. With 'grid'
+                        sampling, the number of grid points along each
+                        sampled parameter, so the number of fits is
+                        starts ** (number of parameters with both bounds).
+    sampling        --  'lhs' for a Latin hypercube sample (default) or
+                        'grid' for a regular grid of initial values.
+    target_chisqr   --  If given, the search stops as soon as a fit reaches
+                        a chi-square below this value.
+    tcut            --  Only the first tcut time points are fitted. Default
+                        is None, in which case all time points are fitted.
+    model_kws       --  Fixed (non-fitted) arguments of the model function.
+    workers         --  The number of worker processes. Default is given by
+                        colibri.default_workers (the number of CPUs). If 1,
+                        all fits are run in the calling process.
+    seed            --  The seed of the Latin hypercube sample.
+    rtol            --  Two fits are the same optimum if all parameters agree
+                        within rtol times the width of their bounds. Default
+                        is 1e-3.
+    max_starts      --  The largest number of initial values of a 'grid'
+                        search, which has starts ** (number of parameters
+                        with both bounds) initial values. A larger grid
+                        raises a ValueError before any fit is run. Default is
+                        100000.
+
+    Return value:
+    A Table with a row for every distinct optimum in order of increasing
+    chi-square, so the first row is the best fit. The table has a column
+    with the value of every parameter, and the columns 'chisqr' and 'count'
+    (the number of fits that ended in the optimum).
+    """
+
+    if tcut is None:
+        tcut = len(time_data)
+    if model_kws is None:
+        model_kws = {}
+
+    start_values = _start_values(params, starts, sampling, seed,
+                                 max_starts)
+    fit_args = {'model': model,
+                'params': params,
+                't': np.asarray(time_data[0:tcut], dtype=np.float64),
+                'in_func': np.asarray(input_data[0:tcut],
+                                      dtype=np.float64),
+                'tac': np.asarray(tissue_data[0:tcut],
+                                  dtype=np.float64),
+                'model_kws': model_kws}
+
+    if workers is None:
+        workers = default_workers()
+    workers = max(1, min(workers, len(start_values)))
+
+    print("Fitting from", len(start_values), "initial values with",
+          workers, "workers...")
+
+    results: list[dict[str, float]] = []
+    failed = 0
+    try:
+        if workers == 1:
+            _init_worker(fit_args)
+            fits: Any = (_fit_start(start) for start in start_values)
+            failed = _collect_starts(fits, results, len(start_values),
+                                     target_chisqr)
+        else:
+            with process_pool(workers, _init_worker,
+                              (fit_args,)) as pool:
+                futures = [pool.submit(_fit_start, start)
+                           for start in start_values]
+                fits = (f.result() for f in
+                        concurrent.futures.as_completed(futures))
+                failed = _collect_starts(fits, results, len(start_values),
+                                         target_chisqr)
+                # Skip the fits that have not started, if the search stopped
+                for f in futures:
+                    f.cancel()
+    finally:
+        _worker.clear()
+
+    print("... done!")
+    if failed > 0:
+        print(failed, "fits failed.")
+    if not results:
+        raise RuntimeError("All fits of the multi-start search failed.")
+
+    return _optima(results, params, rtol)
+
+
+def _collect_starts(fits: Any,
+                    results: list[dict[str, float]],
+                    n_fits: int,
+                    target_chisqr: Optional[float]) -> int:
+    # Collect the results of a multi-start search as they are done and print
+    # the progress in steps of 10%. The search stops when a fit reaches the
+    # target chi-square. The number of failed fits is returned.
+    done = 0
+    failed = 0
+    reported = 0
+    for res in fits:
+        done += 1
+        if res is None:
+            failed += 1
+        else:
+            results.append(res)
+        if done * 10 // n_fits > reported:
+            reported = done * 10 // n_fits
+            print("Fitted", done, "of", n_fits, "initial values.")
+        if (res is not None and target_chisqr is not None and
+                res['chisqr'] <= target_chisqr):
+            print("Target chi-square reached after", done, "fits.")
+            break
+    return failed
+
+
+def _fit_replicates(data: np.ndarray) -> np.ndarray:
+    # Fit a chunk of bootstrap replicates of the TAC (one in every row) and
+    # return the best parameter values in the rows. Failed fits are NaN.
+    names = list(_worker['params'].keys())
+    res = np.full((len(data), len(names)), np.nan)
+    for i, tac in enumerate(data):
+        try:
+            fit = _fit(tac, _worker['params'])
+        except Exception:
+            continue
+        res[i] = [fit.best_values[name] for name in names]
+    return res
+
+
+def bootstrap_fit(time_data: Union[list[float], np.ndarray],
+                  tissue_data: Union[list[float], np.ndarray],
+                  input_data: Union[list[float], np.ndarray],
+                  model: Callable[..., list[float]],
+                  params: dict[str, dict[str, float]],
+                  samples: int,
+                  method: str = 'residual',
+                  tcut: Optional[int] = None,
+                  model_kws: Optional[dict[str, Any]] = None,
+                  workers: Optional[int] = None,
+                  seed: Optional[int] = None,
+                  chunk_size: int = 16) -> Table:
+    """Estimate the distribution of the fitted parameters of a TAC with a
+    bootstrap. The TAC is fitted once, and new TACs (replicates) are made by
+    adding resampled residuals to the best fit:
+    residual    --  The residuals (centred on zero) are drawn with
+                    replacement.
+    wild        --  Every residual is kept at its time point, and its sign is
+                    flipped at random. This allows the noise to change over
+                    time.
+    The replicates are fitted in parallel in a pool of worker processes, and
+    every fit starts from the best fit. The progress is printed as the
+    replicates are done. The replicates are drawn in the calling process, so
+    the result for a given seed does not depend on the number of workers.
+
+    Arguments:
+    time_data   --  The time points of the TAC.
+    tissue_data --  The TAC to fit.
+    input_data  --  The input function at the time points.
+    model       --  The model function (e.g. colibri.model.model_step).
+    params      --  The initial value and optional bounds of each model
+                    parameter, as a dict-object of the form
+                    {'amp': {'value': 1.0, 'min': 0.0}, ...}.
+    samples     --  The number of bootstrap replicates.
+    method      --  'residual' (default) or 'wild'.
+    tcut        --  Only the first tcut time points are fitted. Default is
+                    None, in which case all time points are fitted.
+    model_kws   --  Fixed (non-fitted) arguments of the model function.
+    workers     --  The number of worker processes. Default is given by
+                    colibri.default_workers (the number of CPUs). If 1,
+                    all fits are run in the calling process.
+    seed        --  The seed of the random resampling.
+    chunk_size  --  The number of replicates fitted by a worker at a time.
+                    Default is 16.
+
+    Return value:
+    A Table with a column for every parameter and a row with the best values
+    of every replicate. Replicates where the fit failed are NaN.
+    """
+
+    if tcut is None:
+        tcut = len(time_data)
+    if model_kws is None:
+        model_kws = {}
+    if method not in ('residual', 'wild'):
+        raise ValueError("Unknown bootstrap method " + method + ".")
+
+    fit_args = {'model': model,
+                'params': params,
+                't': np.asarray(time_data[0:tcut], dtype=np.float64),
+                'in_func': np.asarray(input_data[0:tcut],
+                                      dtype=np.float64),
+                'model_kws': model_kws}
+    tac = np.asarray(tissue_data[0:tcut], dtype=np.float64)
+
+    # The best fit, which is the starting point of all replicates
+    try:
+        _init_worker(fit_args)
+        best = _fit(tac, params)
+    finally:
+        _worker.clear()
+    fitted = np.asarray(best.best_fit, dtype=np.float64)
+    resid = tac - fitted
+
+    # Draw the replicates
+    rng = np.random.default_rng(seed)
+    if method == 'residual':
+        resid = resid - np.mean(resid)
+        data = fitted + resid[rng.integers(0, len(tac), (samples, len(tac)))]
+    else:
+        data = fitted + resid * rng.choice([-1.0, 1.0], (samples, len(tac)))
+
+    fit_args['params'] = {name: dict(params[name],
+                                     value=best.best_values[name])
+                          for name in params}
+
+    names = list(params.keys())
+    res = np.full((samples, len(names)), np.nan)
+
+    if workers is None:
+        workers = default_workers()
+    chunks = [(a, min(a + chunk_size, samples))
+              for a in range(0, samples, chunk_size)]
+    workers = max(1, min(workers, len(chunks)))
+
+    print("Fitting", samples, "bootstrap replicates with", workers,
+          "workers...")
+
+    try:
+        if workers == 1:
+            _init_worker(fit_args)
+            results: Any = ((chunk, _fit_replicates(data[slice(*chunk)]))
+                            for chunk in chunks)
+            _report_replicates(results, res, samples)
+        else:
+            with process_pool(workers, _init_worker,
+                              (fit_args,)) as pool:
+                futures = {pool.submit(_fit_replicates,
+                                       data[slice(*chunk)]): chunk
+                           for chunk in chunks}
+                results = ((futures[f], f.result()) for f in
+                           concurrent.futures.as_completed(futures))
+                _report_replicates(results, res, samples)
+    finally:
+        _worker.clear()
+
+    print("... done!")
+    failed = int(np.sum(np.any(np.isnan(res), axis=1)))
+    if failed > 0:
+        print(failed, "fits failed.")
+
+    # The columns are contiguous in the transposed array
+    res = np.ascontiguousarray(res.T)
+    return Table({name: res[j] for j, name in enumerate(names)})
+
+
+def _report_replicates(results: Any, res: np.ndarray, samples: int):
+    # Store the results of the chunks of replicates as they are done, and
+    # print the progress in steps of 10%
+    done = 0
+    reported = 0
+    for (start, stop), chunk_res in results:
+        res[start:stop] = chunk_res
+        done += stop - start
+        if done * 10 // samples > reported:
+            reported = done * 10 // samples
+            print("Fitted", done, "of", samples, "bootstrap replicates.")
+
+
+def bootstrap_intervals(samples: Mapping[str, Any],
+                        level: float = 0.95) \
+        -> dict[str, tuple[float, float]]:
+    """Compute percentile confidence intervals from bootstrap samples (see
+    colibri.bootstrap_fit). Failed replicates (NaN) are ignored.
+
+    Arguments:
+    samples --  The bootstrap samples as a table with a column for every
+                parameter.
+    level   --  The confidence level of the intervals. Default is 0.95.
+
+    Return value:
+    A dict-object with the lower and upper limit of the interval of every
+    parameter.
+    """
+
+    q = [50.0 * (1.0 - level), 50.0 * (1.0 + level)]
+    intervals = {}
+    for name in samples:
+        lower, upper = np.nanpercentile(samples[name], q)
+        intervals[name] = (float(lower), float(upper))
+    return intervals
@@ -1,7 +1,70 @@
 import SimpleITK as sitk
-from collections import defaultdict
+from collections import defaultdict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
 import colibri
-from typing import Any, Optional
+import json
+import os
+from colibri.series import DynamicSeries
+from colibri.table import Table
+import numpy as np
+import scipy
+from typing import Any, Iterator, Optional, Union
+
+
+def read_series_info(dcm_names: list[str]) -> dict[str, Any]:
+    """Read the acquisition information of a dynamic image series from the
+    dicom headers of the image files. Only the headers are read, the pixel
+    data of the images is not decoded.
+    The information is stored in a dictionary object with the keys:
+    'acq_datetime'  --  The acquisition datetime of each file in a list.
+    'acq'           --  The acquisition times relative to the first file in
+                        seconds in a list.
+    'frame_dur'     --  The actual frame duration (tag 0018|1242) of each
+                        file in seconds in a list. If a file does not have the
+                        tag, the value is NaN.
+    'size', 'origin', 'spacing', 'direction'
+                    --  The geometry of the first file in the list, as
+                        returned by the corresponding SimpleITK methods.
+
+    Arguments:
+    dcm_names   --  The paths to the dicom files in order of acquisition.
+
+    Return value:
+    A dict-object with the keys described above.
+    """
+
+    acq_datetime = []
+    frame_dur = []
+    geometry: dict[str, Any] = {}
+
+    for name in dcm_names:
+        # Read header only
+        reader = colibri.read_dicom_header(name)
+
+        # Store the geometry of the first image
+        if not geometry:
+            geometry = {'size': reader.GetSize(),
+                        'origin': reader.GetOrigin(),
+                        'spacing': reader.GetSpacing(),
+                        'direction': reader.GetDirection()}
+
+        # Read acquisition time and frame duration
+        acq_datetime.append(colibri.dicom_datetime(
+            reader.GetMetaData('0008|0022'),
+            reader.GetMetaData('0008|0032')))
+        if reader.HasMetaDataKey('0018|1242'):
+            frame_dur.append(
+                float(reader.GetMetaData('0018|1242')) / 1000.0)
+        else:
+            frame_dur.append(float('nan'))
+
+    res = {'acq_datetime': acq_datetime,
+           'acq': [(dt - acq_datetime[0]).total_seconds()
+                   for dt in acq_datetime],
+           'frame_dur': frame_dur}
+    res.update(geometry)
+    return res
 
 
 def load_dynamic_series(dicom_path: str) -> dict[str, Any]:
@@ -14,75 +77,672 @@ def load_dynamic_series(dicom_path: str) -> dict[str, Any]:
     This means: result['img'][i] is acquired result['acq'][i] seconds after
     result['img'][0].
 
+    The path can also be a series cache created with
+    colibri.convert_dynamic_series.
+
     Arguments:
-    dicom_path  --  The path to the dicom files
+    dicom_path  --  The path to the dicom files (or series cache)
 
     Return value:
     A dict-object with keys 'img' (SimpleITK Images in a list) and 'acq'
     (acquisition times in seconds in a list).
     """
 
-    # Prepare reader
-    reader = sitk.ImageSeriesReader()
+    if is_series_cache(dicom_path):
+        series = load_series_cache(dicom_path)
+        return {'img': series.images(),
+                'acq': series.acq.tolist()}
 
-    # Get dicom file names in folder sorted according to acquisition time.
-    dcm_names = reader.GetGDCMSeriesFileNames(dicom_path)
+    # Get dicom file names in folder sorted according to acquisition time,
+    # and the acquisition times read from the headers only.
+    index = colibri.get_series_index(dicom_path)
 
-    img_arr = []
-    acq_arr = []
+    # Load images in order. Each image is decoded exactly once.
+    img_arr = [sitk.ReadImage(name) for name in index['files']]
 
-    # Get acquisition time of first image
-    acq0 = colibri.get_acq_datetime(dcm_names[0])
+    return {'img': img_arr,
+            'acq': index['acq']}
 
-    for name in dcm_names:
-        # Load image and read acquisition time of each image and store in list
-        img = sitk.ReadImage(name)
-        img_arr.append(img)
-        acq_arr.append((colibri.get_acq_datetime(name)-acq0).total_seconds())
 
-    return {'img': img_arr,
-            'acq': acq_arr}
+def load_dynamic_array(dicom_path: str,
+                       dtype: Any = None) -> DynamicSeries:
+    """Loads a dynamic image series into a DynamicSeries object, where the
+    images are stored in one contiguous 4D array with the shape
+    (frames, z, y, x) together with the shared geometry, the relative
+    acquisition times and the frame durations. Whole-series computations can
+    then be done as vectorized array operations.
+    The path can also be a series cache created with
+    colibri.convert_dynamic_series. In that case the array is memory-mapped
+    from the cache file instead of being loaded into memory, unless another
+    data type than the one stored in the cache is requested.
+
+    Arguments:
+    dicom_path  --  The path to the dicom files (or series cache)
+    dtype       --  The data type of the image array. Default is None, which
+                    means np.float32 for dicom files and the stored data
+                    type for a series cache.
+
+    Return value:
+    A DynamicSeries object with the images in order of acquisition time.
+    """
+
+    if is_series_cache(dicom_path):
+        series = load_series_cache(dicom_path)
+        if dtype is not None and np.dtype(dtype) != series.data.dtype:
+            series.data = series.data.astype(dtype)
+        return series
+
+    if dtype is None:
+        dtype = np.float32
+
+    # Get dicom file names in folder sorted according to acquisition time,
+    # and the acquisition information read from the headers only.
+    index = colibri.get_series_index(dicom_path)
+
+    # Allocate the 4D array once and copy every frame into it
+    size = index['size']
+    data = np.empty((len(index['files']), size[2], size[1], size[0]),
+                    dtype=dtype)
+    for i, img in enumerate(_read_frames(index['files'])):
+        data[i] = sitk.GetArrayViewFromImage(img)
+
+    return DynamicSeries(data,
+                         origin=index['origin'],
+                         spacing=index['spacing'],
+                         direction=index['direction'],
+                         acq=np.array(index['acq']),
+                         frame_dur=np.array(index['frame_dur']))
+
+
+def convert_dynamic_series(dicom_path: str,
+                           out_path: str,
+                           dtype: Any = np.float32):
+    """Convert a dynamic image series stored as dicom files into a series
+    cache: a directory holding the images in one memory-mapped 4D binary
+    array file (data.npy, with the shape (frames, z, y, x)) and a sidecar
+    file (series.json) with the acquisition times, frame durations and
+    geometry.
+    The images are decoded once, one at a time, and written directly to the
+    array file, so series larger than the memory can be converted. The cache
+    can be used in place of the dicom path in colibri.load_dynamic_series,
+    colibri.load_dynamic_array and colibri.lazy_series_roi_means, where only
+    the parts of the file that are needed are read from disk.
+
+    Arguments:
+    dicom_path  --  The path to the dicom files
+    out_path    --  The path of the cache directory to create
+    dtype       --  The data type of the stored images. Default is
+                    np.float32.
+    """
+
+    # Get dicom file names in folder sorted according to acquisition time,
+    # and the acquisition information read from the headers only.
+    index = colibri.get_series_index(dicom_path)
+
+    # Remove the sidecar of an existing cache before its array file is
+    # written again, so an interrupted conversion never looks complete
+    os.makedirs(out_path, exist_ok=True)
+    sidecar_path = os.path.join(out_path, 'series.json')
+    if os.path.exists(sidecar_path):
+        os.remove(sidecar_path)
+
+    # Write the images one at a time to the memory-mapped file
+    size = index['size']
+    data = np.lib.format.open_memmap(
+        os.path.join(out_path, 'data.npy'), mode='w+', dtype=dtype,
+        shape=(len(index['files']), size[2], size[1], size[0]))
+    for i, img in enumerate(_read_frames(index['files'])):
+        data[i] = sitk.GetArrayViewFromImage(img)
+    data.flush()
+    del data
+
+    # Write the sidecar last, and under a temporary name until it is
+    # complete, so an incomplete cache is never used
+    sidecar = {'acq': index['acq'],
+               'frame_dur': index['frame_dur'],
+               'origin': index['origin'],
+               'spacing': index['spacing'],
+               'direction': index['direction']}
+    tmp_path = sidecar_path + '.' + str(os.getpid()) + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(sidecar, f, indent=2)
+    os.replace(tmp_path, sidecar_path)
+
+
+def is_series_cache(path: str) -> bool:
+    """Check if a path is a series cache created with
+    colibri.convert_dynamic_series.
+
+    Arguments:
+    path    --  The path to check.
+
+    Return value:
+    True if the path is a series cache, otherwise False.
+    """
+
+    return (os.path.isfile(os.path.join(path, 'series.json')) and
+            os.path.isfile(os.path.join(path, 'data.npy')))
+
 
+def load_series_cache(path: str) -> DynamicSeries:
+    """Open a series cache created with colibri.convert_dynamic_series. The
+    image array is memory-mapped (read-only), so only the parts of the array
+    that are actually used are read from disk.
 
-def resample_series_to_reference(series: list[sitk.Image],
-                                 ref: sitk.Image) -> list[sitk.Image]:
+    Arguments:
+    path    --  The path to the series cache.
+
+    Return value:
+    A DynamicSeries object backed by the memory-mapped array.
+    """
+
+    with open(os.path.join(path, 'series.json')) as f:
+        sidecar = json.load(f)
+    data = np.load(os.path.join(path, 'data.npy'), mmap_mode='r')
+    return DynamicSeries(data,
+                         origin=sidecar['origin'],
+                         spacing=sidecar['spacing'],
+                         direction=sidecar['direction'],
+                         acq=np.array(sidecar['acq']),
+                         frame_dur=np.array(sidecar['frame_dur']))
+
+
+def _series_info(series_path: str) -> dict[str, Any]:
+    # Get the acquisition information of a series (see
+    # colibri.get_series_index). For a series cache the memory-mapped array
+    # is stored under the key 'data' instead of the file names under 'files'.
+
+    if is_series_cache(series_path):
+        series = load_series_cache(series_path)
+        return {'data': series.data,
+                'acq': series.acq.tolist(),
+                'frame_dur': series.frame_dur.tolist(),
+                'size': series.size(),
+                'origin': series.origin,
+                'spacing': series.spacing,
+                'direction': series.direction}
+
+    # Get dicom file names in folder sorted according to acquisition time,
+    # and the acquisition times, frame durations and geometry read from the
+    # headers only, so the pixel data of each image is only decoded once.
+    return colibri.get_series_index(series_path)
+
+
+def _series_frames(info: dict[str, Any],
+                   region: Optional[tuple[tuple[int, ...],
+                                          tuple[int, ...]]] = None,
+                   prefetch: int = 0) \
+        -> Iterator[Union[sitk.Image, np.ndarray]]:
+    # Iterate over the frames of a series in order. The frames of dicom files
+    # are SimpleITK Images, while the frames of a series cache are
+    # (memory-mapped) arrays. If a region (start, stop) in array index order
+    # (z, y, x) is given, only that region of every frame is read.
+
+    if 'data' in info:
+        for arr in info['data']:
+            if region is not None:
+                arr = arr[tuple(slice(a, b) for a, b in zip(*region))]
+            yield arr
+        return
+
+    yield from _read_frames(info['files'], prefetch, region)
+
+
+def _region_origin(info: dict[str, Any],
+                   region: tuple[tuple[int, ...], tuple[int, ...]]) \
+        -> tuple[float, ...]:
+    # The physical origin of a region (start, stop) of the series
+    header = sitk.Image([1, 1, 1], sitk.sitkUInt8)
+    header.SetOrigin(info['origin'])
+    header.SetSpacing(info['spacing'])
+    header.SetDirection(info['direction'])
+    return tuple(header.TransformIndexToPhysicalPoint(
+        [int(i) for i in region[0][::-1]]))
+
+
+def _bounding_region(voxels: Optional[np.ndarray],
+                     shape: tuple[int, ...]) \
+        -> Optional[tuple[tuple[int, ...], tuple[int, ...]]]:
+    # The smallest region (start, stop) in array index order containing the
+    # given flat voxel indices of an array with the given shape. None is
+    # returned if the region is the whole array.
+    if voxels is None or len(voxels) == 0:
+        return None
+    idx = np.unravel_index(voxels, shape)
+    start = tuple(int(np.min(i)) for i in idx)
+    stop = tuple(int(np.max(i)) + 1 for i in idx)
+    if start == (0,) * len(shape) and stop == tuple(shape):
+        return None
+    return start, stop
+
+
+def _crop_indices(voxels: np.ndarray,
+                  shape: tuple[int, ...],
+                  region: tuple[tuple[int, ...], tuple[int, ...]]) \
+        -> np.ndarray:
+    # Translate flat voxel indices of an array with the given shape to flat
+    # indices in the region (start, stop) of the array. Voxels outside the
+    # region (or with negative indices) get the index -1.
+    valid = voxels >= 0
+    idx = np.unravel_index(np.where(valid, voxels, 0), shape)
+    crop_shape = tuple(b - a for a, b in zip(*region))
+    crop_idx = []
+    for i, a, n in zip(idx, region[0], crop_shape):
+        i = i - a
+        valid &= (i >= 0) & (i < n)
+        crop_idx.append(np.clip(i, 0, n - 1))
+    res = np.ravel_multi_index(tuple(crop_idx), crop_shape)
+    return np.where(valid, res, -1)
+
+
+def _as_image(frame: Union[sitk.Image, np.ndarray],
+              info: dict[str, Any]) -> sitk.Image:
+    # Get a frame from _open_series as a SimpleITK Image
+    if isinstance(frame, sitk.Image):
+        return frame
+    img = sitk.GetImageFromArray(frame)
+    img.SetOrigin(info['origin'])
+    img.SetSpacing(info['spacing'])
+    img.SetDirection(info['direction'])
+    return img
+
+
+def _as_array(frame: Union[sitk.Image, np.ndarray]) -> np.ndarray:
+    # Get a frame from _open_series as an array without copying
+    if isinstance(frame, sitk.Image):
+        return sitk.GetArrayViewFromImage(frame)
+    return frame
+
+
+def _read_frame(name: str,
+                region: Optional[tuple[tuple[int, ...],
+                                       tuple[int, ...]]] = None) -> sitk.Image:
+    # Read an image file. If a region (start, stop) in array index order
+    # (z, y, x) is given, only that region is extracted, which the reader
+    # can do without decoding the whole image for formats that support it.
+    if region is None:
+        return sitk.ReadImage(name)
+    reader = sitk.ImageFileReader()
+    reader.SetFileName(name)
+    reader.SetExtractIndex([int(a) for a in region[0][::-1]])
+    reader.SetExtractSize([int(b - a) for a, b in zip(*region)][::-1])
+    img: sitk.Image = reader.Execute()
+    return img
+
+
+def _read_frames(file_names: list[str],
+                 prefetch: int = 0,
+                 region: Optional[tuple[tuple[int, ...],
+                                        tuple[int, ...]]] = None) \
+        -> Iterator[sitk.Image]:
+    # Read the images one at a time in order. If prefetch is positive, the
+    # next prefetch images are read on a thread pool while the current image
+    # is being processed, so at most prefetch images are held in memory
+    # besides the current one. If a region is given, only that region of
+    # each image is read (see _read_frame).
+
+    if prefetch <= 0:
+        for name in file_names:
+            yield _read_frame(name, region)
+        return
+
+    with ThreadPoolExecutor(max_workers=prefetch) as executor:
+        names = iter(file_names)
+        pending: deque[Future[sitk.Image]] = deque(
+            executor.submit(_read_frame, name, region)
+            for name in islice(names, prefetch))
+        while pending:
+            img = pending.popleft().result()
+            # Replace the image taken from the queue with the next one
+            next_name = next(names, None)
+            if next_name is not None:
+                pending.append(
+                    executor.submit(_read_frame, next_name, region))
+            yield img
+
+
+class _ResampleMap:
+    """Precomputed nearest-neighbour mapping from the space of an image to
+    the space of a reference image. All frames of a dynamic series share the
+    same geometry, so the mapping is computed once, and every frame is then
+    resampled with a single fancy-indexing gather.
+    The mapping is found by resampling an image of voxel indices with
+    SimpleITK, so the result is identical to nearest-neighbour resampling
+    with sitk.ResampleImageFilter. Reference voxels outside the image get the
+    value 0.
+    """
+
+    __slots__ = ('nn_map', 'ref', 'img_shape')
+
+    def __init__(self, size: tuple[int, ...],
+                 origin: tuple[float, ...],
+                 spacing: tuple[float, ...],
+                 direction: tuple[float, ...],
+                 ref: sitk.Image):
+        # Image of the flat voxel indices in the image space
+        n_voxels = int(np.prod(size))
+        dtype = np.int32 if n_voxels < 2**31 else np.int64
+        index_img = sitk.GetImageFromArray(
+            np.arange(n_voxels, dtype=dtype).reshape(size[::-1]))
+        index_img.SetOrigin(origin)
+        index_img.SetSpacing(spacing)
+        index_img.SetDirection(direction)
+
+        # Resample the indices to the reference space. Voxels outside the
+        # image get the index -1.
+        resampler = sitk.ResampleImageFilter()
+        resampler.SetReferenceImage(ref)
+        resampler.SetInterpolator(sitk.sitkNearestNeighbor)
+        resampler.SetDefaultPixelValue(-1)
+
+        # For every reference voxel the flat index of the nearest image voxel
+        self.nn_map = sitk.GetArrayFromImage(
+            resampler.Execute(index_img)).ravel()
+        self.ref = ref
+        self.img_shape = tuple(size[::-1])
+
+    def crop(self, region: tuple[tuple[int, ...], tuple[int, ...]]):
+        # Make the mapping refer to a region (start, stop) of the image
+        # instead of the whole image. Reference voxels mapping to image
+        # voxels outside the region get the value 0.
+        self.nn_map = _crop_indices(self.nn_map, self.img_shape, region)
+        self.img_shape = tuple(b - a for a, b in zip(*region))
+
+    def apply(self, arr: np.ndarray) -> np.ndarray:
+        # Resample an image array (or a 4D array of frames) to the reference
+        # space
+        n_frames = arr.shape[:-3]
+        # Append a zero to the voxel values, so the index -1 of voxels
+        # outside the image gathers the value 0
+        values = np.concatenate(
+            (arr.reshape(n_frames + (-1,)),
+             np.zeros(n_frames + (1,), dtype=arr.dtype)), axis=-1)
+        res = np.take(values, self.nn_map, axis=-1)
+        return res.reshape(n_frames + self.ref.GetSize()[::-1])
+
+    def image(self, arr: np.ndarray) -> sitk.Image:
+        # Resample an image array to a SimpleITK Image in the reference space
+        img = sitk.GetImageFromArray(self.apply(arr))
+        img.CopyInformation(self.ref)
+        return img
+
+
+def resample_series_to_reference(
+        series: Union[list[sitk.Image], DynamicSeries],
+        ref: sitk.Image) -> Union[list[sitk.Image], DynamicSeries]:
     """Resample each image in an image series to the same physical space as
     a reference image. The pixel values in the resampled images will be
     interpolated according to the nearest-neighbour principle.
+    The nearest-neighbour mapping between the two spaces is computed once
+    and reused for every image sharing the same geometry, so each image is
+    resampled with a single array gather. If the series is a DynamicSeries,
+    all frames are resampled with a single array operation.
 
     Arguments:
-    series  --  The image series.
+    series  --  The image series (a list of images or a DynamicSeries).
     ref     --  The reference image.
 
     Return value:
-    A list containing each resampled image in the same order.
+    A list containing each resampled image in the same order, or a
+    DynamicSeries in the space of the reference image if the series is a
+    DynamicSeries.
+    """
+
+    if isinstance(series, DynamicSeries):
+        resample_map = _ResampleMap(series.size(), series.origin,
+                                    series.spacing, series.direction, ref)
+        return DynamicSeries(resample_map.apply(series.data),
+                             origin=ref.GetOrigin(),
+                             spacing=ref.GetSpacing(),
+                             direction=ref.GetDirection(),
+                             acq=series.acq,
+                             frame_dur=series.frame_dur)
+
+    # Compute the mapping once for every distinct image geometry
+    maps: dict[tuple[Any, ...], _ResampleMap] = {}
+    res = []
+    for img in series:
+        geometry = (img.GetSize(), img.GetOrigin(), img.GetSpacing(),
+                    img.GetDirection())
+        if geometry not in maps:
+            maps[geometry] = _ResampleMap(*geometry, ref)
+        res.append(maps[geometry].image(sitk.GetArrayViewFromImage(img)))
+    return res
+
+
+def _quantile(stat: str) -> float:
+    # The quantile (0-1) of a statistic name 'median' or 'pXX'
+    if stat == 'median':
+        return 0.5
+    return float(stat[1:]) / 100
+
+
+def _parse_stats(stats: Optional[list[str]]) -> list[str]:
+    # Check a list of ROI statistics names (see lazy_series_roi_means)
+    if stats is None:
+        return []
+    res = []
+    for stat in stats:
+        stat = stat.strip()
+        if stat in ['mean', '']:
+            # The mean is always computed
+            continue
+        if stat not in ['std', 'count', 'sum', 'min', 'max', 'median']:
+            try:
+                valid = stat[0] == 'p' and 0 <= _quantile(stat) <= 1
+            except ValueError:
+                valid = False
+            if not valid:
+                raise ValueError("Unknown ROI statistic " + stat + ".")
+        if stat not in res:
+            res.append(stat)
+    return res
+
+
+class _LabelIndex:
+    """Precomputed voxel indices of a ROI labelmap, used to compute the mean
+    image value of every label in a single vectorized operation.
+    The labelmap is converted to a NumPy array once, and every voxel is
+    assigned the position of its label in the sorted list of labels. The
+    per-label sums of an image are then found with one weighted np.bincount
+    over the flattened image array.
     """
 
-    resampler = sitk.ResampleImageFilter()
-    resampler.SetReferenceImage(ref)
-    resampler.SetInterpolator(sitk.sitkNearestNeighbor)
-    return [resampler.Execute(img) for img in series]
+    __slots__ = ('labels', 'voxels', 'inverse', 'counts', 'shape',
+                 'outside')
+
+    def __init__(self, roi: sitk.Image, ignore: Optional[list[str]] = None):
+        roi_arr = sitk.GetArrayViewFromImage(roi).ravel()
+        self.shape = roi.GetSize()[::-1]
+
+        labels, inverse = np.unique(roi_arr, return_inverse=True)
+
+        # Only keep the voxels of labels that are not ignored
+        self.voxels: Optional[np.ndarray] = None
+        if ignore:
+            keep = np.array([str(label) not in ignore for label in labels],
+                            dtype=bool)
+            if not np.all(keep):
+                self.voxels = np.flatnonzero(keep[inverse])
+                labels, inverse = np.unique(roi_arr[self.voxels],
+                                            return_inverse=True)
+
+        self.labels = labels
+        self.inverse = inverse.ravel()
+        self.counts = np.bincount(self.inverse, minlength=len(labels))
+        self.outside: Optional[np.ndarray] = None
+
+    def remap(self, resample_map: _ResampleMap):
+        # Make the index refer to the voxels of the image that is resampled
+        # to the ROI space by resample_map, so the means can be computed
+        # directly from the image array without resampling it first. ROI
+        # voxels outside the image have the value 0: they are left out of
+        # the sums but still counted.
+        voxels = self.voxels
+        if voxels is None:
+            voxels = np.arange(len(self.inverse))
+        source = resample_map.nn_map[voxels]
+        inside = source >= 0
+        self.voxels = source[inside]
+        self.inverse = self.inverse[inside]
+        self.shape = resample_map.img_shape
+        if not np.all(inside):
+            self.outside = self.counts - np.bincount(
+                self.inverse, minlength=len(self.labels))
+
+    def crop(self, region: tuple[tuple[int, ...], tuple[int, ...]]):
+        # Make the index refer to a region (start, stop) of the image that
+        # contains all voxels of the index
+        if self.voxels is None:
+            self.voxels = np.arange(len(self.inverse))
+        self.voxels = _crop_indices(self.voxels, self.shape, region)
+        self.shape = tuple(b - a for a, b in zip(*region))
 
+    def _check_shape(self, shape: tuple[int, ...]):
+        if shape != self.shape:
+            raise ValueError("Image of size " + str(shape[::-1]) +
+                             " does not match the ROI size " +
+                             str(self.shape[::-1]) + ".")
 
-def series_roi_means(series: list[sitk.Image],
-                     roi: sitk.Image) -> dict[int, list[float]]:
+    def means(self, arr: np.ndarray) -> np.ndarray:
+        # Mean image value of every label, in the order of self.labels
+        self._check_shape(arr.shape)
+        values = arr.ravel()
+        if self.voxels is not None:
+            values = values[self.voxels]
+        sums = np.bincount(self.inverse, weights=values,
+                           minlength=len(self.labels))
+        return sums / self.counts
+
+    def stats(self, arr: np.ndarray,
+              stats: list[str]) -> dict[str, np.ndarray]:
+        # Statistics (see _parse_stats) of the image values of every label,
+        # in the order of self.labels. All statistics are computed from the
+        # same gathered voxel values.
+        self._check_shape(arr.shape)
+        values = arr.ravel()
+        if self.voxels is not None:
+            values = values[self.voxels]
+        values = values.astype(np.float64)
+        inverse = self.inverse
+        if self.outside is not None:
+            # ROI voxels outside the image have the value 0
+            inverse = np.concatenate(
+                [inverse, np.repeat(np.arange(len(self.labels)),
+                                    self.outside)])
+            values = np.concatenate([values, np.zeros(len(inverse) -
+                                                      len(values))])
+        n = len(self.labels)
+        sums = np.bincount(inverse, weights=values, minlength=n)
+
+        res: dict[str, np.ndarray] = {}
+        sorted_values = None
+        for stat in stats:
+            if stat == 'count':
+                res[stat] = self.counts.astype(np.float64)
+            elif stat == 'sum':
+                res[stat] = sums
+            elif stat == 'std':
+                # Sample standard deviation, as in SimpleITK
+                dev = values - (sums / self.counts)[inverse]
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    res[stat] = np.sqrt(
+                        np.bincount(inverse, weights=dev * dev,
+                                    minlength=n) / (self.counts - 1))
+            else:
+                if sorted_values is None:
+                    # Sort the values by label and then by value. Each label
+                    # is then a segment of the sorted values.
+                    sorted_values = values[np.lexsort((values, inverse))]
+                    starts = np.concatenate(
+                        [[0], np.cumsum(self.counts)[:-1]])
+                if stat == 'min':
+                    res[stat] = sorted_values[starts]
+                elif stat == 'max':
+                    res[stat] = sorted_values[starts + self.counts - 1]
+                else:
+                    # Quantile with linear interpolation, as in np.quantile
+                    pos = _quantile(stat) * (self.counts - 1)
+                    lower = np.floor(pos).astype(np.int64)
+                    upper = np.ceil(pos).astype(np.int64)
+                    a = sorted_values[starts + lower]
+                    b = sorted_values[starts + upper]
+                    res[stat] = a + (b - a) * (pos - lower)
+        return res
+
+    def series_means(self, data: np.ndarray) -> np.ndarray:
+        # Mean image values of every label in every frame of a 4D array. The
+        # result has the shape (frames, labels).
+        self._check_shape(data.shape[1:])
+        values = data.reshape(data.shape[0], -1)
+        if self.voxels is not None:
+            values = values[:, self.voxels]
+        # The per-label sums of all frames are found as a single product
+        # with the sparse (voxels, labels) indicator matrix of the labels.
+        indicator = scipy.sparse.csr_matrix(
+            (np.ones(len(self.inverse)),
+             (np.arange(len(self.inverse)), self.inverse)),
+            shape=(len(self.inverse), len(self.labels)))
+        sums = np.asarray((indicator.T @ values.T).T, dtype=np.float64)
+        return sums / self.counts
+
+
+def _check_engine(engine: str):
+    # Check the name of an engine computing ROI means
+    if engine not in ('sitk', 'numpy'):
+        raise ValueError("Unknown ROI means engine '" + str(engine) +
+                         "', expected 'sitk' or 'numpy'.")
+
+
+def series_roi_means(series: Union[list[sitk.Image], DynamicSeries],
+                     roi: sitk.Image,
+                     engine: str = 'sitk') -> dict[int, list[float]]:
     """Compute mean image values in a ROI set.
     This function computes the mean image values in a given ROI for every time
     point in the dynamic series.
     The ROI and image should be in the same physical space. The ROI is treated
     as a labelmap with each label value being treated as a seperate ROI.
 
+    The means can be computed by two engines: 'sitk' runs a SimpleITK
+    LabelStatisticsImageFilter on every image, while 'numpy' converts the ROI
+    to an array of voxel indices once and computes the means of all labels
+    with a single vectorized sum per image. Both engines give the same means,
+    but the 'numpy' engine is much faster for ROIs with many labels.
+    If the series is a DynamicSeries, the 'numpy' engine computes the means
+    of all labels in all frames in a single array operation.
+
     Arguments:
-    dyn --  The dynamic image series of interes
-    roi --  The ROI labelmap image
+    dyn     --  The dynamic image series of interes (a list of images or a
+                DynamicSeries)
+    roi     --  The ROI labelmap image
+    engine  --  The engine used to compute the means, either 'sitk' (default)
+                or 'numpy'.
 
     Return value:
     A dict object with ROI labels as keys and a list with ROI mean values for
     every time point in the dynamic series as values.
     """
 
+    _check_engine(engine)
     res = defaultdict(list)
 
+    if engine == 'numpy':
+        # Precompute the voxel indices of every label once
+        index = _LabelIndex(roi)
+        if isinstance(series, DynamicSeries):
+            means = index.series_means(series.data)
+            for j, label in enumerate(index.labels):
+                res[int(label)] = means[:, j].tolist()
+            return res
+        for img in series:
+            arr = sitk.GetArrayViewFromImage(img)
+            for label, mean in zip(index.labels, index.means(arr)):
+                res[int(label)].append(float(mean))
+        return res
+
+    if isinstance(series, DynamicSeries):
+        series = series.images()
+
     # Get the number of time points in the dynamic series
     n_frames = len(series)
 
@@ -90,23 +750,235 @@ def series_roi_means(series: list[sitk.Image],
 
     for i in range(n_frames):
 
-        # Get label stats for the i'th image in the series for all labels
+        # Get label stats for the i'th image in the series for all labels.
+        # The labels are sorted, as in the 'numpy' engine.
         label_stats_filter.Execute(series[i], roi)
 
-        for label in label_stats_filter.GetLabels():
+        for label in sorted(label_stats_filter.GetLabels()):
             # Append the mean value to the list for each label.
             res[label].append(label_stats_filter.GetMean(label))
 
     return res
 
 
+class _RoiSet:
+    """The precomputed state of one ROI set in lazy_series_multi_roi_means:
+    the ROI (resampled to the image space if chosen), the voxel indices of
+    its labels, the resampling mapping from the image space to the ROI space
+    and the table of results.
+    """
+
+    __slots__ = ('roi', 'resample', 'labels', 'ignore', 'stats', 'index',
+                 'resample_map', 'res')
+
+    def __init__(self, info: dict[str, Any],
+                 roi_path: str,
+                 resample: Optional[str] = None,
+                 labels: Optional[dict[str, str]] = None,
+                 ignore: Optional[list[str]] = None,
+                 frame_dur: bool = False,
+                 stats: Optional[list[str]] = None):
+
+        # Input sanitation: if no label substitution is needed, the argument
+        # is just an empty dict
+        if labels is None:
+            labels = {}
+
+        # Input sanitation: if no ignoring is needed, the argument is
+        # just an empty list
+        if ignore is None:
+            ignore = []
+
+        self.resample = resample
+        self.labels = labels
+        self.ignore = ignore
+        self.stats = _parse_stats(stats)
+
+        self.res: dict[str, list[float]] = defaultdict(list)
+        self.res['tacq'] = list(info['acq'])
+        if frame_dur:
+            self.res['frame_dur'] = list(info['frame_dur'])
+
+        # Read ROI image
+        roi = sitk.ReadImage(roi_path)
+
+        # Resample ROI if chosen
+        if resample == 'roi':
+            resampler = sitk.ResampleImageFilter()
+            resampler.SetSize(info['size'])
+            resampler.SetOutputOrigin(info['origin'])
+            resampler.SetOutputSpacing(info['spacing'])
+            resampler.SetOutputDirection(info['direction'])
+            resampler.SetInterpolator(sitk.sitkNearestNeighbor)
+            roi = resampler.Execute(roi)
+        self.roi = roi
+
+        # Precompute the nearest-neighbour mapping from the image space to
+        # the ROI space once, if the images should be resampled
+        self.resample_map: Optional[_ResampleMap] = None
+        if resample == 'img':
+            self.resample_map = _ResampleMap(info['size'], info['origin'],
+                                             info['spacing'],
+                                             info['direction'], roi)
+
+        # Precompute the voxel indices of every label. The resampling mapping
+        # is applied to the voxel indices, so they refer to the image voxels
+        # that are needed to compute the means.
+        self.index = _LabelIndex(roi, ignore)
+        if self.resample_map is not None:
+            self.index.remap(self.resample_map)
+
+    def crop(self, region: tuple[tuple[int, ...], tuple[int, ...]]):
+        # Make the ROI set refer to a region (start, stop) of the images,
+        # which contains all needed image voxels of the ROI set
+        self.index.crop(region)
+        if self.resample_map is not None:
+            self.resample_map.crop(region)
+        else:
+            self.roi = sitk.RegionOfInterest(
+                self.roi, [b - a for a, b in zip(*region)][::-1],
+                [int(a) for a in region[0][::-1]])
+
+    def add_frame(self, frame: Union[sitk.Image, np.ndarray],
+                  frame_info: dict[str, Any],
+                  engine: str,
+                  label_stats_filter: sitk.LabelStatisticsImageFilter):
+        # Compute the ROI means (and other statistics) of a frame and append
+        # them to the results
+        self.add_means(frame, frame_info, engine, label_stats_filter)
+
+        # Compute the other statistics of all labels from the same voxel
+        # values
+        if self.stats:
+            res = self.index.stats(_as_array(frame), self.stats)
+            for stat in self.stats:
+                for label, value in zip(self.index.labels, res[stat]):
+                    name = self.labels.get(str(label), str(label))
+                    self.res[name + '_' + stat].append(float(value))
+
+    def add_means(self, frame: Union[sitk.Image, np.ndarray],
+                  frame_info: dict[str, Any],
+                  engine: str,
+                  label_stats_filter: sitk.LabelStatisticsImageFilter):
+        # Compute the ROI means of a frame and append them to the results
+
+        if engine == 'numpy':
+            # Compute the means of all labels at once
+            for label, mean in zip(self.index.labels,
+                                   self.index.means(_as_array(frame))):
+                self.res[self.labels.get(str(label), str(label))].append(
+                    float(mean))
+            return
+
+        # Resample image if chosen
+        if self.resample_map is not None:
+            img = self.resample_map.image(_as_array(frame))
+        else:
+            img = _as_image(frame, frame_info)
+
+        # Apply label stats filter and read ROI means. The labels are sorted,
+        # as in the 'numpy' engine.
+        label_stats_filter.Execute(img, self.roi)
+        for label in sorted(label_stats_filter.GetLabels()):
+            if str(label) in self.ignore:
+                continue
+            # Append the mean value to the list for each label.
+            self.res[self.labels.get(str(label), str(label))].append(
+                label_stats_filter.GetMean(label))
+
+
+def lazy_series_multi_roi_means(series_path: str,
+                                roi_sets: list[dict[str, Any]],
+                                frame_dur: bool = False,
+                                prefetch: int = 0,
+                                engine: str = 'sitk')\
+        -> dict[str, Table]:
+    """Do a lazy calculation of mean image values in several ROI sets (e.g.
+    segmentations of the same study by different raters) in a single pass
+    over the image series. Each image is read once and the means of all ROI
+    sets are computed from it, before the next image is loaded. See
+    colibri.lazy_series_roi_means for details.
+    Each ROI set is described by a dict-object with the keys:
+    'roi_path'  --  The path to the ROI file.
+    'name'      --  The name of the result table of the ROI set.
+    'resample'  --  The resampling strategy (None, 'roi' or 'img'). OPTIONAL.
+    'labels'    --  Dictionary of label substitutions. OPTIONAL.
+    'ignore'    --  List of labels to ignore. OPTIONAL.
+    'stats'     --  List of statistics besides the mean. OPTIONAL.
+    Only the bounding box of the image voxels needed by any of the ROI sets
+    is read from each frame.
+
+    Arguments:
+    series_path --  The path to the images series dicom files (or series
+                    cache)
+    roi_sets    --  A list of ROI set descriptions (see above).
+    frame_dur   --  If True, the output tables will contain the frame
+                    duration under the key 'frame_dur'. Default is false.
+    prefetch    --  The number of images to read ahead on a thread pool.
+                    Default is 0 (no prefetching).
+    engine      --  The engine used to compute the means, either 'sitk'
+                    (default) or 'numpy'. See colibri.series_roi_means.
+
+    Return value:
+    A dict object with the name of each ROI set as keys and its result table
+    (as returned by colibri.lazy_series_roi_means) as values.
+    """
+
+    _check_engine(engine)
+
+    # Get the acquisition information of the series
+    info = _series_info(series_path)
+
+    # Prepare every ROI set
+    sets = [_RoiSet(info,
+                    roi_set['roi_path'],
+                    resample=roi_set.get('resample'),
+                    labels=roi_set.get('labels'),
+                    ignore=roi_set.get('ignore'),
+                    frame_dur=frame_dur,
+                    stats=roi_set.get('stats'))
+            for roi_set in roi_sets]
+
+    # Only the bounding box of the image voxels needed by any ROI set is
+    # read from each frame, and all further computations are done on this
+    # region.
+    img_shape = tuple(info['size'][::-1])
+    region: Optional[tuple[tuple[int, ...], tuple[int, ...]]] = None
+    regions = [_bounding_region(roi_set.index.voxels, img_shape)
+               for roi_set in sets]
+    if all(r is not None for r in regions):
+        region = (tuple(min(r[0][i] for r in regions if r is not None)
+                        for i in range(len(img_shape))),
+                  tuple(max(r[1][i] for r in regions if r is not None)
+                        for i in range(len(img_shape))))
+    frame_info = info
+    if region is not None:
+        for roi_set in sets:
+            roi_set.crop(region)
+        frame_info = dict(info, origin=_region_origin(info, region))
+
+    # Prepare label statistics filter
+    label_stats_filter = sitk.LabelStatisticsImageFilter()
+
+    # Load images in order, and compute the means of every ROI set
+    for frame in _series_frames(info, region, prefetch):
+        for roi_set in sets:
+            roi_set.add_frame(frame, frame_info, engine, label_stats_filter)
+
+    return {roi_set['name']: Table(s.res)
+            for roi_set, s in zip(roi_sets, sets)}
+
+
 def lazy_series_roi_means(series_path: str,
                           roi_path: str,
                           resample: Optional[str] = None,
                           labels: Optional[dict[str, str]] = None,
                           ignore: Optional[list[str]] = None,
-                          frame_dur: bool = False)\
-        -> dict[str, list[float]]:
+                          frame_dur: bool = False,
+                          prefetch: int = 0,
+                          engine: str = 'sitk',
+                          stats: Optional[list[str]] = None)\
+        -> Table:
     """Do a lazy calculation of mean image values in a ROI. Lazy in this
     context means that the images are loaded one at a time and the mean values
     computed, before the image is removed from memory and the next image is
@@ -118,14 +990,30 @@ def lazy_series_roi_means(series_path: str,
     set resample='roi', and to resample the images to the ROI space use
     resample='img'. In either case the resampling is done using
     nearest-neighbour values.
-    The function returns a dictionary object. The keys in the object are
-    'tacq' which stores a list of acquisition times (relative to the first
-    image) and the labels of the ROI (integers) (see the keyword argument
+    The function returns a Table (used like a dictionary object). The keys in
+    the table are 'tacq' which stores the acquisition times (relative to the
+    first image) and the labels of the ROI (see the keyword argument
     'labels' for options). Other keys are also available, see argument list
     below.
 
+    The series can also be a series cache created with
+    colibri.convert_dynamic_series, in which case the frames are
+    memory-mapped instead of decoded.
+    Only the bounding box of the image voxels needed for the labels that are
+    not ignored is read from each frame, and all resampling and statistics
+    are computed on this region. If the labels cover a small part of the
+    field of view (e.g. when the background label is ignored), this saves
+    both reading and computation time.
+    Other statistics of the image values in each label than the mean can be
+    computed in the same pass over the series with the stats argument. The
+    allowed statistics are 'std' (sample standard deviation), 'count'
+    (number of voxels), 'sum', 'min', 'max', 'median' and quantiles given as
+    a percentage with the prefix 'p' (e.g. 'p5' or 'p95'). The values of a
+    statistic are stored under the key '<label>_<statistic>', e.g. '1_std'.
+
     Arguments:
-    series_path --  The path to the images series dicom files
+    series_path --  The path to the images series dicom files (or series
+                    cache)
     roi_path    --  The path to the ROI dicom files
     resample    --  The resampling strategy. Allowed values are None (no
                     resampling, default value), 'roi' (resample ROI to image
@@ -142,74 +1030,30 @@ def lazy_series_roi_means(series_path: str,
                     duration as well as its acquisition time. The frame
                     duration will be stored under the key 'frame_dur' and
                     output in seconds. Default is false.
+    prefetch    --  The number of images to read ahead on a thread pool while
+                    the current image is being processed. At most this number
+                    of images is held in memory besides the current image.
+                    Default is 0 (no prefetching).
+    engine      --  The engine used to compute the means, either 'sitk'
+                    (default) or 'numpy'. See colibri.series_roi_means.
+    stats       --  List of statistics to compute besides the mean (see
+                    above). Default is None (only means).
 
     Return value:
-    A dict object with ROI labels as keys and a list with ROI mean values for
+    A Table with ROI labels as keys and an array with ROI mean values for
     every time point in the dynamic series as values. Furthermore, the
-    acquisition times are stored in a list under the key 'tacq'.
+    acquisition times are stored under the key 'tacq'.
     """
 
-    # Input sanitation: if no label substitution is needed, the argument is
-    # just an empty dict
-    if labels is None:
-        labels = {}
-
-    # Input sanitation: if no ignoring is needed, the argument is
-    # just an empty list
-    if ignore is None:
-        ignore = []
-
-    res: dict[str, list[float]] = defaultdict(list)
-
-    # Prepare series reader
-    reader = sitk.ImageSeriesReader()
-
-    # Get dicom file names in folder sorted according to acquisition time.
-    dcm_names = reader.GetGDCMSeriesFileNames(series_path)
-
-    # Read ROI image
-    roi = sitk.ReadImage(roi_path)
-
-    # Resample ROI if chosen
-    if resample == 'roi':
-        resampler = sitk.ResampleImageFilter()
-        resampler.SetReferenceImage(sitk.ReadImage(dcm_names[0]))
-        resampler.SetInterpolator(sitk.sitkNearestNeighbor)
-        roi = resampler.Execute(roi)
-
-    # Prepare label statistics filter
-    label_stats_filter = sitk.LabelStatisticsImageFilter()
-
-    # Get acquisition time of first image
-    acq0 = colibri.get_acq_datetime(dcm_names[0])
-
-    for name in dcm_names:
-        # Load images in order
-        img = sitk.ReadImage(name)
-
-        # Resample image if chosen
-        if resample == 'img':
-            resampler = sitk.ResampleImageFilter()
-            resampler.SetReferenceImage(roi)
-            resampler.SetInterpolator(sitk.sitkNearestNeighbor)
-            img = resampler.Execute(img)
-
-        # Find acquisition time and store in list
-        res['tacq'].append(
-            (colibri.get_acq_datetime(name) - acq0).total_seconds())
-
-        # Read frame duration if required
-        if frame_dur:
-            actual_frame_dur_ms = img.GetMetaData('0018|1242')
-            res['frame_dur'].append(float(actual_frame_dur_ms) / 1000.0)
-
-        # Apply label stats filter and read ROI means
-        label_stats_filter.Execute(img, roi)
-        for label in label_stats_filter.GetLabels():
-            if str(label) in ignore:
-                continue
-            # Append the mean value to the list for each label.
-            res[labels.get(str(label), str(label))].append(
-                label_stats_filter.GetMean(label))
-
-    return res
+    res = lazy_series_multi_roi_means(
+        series_path,
+        [{'roi_path': roi_path,
+          'name': 'res',
+          'resample': resample,
+          'labels': labels,
+          'ignore': ignore,
+          'stats': stats}],
+        frame_dur=frame_dur,
+        prefetch=prefetch,
+        engine=engine)
+    return res['res']
@@ -1,6 +1,7 @@
 """Defines the models that can be used for fitting time activity curves
 """
 
+from .input_function import *  # noqa
 from .patlak import *  # noqa
 from .step import *  # noqa
 from .step2 import *  # noqa
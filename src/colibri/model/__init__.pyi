@@ -1,34 +1,117 @@
+import numpy as np
+from typing import Optional, Union
+
+# From input_function.py
+
+class InputFunction:
+    t: np.ndarray
+    values: np.ndarray
+    cumulative: np.ndarray
+    def __init__(self, t: Union[list[float], np.ndarray],
+                 values: Union[list[float], np.ndarray]) -> None: ...
+    def __len__(self) -> int: ...
+    def __call__(self, x: Union[float, list[float], np.ndarray]) \
+        -> np.ndarray: ...
+    def integral(self, x: Union[float, list[float], np.ndarray]) \
+        -> np.ndarray: ...
+    def grid(self, grid_step: float) -> np.ndarray: ...
+
 # From model.py
 
-def model_step(t: list[float], in_func: list[float],
+def model_step(t: list[float],
+               in_func: Union[list[float], InputFunction],
                amp: float, extent: float) -> list[float]: ...
 
+def model_step_jac(t: list[float],
+                   in_func: Union[list[float], InputFunction],
+                   amp: float, extent: float) -> np.ndarray: ...
+
+def model_step_quad(t: list[float],
+                    in_func: Union[list[float], InputFunction],
+                    amp: float, extent: float) -> list[float]: ...
+
 def model_step_2(t: list[float],
-                 in_func: list[float],
+                 in_func: Union[list[float], InputFunction],
                  amp1: float,
                  extent1: float,
                  amp2: float,
                  extent2: float) -> list[float]: ...
 
+def model_step_2_jac(t: list[float],
+                     in_func: Union[list[float], InputFunction],
+                     amp1: float,
+                     extent1: float,
+                     amp2: float,
+                     extent2: float) -> np.ndarray: ...
+
+def model_step_2_quad(t: list[float],
+                      in_func: Union[list[float], InputFunction],
+                      amp1: float,
+                      extent1: float,
+                      amp2: float,
+                      extent2: float) -> list[float]: ...
+
 def model_step_fermi(t: list[float],
-                     in_func: list[float],
+                     in_func: Union[list[float], InputFunction],
                      amp1: float,
                      extent1: float,
                      amp2: float,
                      extent2: float,
-                     width2: float) -> list[float]: ...
+                     width2: float,
+                     grid_step: Optional[float] = ...) -> list[float]: ...
+
+def model_step_fermi_jac(t: list[float],
+                         in_func: Union[list[float], InputFunction],
+                         amp1: float,
+                         extent1: float,
+                         amp2: float,
+                         extent2: float,
+                         width2: float,
+                         grid_step: Optional[float] = ...) -> np.ndarray: ...
+
+def model_step_fermi_quad(t: list[float],
+                          in_func: Union[list[float], InputFunction],
+                          amp1: float,
+                          extent1: float,
+                          amp2: float,
+                          extent2: float,
+                          width2: float) -> list[float]: ...
 
 def model_fermi_2(t: list[float],
-                  in_func: list[float],
+                  in_func: Union[list[float], InputFunction],
                   amp1: float,
                   extent1: float,
                   width1: float,
                   amp2: float,
                   extent2: float,
-                  width2: float) -> list[float]: ...
+                  width2: float,
+                  grid_step: Optional[float] = ...) -> list[float]: ...
+
+def model_fermi_2_jac(t: list[float],
+                      in_func: Union[list[float], InputFunction],
+                      amp1: float,
+                      extent1: float,
+                      width1: float,
+                      amp2: float,
+                      extent2: float,
+                      width2: float,
+                      grid_step: Optional[float] = ...) -> np.ndarray: ...
+
+def model_fermi_2_quad(t: list[float],
+                       in_func: Union[list[float], InputFunction],
+                       amp1: float,
+                       extent1: float,
+                       width1: float,
+                       amp2: float,
+                       extent2: float,
+                       width2: float) -> list[float]: ...
 
 def model_patlak(t: list[float],
-                 in_func: list[float],
+                 in_func: Union[list[float], InputFunction],
                  k1: float,
                  v0: float) -> list[float]: ...
 
+def model_patlak_jac(t: list[float],
+                     in_func: Union[list[float], InputFunction],
+                     k1: float,
+                     v0: float) -> np.ndarray: ...
@@ -0,0 +1,126 @@
+import numpy as np
+from typing import Union
+
+
+class InputFunction:
+    """A sampled input function, prepared for repeated model evaluations.
+    The input function is interpolated linearly between the sampled points
+    and is constant outside them (as in numpy.interp). Everything that only
+    depends on the input function is computed once, when the object is
+    created or first needed: the interpolation slopes, the cumulative
+    integral at the sample points and the resampling onto uniform grids.
+    All models in colibri.model accept an InputFunction in place of the list
+    of input function samples. When fitting a model, the InputFunction
+    should be created once before the fit, so each model evaluation only
+    computes what depends on the model parameters.
+    The attributes are:
+    t           --  The time points of the samples in an array.
+    values      --  The input function samples in an array.
+    cumulative  --  The integral of the input function from the first time
+                    point to each time point in an array.
+    """
+
+    __slots__ = ('t', 'values', 'cumulative', '_slope', '_grids')
+
+    def __init__(self, t: Union[list[float], np.ndarray],
+                 values: Union[list[float], np.ndarray]):
+        self.t = np.asarray(t, dtype=np.float64)
+        self.values = np.asarray(values, dtype=np.float64)
+        if self.t.shape != self.values.shape or self.t.ndim != 1:
+            raise ValueError("The input function has " +
+                             str(len(self.values)) + " samples, but " +
+                             str(len(self.t)) + " time points.")
+        if len(self.t) == 0:
+            raise ValueError("The input function has no samples.")
+
+        # The slope of the input function on each interval between samples
+        dt = np.diff(self.t)
+        self._slope = np.divide(np.diff(self.values), dt,
+                                out=np.zeros_like(dt), where=dt != 0)
+
+        # The integral from the first sample point to each sample point
+        self.cumulative = np.concatenate(
+            [[0.0], np.cumsum(0.5 * (self.values[1:] + self.values[:-1]) *
+                              dt)])
+
+        # The input function resampled on uniform grids, by grid step
+        self._grids: dict[float, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.t)
+
+    def __call__(self, x: Union[float, list[float], np.ndarray]) \
+            -> np.ndarray:
+        """Evaluate the input function.
+
+        Arguments:
+        x   --  The points where the input function is evaluated.
+
+        Return value:
+        An array with the input function value at each point in x.
+        """
+        res: np.ndarray = np.asarray(np.interp(x, self.t, self.values))
+        return res
+
+    def integral(self, x: Union[float, list[float], np.ndarray]) \
+            -> np.ndarray:
+        """Compute the integral of the input function from the first time
+        point to x. The integral from a to b is then the difference of the
+        integral at b and a. The input function is linear between the
+        samples, so the integral is exact.
+
+        Arguments:
+        x   --  The end points of the integrals.
+
+        Return value:
+        An array with the integral for each point in x.
+        """
+
+        x = np.asarray(x, dtype=np.float64)
+        t = self.t
+        f = self.values
+
+        if len(t) < 2:
+            res: np.ndarray = f[0] * (x - t[0])
+            return res
+
+        # The integral from the start of the interval containing x to x
+        i = np.clip(np.searchsorted(t, x, side='right') - 1, 0, len(t) - 2)
+        dx = x - t[i]
+        res = self.cumulative[i] + f[i] * dx + 0.5 * self._slope[i] * dx * dx
+
+        # The input function is constant outside the sample points
+        res = np.where(x < t[0], f[0] * (x - t[0]), res)
+        res = np.where(x > t[-1],
+                       self.cumulative[-1] + f[-1] * (x - t[-1]), res)
+        return res
+
+    def grid(self, grid_step: float) -> np.ndarray:
+        """Get the input function sampled on the uniform grid 0, grid_step,
+        2*grid_step, ... up to the last time point. The grid is computed once
+        for every grid step and then reused.
+
+        Arguments:
+        grid_step   --  The step of the grid.
+
+        Return value:
+        A read-only array with the input function at the grid points.
+        """
+
+        grid_step = float(grid_step)
+        if grid_step not in self._grids:
+            n = int(np.ceil(max(self.t[-1], 0.0) / grid_step))
+            grid = self(np.arange(n + 1) * grid_step)
+            grid.flags.writeable = False
+            self._grids[grid_step] = grid
+        return self._grids[grid_step]
+
+
+def _as_input_function(t: list[float],
+                       in_func: Union[list[float], InputFunction]) \
+        -> InputFunction:
+    # The input function of a model as an InputFunction. A list of samples
+    # is taken at the time points t.
+    if isinstance(in_func, InputFunction):
+        return in_func
+    return InputFunction(t, in_func)
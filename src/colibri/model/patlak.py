@@ -1,8 +1,10 @@
-import scipy
+import numpy as np
+from typing import Union
+from .input_function import InputFunction, _as_input_function
 
 
 def model_patlak(t: list[float],
-                 in_func: list[float],
+                 in_func: Union[list[float], InputFunction],
                  k1: float,
                  v0: float) -> list[float]:
     """Solves the Patlak-model.
@@ -10,10 +12,11 @@ def model_patlak(t: list[float],
     times the integrated input function up until that point, plus another
     constant v0 times the input function value at that time point:
     R(t) = k1 * int(in_func, 0, t) + v0*in_func(t)
+    The integral starts at the first time point of the input function.
 
     Arguments:
     t       --  The time points of the input function samples.
-    in_func --  The input function samples.
+    in_func --  The input function samples, or an InputFunction.
     k1      --  The constant k1 in the Patlak model.
     v0      --  The constant v0 in the Patlak model.
 
@@ -21,5 +24,31 @@ def model_patlak(t: list[float],
     A list containing the modeled values at each time point.
     """
 
-    return [k1 * scipy.integrate.trapezoid(in_func[0:i+1], t[0:i+1])
-            + v0 * in_func[i] for i in range(len(t))]
+    # The integral of the input function is precomputed in the InputFunction
+    inp = _as_input_function(t, in_func)
+    t_arr = np.asarray(t, dtype=np.float64)
+    res = k1 * inp.integral(t_arr) + v0 * inp(t_arr)
+    return [float(y) for y in res]
+
+
+def model_patlak_jac(t: list[float],
+                     in_func: Union[list[float], InputFunction],
+                     k1: float,
+                     v0: float) -> np.ndarray:
+    """Computes the derivatives of the Patlak-model (see model_patlak) with
+    respect to its parameters.
+
+    Arguments:
+    t       --  The time points of the input function samples.
+    in_func --  The input function samples, or an InputFunction.
+    k1      --  The constant k1 in the Patlak model.
+    v0      --  The constant v0 in the Patlak model.
+
+    Return value:
+    An array with a row for each time point and the derivatives with respect
+    to k1 and v0 in the columns.
+    """
+
+    inp = _as_input_function(t, in_func)
+    t_arr = np.asarray(t, dtype=np.float64)
+    return np.column_stack([inp.integral(t_arr), inp(t_arr)])
@@ -1,5 +1,8 @@
 import numpy as np
 import scipy
+from typing import Union
+from ._integrate import _step_convolution, _step_convolution_derivative
+from .input_function import InputFunction, _as_input_function
 
 
 def _model_step_integrand(tau: float, t: float, amp: float, extent: float,
@@ -35,7 +38,7 @@ def _model_step_integrand(tau: float, t: float, amp: float, extent: float,
     return resp * float(np.interp(tau, tp, in_func))
 
 
-def model_step(t: list[float], in_func: list[float],
+def model_step(t: list[float], in_func: Union[list[float], InputFunction],
                amp: float, extent: float) -> list[float]:
     """Solves the model where the input response function is assumed to be a
     step function.
@@ -44,12 +47,61 @@ def model_step(t: list[float], in_func: list[float],
     [0, extent) and value 0 on the interval [extent, infinity).
     The convolution is evaluated at the same time points as the sampled
     input function and returned as a list.
+    The input function is interpolated linearly between sample points, so the
+    convolution is computed exactly from the integral of the input function
+    over [t - extent, t] at all time points at once. The result agrees with
+    the numerical integration of model_step_quad.
+
+    Arguments:
+    t       --  The time points of the input function samples.
+    in_func --  The input function samples, or an InputFunction.
+    amp     --  The amplitude of the step function.
+    extent  --  The length of the step function.
+
+    Return value:
+    A list containing the modeled values at each time point.
+    """
+
+    inp = _as_input_function(t, in_func)
+    res = amp * _step_convolution(t, inp, extent)
+    return [float(y) for y in res]
+
+
+def model_step_jac(t: list[float],
+                   in_func: Union[list[float], InputFunction],
+                   amp: float, extent: float) -> np.ndarray:
+    """Computes the derivatives of the step model (see model_step) with
+    respect to its parameters. The derivatives are exact, like the model.
+
+    Arguments:
+    t       --  The time points of the input function samples.
+    in_func --  The input function samples, or an InputFunction.
+    amp     --  The amplitude of the step function.
+    extent  --  The length of the step function.
+
+    Return value:
+    An array with a row for each time point and the derivatives with respect
+    to amp and extent in the columns.
+    """
+
+    inp = _as_input_function(t, in_func)
+    return np.column_stack([
+        _step_convolution(t, inp, extent),
+        amp * _step_convolution_derivative(t, inp, extent)])
+
+
+def model_step_quad(t: list[float],
+                    in_func: Union[list[float], InputFunction],
+                    amp: float, extent: float) -> list[float]:
+    """Solves the model where the input response function is assumed to be a
+    step function (see model_step).
     The convolution is performed numerically using scipy.integrate.quad and
-    the input function is interpolated linearly between sample points.
+    the input function is interpolated linearly between sample points. This
+    is much slower than model_step and is kept as a reference.
 
     Arguments:
     t       --  The time points of the input function samples.
-    in_func --  The input function samples.
+    in_func --  The input function samples, or an InputFunction.
     amp     --  The amplitude of the step function.
     extent  --  The length of the step function.
 
@@ -57,6 +109,10 @@ def model_step(t: list[float], in_func: list[float],
     A list containing the modeled values at each time point.
     """
 
+    inp = _as_input_function(t, in_func)
+    tp = inp.t.tolist()
+    samples = inp.values.tolist()
+
     res = []
     for ti in t:
         # For each time point the integrand (see above) is integrated.
@@ -64,7 +120,7 @@ def model_step(t: list[float], in_func: list[float],
         # running into problems, since the functions are not necessarily very
         # well-behaved.
         y = scipy.integrate.quad(_model_step_integrand, 0, ti,
-                                 args=(ti, amp, extent, t, in_func),
+                                 args=(ti, amp, extent, tp, samples),
                                  limit=100,
                                  epsabs=1e-2, epsrel=1e-4)
         res.append(y[0])
@@ -1,5 +1,8 @@
 import numpy as np
 import scipy
+from typing import Union
+from ._integrate import _step_convolution, _step_convolution_derivative
+from .input_function import InputFunction, _as_input_function
 
 
 def _model_step_2_integrand(tau: float, t: float,
@@ -44,7 +47,7 @@ def _model_step_2_integrand(tau: float, t: float,
 
 
 def model_step_2(t: list[float],
-                 in_func: list[float],
+                 in_func: Union[list[float], InputFunction],
                  amp1: float,
                  extent1: float,
                  amp2: float,
@@ -57,12 +60,80 @@ def model_step_2(t: list[float],
     the interval [extent2, infinity).
     The convolution is evaluated at the same time points as the sampled
     input function and returned as a list.
+    The input function is interpolated linearly between sample points, so the
+    convolution is computed exactly as the sum of the convolutions with the
+    two steps at all time points at once. The result agrees with the
+    numerical integration of model_step_2_quad.
+
+    Arguments:
+    t       --  The time points of the input function samples.
+    in_func --  The input function samples, or an InputFunction.
+    amp1    --  The amplitude of the step function on [0, extent1).
+    extent1 --  The length of the first step function.
+    amp2    --  The amplitude of the step function on [0, extent2).
+    extent2 --  The length of the second step function.
+
+    Return value:
+    A list containing the modeled values at each time point.
+    """
+
+    inp = _as_input_function(t, in_func)
+
+    # The second step starts where the first step ends, if it is shorter
+    res = (amp1 * _step_convolution(t, inp, extent1) +
+           amp2 * _step_convolution(t, inp, max(extent1, extent2)))
+    return [float(y) for y in res]
+
+
+def model_step_2_jac(t: list[float],
+                     in_func: Union[list[float], InputFunction],
+                     amp1: float,
+                     extent1: float,
+                     amp2: float,
+                     extent2: float) -> np.ndarray:
+    """Computes the derivatives of the 2-step model (see model_step_2) with
+    respect to its parameters. The derivatives are exact, like the model.
+
+    Arguments:
+    t       --  The time points of the input function samples.
+    in_func --  The input function samples, or an InputFunction.
+    amp1    --  The amplitude of the step function on [0, extent1).
+    extent1 --  The length of the first step function.
+    amp2    --  The amplitude of the step function on [0, extent2).
+    extent2 --  The length of the second step function.
+
+    Return value:
+    An array with a row for each time point and the derivatives with respect
+    to amp1, extent1, amp2 and extent2 in the columns.
+    """
+
+    inp = _as_input_function(t, in_func)
+
+    # The second step ends at extent1, if extent2 is shorter
+    d1 = _step_convolution_derivative(t, inp, extent1)
+    d2 = _step_convolution_derivative(t, inp, max(extent1, extent2))
+    return np.column_stack([
+        _step_convolution(t, inp, extent1),
+        amp1 * d1 + (amp2 * d2 if extent1 > extent2 else 0.0),
+        _step_convolution(t, inp, max(extent1, extent2)),
+        amp2 * d2 if extent2 >= extent1 else np.zeros_like(d2)])
+
+
+def model_step_2_quad(t: list[float],
+                      in_func: Union[list[float], InputFunction],
+                      amp1: float,
+                      extent1: float,
+                      amp2: float,
+                      extent2: float) -> list[float]:
+    """Solves the model where the input response function is assumed to be a
+    2-step function (see model_step_2).
     The convolution is performed numerically using scipy.integrate.quad and
-    the input function is interpolated linearly between sample points.
+    the input function is interpolated linearly between sample points. This
+    is much slower than model_step_2 and is kept as a reference.
 
     Arguments:
     t       --  The time points of the input function samples.
-    in_func --  The input function samples.
+    in_func --  The input function samples, or an InputFunction.
     amp1    --  The amplitude of the step function on [0, extent1).
     extent1 --  The length of the first step function.
     amp2    --  The amplitude of the step function on [0, extent2).
@@ -71,6 +142,10 @@ def model_step_2(t: list[float],
     Return value:
     A list containing the modeled values at each time point.
     """
+    inp = _as_input_function(t, in_func)
+    tp = inp.t.tolist()
+    samples = inp.values.tolist()
+
     res = []
     for ti in t:
         # For each time point the integrand (see above) is integrated.
@@ -79,7 +154,7 @@ def model_step_2(t: list[float],
         # well-behaved.
         y = scipy.integrate.quad(_model_step_2_integrand, 0, ti,
                                  args=(ti, amp1, extent1, amp2, extent2,
-                                       t, in_func),
+                                       tp, samples),
                                  limit=100,
                                  epsabs=1e-2, epsrel=1e-4)
         res.append(y[0])
@@ -0,0 +1,206 @@
+import SimpleITK as sitk
+import concurrent.futures
+import lmfit
+import numpy as np
+from colibri.fitting import default_workers, fit_kws, process_pool
+from colibri.model import InputFunction
+from colibri.series import DynamicSeries
+from multiprocessing import shared_memory
+from typing import Any, Callable, Optional
+
+
+# The fit setup of a worker process in parametric_maps. The voxel TACs are
+# attached from shared memory once per process, so only the chunk bounds are
+# sent with every chunk.
+_worker: dict[str, Any] = {}
+
+
+def _init_worker(shm_name: Optional[str],
+                 shape: tuple[int, ...],
+                 tacs: Optional[np.ndarray],
+                 fit_args: dict[str, Any]):
+    # Attach the shared voxel TACs (or use the given array, when running in
+    # the calling process) and prepare the fit model
+    if shm_name is not None:
+        shm = shared_memory.SharedMemory(name=shm_name)
+        _worker['shm'] = shm
+        tacs = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    _worker.update(fit_args)
+    _worker['tacs'] = tacs
+    # Prepare the input function once for all fits
+    _worker['in_func'] = InputFunction(fit_args['t'], fit_args['in_func'])
+    _worker['fit_model'] = lmfit.Model(fit_args['model'],
+                                       independent_vars=['t', 'in_func'])
+    _worker['fit_params'] = lmfit.create_params(**fit_args['params'])
+    # The analytic jacobian of the model, as used by TACFit
+    _worker['fit_kws'] = fit_kws(fit_args['model'], _worker['fit_model'])
+
+
+def _fit_chunk(start: int, stop: int) -> np.ndarray:
+    # Fit the voxel TACs start:stop. The result has a row for every voxel with
+    # the best parameter values followed by the reduced chi-square and the
+    # coefficient of determination. Voxels where the fit fails are NaN.
+    t = _worker['t']
+    in_func = _worker['in_func']
+    tcut = _worker['tcut']
+    names = list(_worker['fit_params'].keys())
+    res = np.full((stop - start, len(names) + 2), np.nan)
+    for i in range(start, stop):
+        tac = _worker['tacs'][i, :tcut]
+        try:
+            fit = _worker['fit_model'].fit(tac, t=t, in_func=in_func,
+                                           params=_worker['fit_params'],
+                                           fit_kws=_worker['fit_kws'])
+        except Exception:
+            continue
+        row = res[i - start]
+        row[:len(names)] = [fit.best_values[name] for name in names]
+        row[-2] = fit.redchi
+        ss_tot = np.sum((tac - np.mean(tac))**2)
+        if ss_tot > 0:
+            row[-1] = 1.0 - np.sum(fit.residual**2) / ss_tot
+    return res
+
+
+def parametric_maps(series: DynamicSeries,
+                    mask: sitk.Image,
+                    time_data: list[float],
+                    input_data: list[float],
+                    model: Callable[..., list[float]],
+                    params: dict[str, dict[str, float]],
+                    tcut: Optional[int] = None,
+                    mask_label: Optional[int] = None,
+                    workers: Optional[int] = None,
+                    chunk_size: int = 256) -> dict[str, sitk.Image]:
+    """Fit a model to the TAC of every voxel in a mask, and create images of
+    the fitted parameters (parametric maps).
+    The voxel TACs are copied once into shared memory, which is attached by a
+    pool of worker processes. The voxels are split into chunks, and only the
+    chunk bounds and the fitted values are sent between the processes. The
+    progress is printed as the chunks are done.
+
+    Arguments:
+    series      --  The dynamic image series (see colibri.load_dynamic_array).
+    mask        --  The mask image in the space of the series. All voxels
+                    with a non-zero value are fitted.
+    time_data   --  The time points of the fit.
+    input_data  --  The input function at the time points.
+    model       --  The model function (e.g. colibri.model.model_step).
+    params      --  The initial value and optional bounds of each model
+                    parameter, as a dict-object of the form
+                    {'amp': {'value': 1.0, 'min': 0.0}, ...}.
+    tcut        --  Only the first tcut time points are fitted. Default is
+                    None, in which case all time points are fitted.
+    mask_label  --  If given, only the voxels with this value in the mask
+                    are fitted.
+    workers     --  The number of worker processes. Default is given by
+                    colibri.default_workers (the number of CPUs). If 1,
+                    all voxels are fitted in the calling process.
+    chunk_size  --  The number of voxels fitted by a worker at a time.
+                    Default is 256.
+
+    Return value:
+    A dict-object with an image of every model parameter, and the images
+    'redchi' (the reduced chi-square of the fit) and 'rsquared' (the
+    coefficient of determination of the fit). The images have the geometry
+    of the series. Voxels outside the mask have the value 0, and voxels where
+    the fit failed have the value NaN.
+    """
+
+    # Find the voxels to fit
+    mask_arr = sitk.GetArrayViewFromImage(mask)
+    if mask_arr.shape != series.data.shape[1:]:
+        raise ValueError("Mask of size " + str(mask.GetSize()) +
+                         " does not match the image size " +
+                         str(series.size()) + ".")
+    if mask_label is None:
+        voxels = np.flatnonzero(mask_arr)
+    else:
+        voxels = np.flatnonzero(mask_arr == mask_label)
+
+    if len(time_data) != len(series):
+        raise ValueError("The series has " + str(len(series)) +
+                         " frames, but " + str(len(time_data)) +
+                         " time points were given.")
+    if tcut is None:
+        tcut = len(time_data)
+
+    fit_args = {'model': model,
+                'params': params,
+                't': np.asarray(time_data[0:tcut], dtype=np.float64),
+                'in_func': np.asarray(input_data[0:tcut], dtype=np.float64),
+                'tcut': tcut}
+
+    n_vox = len(voxels)
+    n_frames = len(series)
+    names = list(params.keys())
+    res = np.full((n_vox, len(names) + 2), np.nan)
+
+    if workers is None:
+        workers = default_workers()
+    chunks = [(a, min(a + chunk_size, n_vox))
+              for a in range(0, n_vox, chunk_size)]
+    workers = max(1, min(workers, len(chunks)))
+
+    print("Fitting", n_vox, "voxels in", len(chunks), "chunks with",
+          workers, "workers...")
+
+    shm = None
+    tacs: Optional[np.ndarray] = None
+    try:
+        if workers == 1:
+            # Extract the voxel TACs (voxels, frames) and fit them here
+            tacs = np.ascontiguousarray(
+                series.data.reshape(n_frames, -1)[:, voxels].T,
+                dtype=np.float64)
+            _init_worker(None, tacs.shape, tacs, fit_args)
+            results = ((chunk, _fit_chunk(*chunk)) for chunk in chunks)
+            _report_chunks(results, res, n_vox)
+        else:
+            # Extract the voxel TACs (voxels, frames) into shared memory
+            shape = (n_vox, n_frames)
+            shm = shared_memory.SharedMemory(
+                create=True, size=max(1, n_vox * n_frames * 8))
+            tacs = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+            tacs[:] = series.data.reshape(n_frames, -1)[:, voxels].T
+            with process_pool(workers, _init_worker,
+                              (shm.name, shape, None, fit_args)) as pool:
+                futures = {pool.submit(_fit_chunk, *chunk): chunk
+                           for chunk in chunks}
+                results = ((futures[f], f.result()) for f in
+                           concurrent.futures.as_completed(futures))
+                _report_chunks(results, res, n_vox)
+    finally:
+        _worker.clear()
+        # The array must be released before the shared memory is closed
+        tacs = None
+        if shm is not None:
+            shm.close()
+            shm.unlink()
+
+    print("... done!")
+
+    # Put the fitted values into images in the series geometry
+    maps = {}
+    for j, name in enumerate(names + ['redchi', 'rsquared']):
+        arr = np.zeros(mask_arr.size, dtype=np.float64)
+        arr[voxels] = res[:, j]
+        img = sitk.GetImageFromArray(arr.reshape(mask_arr.shape))
+        img.SetOrigin(series.origin)
+        img.SetSpacing(series.spacing)
+        img.SetDirection(series.direction)
+        maps[name] = img
+    return maps
+
+
+def _report_chunks(results: Any, res: np.ndarray, n_vox: int):
+    # Store the results of the chunks as they are done, and print the
+    # progress in steps of 10%
+    done = 0
+    reported = 0
+    for (start, stop), chunk_res in results:
+        res[start:stop] = chunk_res
+        done += stop - start
+        if done * 10 // n_vox > reported:
+            reported = done * 10 // n_vox
+            print("Fitted", done, "of", n_vox, "voxels.")
@@ -0,0 +1,110 @@
+import concurrent.futures
+import contextlib
+import threading
+from collections.abc import Iterator
+from typing import TYPE_CHECKING, Any, Callable, Optional
+
+if TYPE_CHECKING:
+    import matplotlib.axes
+
+
+# The background thread rendering the figures of save_figure, and the
+# figures that have not been waited for
+_executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+_pending: list[concurrent.futures.Future[Any]] = []
+_pending_lock = threading.Lock()
+
+# The lists collecting the figures submitted by each thread (see
+# collect_figures)
+_local = threading.local()
+
+
+def _render(draw: Callable[['matplotlib.axes.Axes'], None], path: str):
+    # Draw a figure and write it to a file. The figure is not registered
+    # with pyplot, so it is freed as soon as it is written.
+    import matplotlib.figure
+    fig = matplotlib.figure.Figure()
+    draw(fig.subplots())
+    fig.savefig(path)
+
+
+def save_figure(draw: Callable[['matplotlib.axes.Axes'], None],
+                path: str) -> concurrent.futures.Future[Any]:
+    """Draw a figure and write it to a file in a background thread, so the
+    calling thread can continue immediately. No window is opened, so this
+    works without a display. The figures are rendered one at a time, in the
+    order they are submitted. Use colibri.wait_for_figures to wait until all
+    figures are written.
+
+    Arguments:
+    draw    --  A function drawing the figure on the matplotlib Axes-object
+                it is given. The data of the figure should not be changed
+                before the figure is written.
+    path    --  The path to the output file. The file format is given by the
+                extension (e.g. .png, .pdf or .svg).
+
+    Return value:
+    A Future-object, which is done when the file is written.
+    """
+
+    global _executor
+    with _pending_lock:
+        if _executor is None:
+            _executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix='colibri-plot')
+        future = _executor.submit(_render, draw, path)
+        _pending.append(future)
+    collected = getattr(_local, 'collected', None)
+    if collected is not None:
+        collected.append(future)
+    return future
+
+
+@contextlib.contextmanager
+def collect_figures() -> Iterator[list[concurrent.futures.Future[Any]]]:
+    """Collect the figures submitted with colibri.save_figure by the calling
+    thread while the context is active, e.g. to wait only for the figures of
+    one task with colibri.wait_for_figures while other tasks run.
+
+    Return value:
+    A context manager giving the list of the Future-objects of the
+    collected figures.
+    """
+
+    previous = getattr(_local, 'collected', None)
+    _local.collected = []
+    try:
+        yield _local.collected
+    finally:
+        if previous is not None:
+            previous.extend(_local.collected)
+        _local.collected = previous
+
+
+def wait_for_figures(
+        futures: Optional[list[concurrent.futures.Future[Any]]] = None):
+    """Wait until the figures submitted with colibri.save_figure are written.
+    A figure that could not be written is reported, but does not raise an
+    error.
+
+    Arguments:
+    futures --  The Future-objects of the figures to wait for (see
+                colibri.collect_figures). Default is None, in which case all
+                figures are waited for.
+    """
+
+    while True:
+        with _pending_lock:
+            if futures is None:
+                if not _pending:
+                    return
+                future = _pending.pop(0)
+            else:
+                if not futures:
+                    return
+                future = futures.pop(0)
+                if future in _pending:
+                    _pending.remove(future)
+        error = future.exception()
+        if error is not None:
+            print("Failed to write figure:", repr(error))
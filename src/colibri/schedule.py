@@ -0,0 +1,240 @@
+import concurrent.futures
+import io
+import os
+import sys
+import threading
+from typing import Any, Callable, Optional, OrderedDict
+
+
+def _task_tags() -> dict[str, dict[str, list[str]]]:
+    # The XML-tags of every task naming the objects in named_obj and the
+    # files it reads and writes. A tag inside another tag is written as
+    # 'outer/inner'. Tasks that use module-level state (the worker setup of
+    # the fitting functions) also write that state, so they do not run at
+    # the same time.
+    return {
+        'ROIMeans': {'read_files': ['img_path', 'roi_path', 'roi/path'],
+                     'write_objs': ['res_name', 'roi/res_name']},
+        'TACFit': {'read_objs': ['tac_name'],
+                   'write_objs': ['res_name', 'multi_start/res_name',
+                                  'bootstrap/res_name'],
+                   'write_files': ['plot_file'],
+                   'state': ['colibri.fitting']},
+        'Correction': {'write_objs': ['table_name']},
+        'SaveTable': {'read_objs': ['name'],
+                      'write_files': ['file']},
+        'LoadTable': {'read_files': ['file'],
+                      'write_objs': ['name']},
+        'ConvertSeries': {'read_files': ['img_path'],
+                          'write_files': ['out_path']},
+        'ParametricMap': {'read_objs': ['tac_name'],
+                          'read_files': ['img_path', 'mask_path'],
+                          'write_objs': ['res_name'],
+                          'write_files': ['out_path'],
+                          'state': ['colibri.parametric']}
+    }
+
+
+def _tag_values(task: Any, path: str) -> list[str]:
+    # The values of a (possibly nested and repeated) tag of a task
+    values = [task]
+    for tag in path.split('/'):
+        found = []
+        for value in values:
+            if isinstance(value, dict) and tag in value:
+                sub = value[tag]
+                found.extend(sub if isinstance(sub, list) else [sub])
+        values = found
+    return [str(value) for value in values if value is not None]
+
+
+def _task_resources(task: OrderedDict[str, Any]) \
+        -> Optional[tuple[set[tuple[str, str]], set[tuple[str, str]]]]:
+    # The resources a task reads and writes, as sets of (kind, name). The
+    # kinds are 'obj' (named_obj), 'file' (an absolute path) and 'state'.
+    # A task that must run alone, on the main thread, gives None. This is a
+    # task with unknown resources, or a TACFit showing a plot window.
+    tags = _task_tags().get(task['@name'])
+    if tags is None:
+        return None
+    if (task['@name'] == 'TACFit' and 'plot_file' not in task and
+            str(task.get('plot', 'show')) != 'none'):
+        return None
+
+    def resources(kind: str, key: str) -> set[tuple[str, str]]:
+        res = set()
+        for path in tags.get(key, []):
+            for value in _tag_values(task, path):
+                if kind == 'file':
+                    value = os.path.abspath(value)
+                res.add((kind, value))
+        return res
+
+    reads = resources('obj', 'read_objs') | resources('file', 'read_files')
+    writes = (resources('obj', 'write_objs') |
+              resources('file', 'write_files') |
+              {('state', name) for name in tags.get('state', [])})
+    return reads, writes
+
+
+def _conflict(a: set[tuple[str, str]], b: set[tuple[str, str]]) -> bool:
+    # Check if two sets of resources share a resource. A file conflicts with
+    # the directories containing it.
+    for kind_a, name_a in a:
+        for kind_b, name_b in b:
+            if kind_a != kind_b:
+                continue
+            if name_a == name_b:
+                return True
+            if kind_a == 'file' and (name_a.startswith(name_b + os.sep) or
+                                     name_b.startswith(name_a + os.sep)):
+                return True
+    return False
+
+
+def _dependencies(tasks: list[OrderedDict[str, Any]]) -> list[set[int]]:
+    # The earlier tasks every task must wait for: the tasks writing what it
+    # reads or writes, and the tasks reading what it writes. Tasks that must
+    # run alone wait for all earlier tasks, and all later tasks wait for
+    # them.
+    resources = [_task_resources(task) for task in tasks]
+    deps: list[set[int]] = []
+    for j, res_j in enumerate(resources):
+        deps.append(set())
+        for i in range(j):
+            res_i = resources[i]
+            if (res_i is None or res_j is None or
+                    _conflict(res_i[1], res_j[0] | res_j[1]) or
+                    _conflict(res_i[0], res_j[1])):
+                deps[j].add(i)
+    return deps
+
+
+class _TaskOutput(io.TextIOBase):
+    """The standard output while tasks run at the same time. The output of a
+    thread running a task is collected in a buffer of the task, so it can be
+    printed in the order of the tasks. Any other output is written to the
+    original standard output.
+    """
+
+    def __init__(self, stream: Any):
+        self.stream = stream
+        self.buffers: dict[int, io.StringIO] = {}
+
+    def write(self, s: str) -> int:
+        buffer = self.buffers.get(threading.get_ident())
+        if buffer is None:
+            return int(self.stream.write(s))
+        return buffer.write(s)
+
+    def flush(self):
+        self.stream.flush()
+
+    def run(self, func: Callable[..., Any], *args: Any) \
+            -> tuple[str, Optional[BaseException]]:
+        # Run a function and collect its output. Any error is returned with
+        # the output instead of raised.
+        buffer = io.StringIO()
+        self.buffers[threading.get_ident()] = buffer
+        error: Optional[BaseException] = None
+        try:
+            func(*args)
+        except BaseException as e:
+            error = e
+        finally:
+            del self.buffers[threading.get_ident()]
+        return buffer.getvalue(), error
+
+
+def run_tasks(funcs: list[Callable[..., Any]],
+              tasks: list[OrderedDict[str, Any]],
+              named_obj: dict[str, Any],
+              workers: Optional[int] = None):
+    """Run the tasks of a colibri XML-file, where tasks that do not depend
+    on each other run at the same time in a pool of threads. A task depends
+    on an earlier task if one of them writes an object in named_obj or a
+    file that the other reads or writes (see _task_tags). Tasks of unknown
+    type, and TACFit-tasks showing a plot window, run alone on the main
+    thread. The output of every task is printed when the task and all
+    earlier tasks are done, so the output is in the order of the tasks.
+    If a task fails, no later tasks are started, and the error of the first
+    failed task is raised when the running tasks are done.
+
+    Arguments:
+    funcs       --  The task functions.
+    tasks       --  The XML-tags of the tasks.
+    named_obj   --  The named object container.
+    workers     --  The largest number of tasks running at the same time.
+                    Default is the number of CPUs.
+    """
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    n_tasks = len(tasks)
+    deps = _dependencies(tasks)
+    alone = [_task_resources(task) is None for task in tasks]
+
+    stdout = sys.stdout
+    output = _TaskOutput(stdout)
+    results: dict[int, tuple[str, Optional[BaseException]]] = {}
+    running: dict[concurrent.futures.Future[Any], int] = {}
+    started: set[int] = set()
+    printed = 0
+    # Tasks after the first failed task are not started
+    stop = n_tasks
+
+    def print_results():
+        # Print the output of the done tasks in order, up to the first
+        # failed task
+        nonlocal printed
+        while printed < stop and printed in results:
+            stdout.write(results[printed][0])
+            printed += 1
+        stdout.flush()
+
+    sys.stdout = output
+    try:
+        with concurrent.futures.ThreadPoolExecutor(
+                max_workers=workers,
+                thread_name_prefix='colibri-task') as pool:
+            while True:
+                # Start the tasks whose dependencies are done
+                i = 0
+                while i < stop:
+                    if (i not in started and
+                            all(d in results for d in deps[i])):
+                        started.add(i)
+                        if alone[i]:
+                            # All earlier tasks are done and no other task
+                            # is running, so the output is printed directly
+                            print_results()
+                            results[i] = ('', None)
+                            try:
+                                funcs[i](tasks[i], named_obj)
+                            except BaseException as e:
+                                results[i] = ('', e)
+                                stop = i + 1
+                        else:
+                            running[pool.submit(output.run, funcs[i],
+                                                tasks[i], named_obj)] = i
+                    i += 1
+                if not running:
+                    if all(i in results for i in range(stop)):
+                        break
+                    continue
+                done, _ = concurrent.futures.wait(
+                    running, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    i = running.pop(future)
+                    results[i] = future.result()
+                    if results[i][1] is not None:
+                        stop = min(stop, i + 1)
+                print_results()
+    finally:
+        sys.stdout = stdout
+
+    print_results()
+    for i in range(stop):
+        error = results[i][1]
+        if error is not None:
+            raise error
@@ -0,0 +1,72 @@
+import SimpleITK as sitk
+import numpy as np
+from typing import Optional
+
+
+class DynamicSeries:
+    """A dynamic image series stored as one contiguous 4D NumPy array.
+    All frames of a dynamic series share the same geometry, so the geometry
+    is stored once instead of in a SimpleITK Image for every frame. The
+    attributes are:
+    data        --  The image values in an array with the shape
+                    (frames, z, y, x), i.e. data[i] is the array of frame i
+                    as returned by sitk.GetArrayFromImage.
+    origin      --  The origin of the images (x, y, z).
+    spacing     --  The voxel spacing of the images (x, y, z).
+    direction   --  The direction cosine matrix of the images as a tuple.
+    acq         --  The acquisition times relative to the first frame in
+                    seconds in an array.
+    frame_dur   --  The frame durations in seconds in an array.
+    """
+
+    __slots__ = ('data', 'origin', 'spacing', 'direction', 'acq',
+                 'frame_dur')
+
+    def __init__(self, data: np.ndarray,
+                 origin: tuple[float, ...],
+                 spacing: tuple[float, ...],
+                 direction: tuple[float, ...],
+                 acq: np.ndarray,
+                 frame_dur: Optional[np.ndarray] = None):
+        self.data = data
+        self.origin = tuple(origin)
+        self.spacing = tuple(spacing)
+        self.direction = tuple(direction)
+        self.acq = np.asarray(acq, dtype=np.float64)
+        if frame_dur is None:
+            frame_dur = np.full(len(self.acq), np.nan)
+        self.frame_dur = np.asarray(frame_dur, dtype=np.float64)
+
+    def __len__(self) -> int:
+        return int(self.data.shape[0])
+
+    def size(self) -> tuple[int, ...]:
+        """The size of each frame (x, y, z), as returned by
+        sitk.Image.GetSize.
+        """
+        return tuple(int(n) for n in self.data.shape[:0:-1])
+
+    def frame(self, i: int) -> sitk.Image:
+        """Get a single frame of the series as a SimpleITK Image with the
+        geometry of the series.
+
+        Arguments:
+        i   --  The index of the frame.
+
+        Return value:
+        The frame as a SimpleITK Image.
+        """
+        img = sitk.GetImageFromArray(self.data[i])
+        img.SetOrigin(self.origin)
+        img.SetSpacing(self.spacing)
+        img.SetDirection(self.direction)
+        return img
+
+    def images(self) -> list[sitk.Image]:
+        """Get all frames of the series as a list of SimpleITK Images, as
+        in the result of colibri.load_dynamic_series.
+
+        Return value:
+        A list of SimpleITK Images in order of acquisition.
+        """
+        return [self.frame(i) for i in range(len(self))]
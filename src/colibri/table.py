@@ -0,0 +1,138 @@
+import numpy as np
+from collections.abc import Iterator, Mapping, MutableMapping
+from typing import Any, Optional, Union
+
+
+def _as_column(value: Any) -> np.ndarray:
+    # A table column as a 1D NumPy array. Arrays (also memory-mapped arrays)
+    # are used as they are if they are contiguous, and values that are not
+    # numbers are stored as strings.
+    col: np.ndarray = np.asanyarray(value)
+    if col.ndim != 1:
+        raise ValueError("A table column must be 1D, but has shape " +
+                         str(col.shape) + ".")
+    if col.dtype == object:
+        col = col.astype(str)
+    if not col.flags.c_contiguous:
+        col = np.ascontiguousarray(col)
+    return col
+
+
+class Table(MutableMapping[str, np.ndarray]):
+    """A table of named columns, each stored as a contiguous 1D NumPy array
+    of the same length. A Table is used like a dict-object mapping the
+    column names to the columns, so it can be used wherever colibri takes a
+    table. The column names are strings, and other keys (e.g. the integer
+    labels of a ROI) are converted to strings, so table[1] and table['1']
+    are the same column.
+    Adding, replacing and renaming a column never copies the other columns,
+    and slice_rows gives a table of views of the columns (e.g. the first
+    tcut time points) without copying the data.
+    """
+
+    __slots__ = ('_columns',)
+
+    def __init__(self, columns: Optional[Mapping[Any, Any]] = None):
+        self._columns: dict[str, np.ndarray] = {}
+        if columns is not None:
+            for key, value in columns.items():
+                self[key] = value
+
+    def __getitem__(self, key: Union[str, int]) -> np.ndarray:
+        return self._columns[str(key)]
+
+    def __setitem__(self, key: Union[str, int], value: Any):
+        key = str(key)
+        col = _as_column(value)
+        for name, other in self._columns.items():
+            if name != key:
+                if len(col) != len(other):
+                    raise ValueError("Column " + key + " has " +
+                                     str(len(col)) + " rows, but the table "
+                                     "has " + str(len(other)) + " rows.")
+                break
+        self._columns[key] = col
+
+    def __delitem__(self, key: Union[str, int]):
+        del self._columns[str(key)]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._columns)
+
+    def __len__(self) -> int:
+        return len(self._columns)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Mapping):
+            return NotImplemented
+        return (list(self.keys()) == [str(key) for key in other] and
+                all(np.array_equal(self[key], np.asanyarray(other[key]))
+                    for key in other))
+
+    __hash__ = None  # type: ignore
+
+    def __repr__(self) -> str:
+        return "Table(" + repr(self._columns) + ")"
+
+    @property
+    def rows(self) -> int:
+        """The number of rows of the table."""
+        for col in self._columns.values():
+            return len(col)
+        return 0
+
+    def rename(self, old: Union[str, int], new: Union[str, int]):
+        """Rename a column. The column keeps its position in the table.
+
+        Arguments:
+        old --  The current name of the column.
+        new --  The new name of the column.
+        """
+
+        old, new = str(old), str(new)
+        if old not in self._columns:
+            raise KeyError(old)
+        self._columns = {new if name == old else name: col
+                         for name, col in self._columns.items()
+                         if name != new or new == old}
+
+    def slice_rows(self, start: Optional[int] = None,
+                   stop: Optional[int] = None) -> 'Table':
+        """Get the rows start:stop of the table. The columns of the new table
+        are views of the columns of this table, so no data is copied.
+
+        Arguments:
+        start   --  The first row. Default is None (the first row).
+        stop    --  The row after the last row. Default is None (after the
+                    last row).
+
+        Return value:
+        A Table with the rows start:stop.
+        """
+
+        res = Table()
+        res._columns = {name: col[start:stop]
+                        for name, col in self._columns.items()}
+        return res
+
+    def copy(self) -> 'Table':
+        """Get a copy of the table, where all columns are copied.
+
+        Return value:
+        A Table with copies of the columns of this table.
+        """
+
+        res = Table()
+        res._columns = {name: np.array(col)
+                        for name, col in self._columns.items()}
+        return res
+
+    def to_dict(self) -> dict[str, list[Any]]:
+        """Get the table as a dict-object of lists, e.g. for other programs
+        that do not use NumPy arrays.
+
+        Return value:
+        A dict-object with the column names as keys and lists as values.
+        """
+
+        return {name: col.tolist() for name, col in self._columns.items()}
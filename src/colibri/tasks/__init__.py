@@ -1,7 +1,34 @@
 """Defines the tasks in the colibri software.
+
+The tasks are imported from their modules when they are first used, so that
+a task file only imports the dependencies of the tasks it runs.
 """
 
-from .roi_means import *  # noqa
-from .tac_fit import *  # noqa
-from .correction import *  # noqa
-from .table_save_load import *  # noqa
\ No newline at end of file
+import importlib
+from typing import Any
+
+# The module of every task
+_exports = {
+    'task_roi_means': 'roi_means',
+    'task_tac_fit': 'tac_fit',
+    'task_apply_correction': 'correction',
+    'task_save_table': 'table_save_load',
+    'task_load_table': 'table_save_load',
+    'task_convert_series': 'convert_series',
+    'task_parametric_map': 'parametric_map'
+}
+
+
+def __getattr__(name: str) -> Any:
+    # Import the tasks on first use
+    if name not in _exports:
+        raise AttributeError(
+            f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module('.' + _exports[name], __name__),
+                    name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(list(globals().keys()) + list(_exports.keys()))
@@ -13,4 +13,10 @@ def task_tac_fit(task: OrderedDict[str, Any],
                  named_obj: dict[str, Any]): ...
 
 def task_apply_correction(task: OrderedDict[str, Any],
-                          named_obj: dict[str, Any]): ...
\ No newline at end of file
+                          named_obj: dict[str, Any]): ...
+
+def task_convert_series(task: OrderedDict[str, Any],
+                        named_obj: dict[str, Any]): ...
+
+def task_parametric_map(task: OrderedDict[str, Any],
+                        named_obj: dict[str, Any]): ...
@@ -0,0 +1,35 @@
+from typing import OrderedDict, Any
+import colibri
+import numpy as np
+
+
+def task_convert_series(task: OrderedDict[str, Any],
+                        named_obj: dict[str, Any]):
+    """Run the ConvertSeries task. Converts a dynamic image series stored as
+    dicom files into a memory-mapped series cache (see
+    colibri.convert_dynamic_series). The cache can be used as <img_path> in
+    later ROIMeans tasks, which then avoid decoding the dicom files again.
+    The XML-structure of the task should look like this:
+
+    <img_path>PATH_TO_IMAGE_SERIES</img_path>
+    <out_path>PATH_TO_SERIES_CACHE</out_path>
+    <dtype>DATA_TYPE</dtype> <!-- OPTIONAL -->
+
+    The <dtype>-tag chooses the data type of the stored images, e.g. float32
+    (default) or float64.
+    """
+
+    print("Starting series conversion.")
+
+    img_path = str(task['img_path'])
+    out_path = str(task['out_path'])
+
+    dtype = np.dtype(np.float32)
+    if 'dtype' in task:
+        dtype = np.dtype(str(task['dtype']))
+
+    print("Reading images from ", img_path, ".")
+    print("Writing series cache to ", out_path, "...")
+    colibri.convert_dynamic_series(img_path, out_path, dtype=dtype)
+    print("... done!")
+    print()
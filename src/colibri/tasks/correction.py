@@ -38,6 +38,6 @@ def _scale_tac(task: OrderedDict[str, Any],
     factor = float(task['factor'])
     print("Scaling label", old_label, "by factor", factor,
           "and saving as label", new_label, "...")
-    tab[new_label] = np.array(tab[old_label]) * factor
+    tab[new_label] = np.asarray(tab[old_label], dtype=np.float64) * factor
     print("... done!")
     print()
@@ -0,0 +1,119 @@
+from typing import OrderedDict, Any, Optional
+import colibri
+import os
+import SimpleITK as sitk
+from .tac_fit import _get_models, _read_params
+
+
+def task_parametric_map(task: OrderedDict[str, Any],
+                        named_obj: dict[str, Any]):
+    """Run the ParametricMap task. Fits a model to the TAC of every voxel in
+    a mask, and creates an image of every fitted parameter (see
+    colibri.parametric_maps). The voxels are fitted in parallel on a pool of
+    worker processes.
+    The input is an xml-structure, which must have the following content (in
+    any order):
+
+    <img_path>PATH_TO_IMAGE_SERIES</img_path>
+    <mask_path>PATH_TO_MASK_IMAGE_FILE</mask_path>
+    <mask_label>LABEL</mask_label> <!-- OPTIONAL -->
+    <tac_name>TAC_KEY_IN_NAMED_OBJ</tac_name>
+    <time_label>LABEL_OF_TIME_DATA</time_label>
+    <inp_label>LABEL_OF_INPUT_FUNCTION_DATA</inp_label>
+    <model>FIT_MODEL</model>
+    <param>
+        <name>PARAM1_NAME</name>
+        <init>PARAM1_INIT_VALUE</init>
+        <min>PARAM1_MIN_VALUE</min> <!-- OPTIONAL -->
+        <max>PARAM1_MAX_VALUE</max> <!-- OPTIONAL -->
+    </param>
+    ...
+    <tcut>NUMBER_OF_TIME_POINTS</tcut> <!-- OPTIONAL -->
+    <workers>NUMBER_OF_PROCESSES</workers> <!-- OPTIONAL -->
+    <chunk_size>NUMBER_OF_VOXELS</chunk_size> <!-- OPTIONAL -->
+    <out_path>PATH_TO_OUTPUT_DIRECTORY</out_path> <!-- OPTIONAL -->
+    <res_name>MAPS_KEY_IN_NAMED_OBJ</res_name> <!-- OPTIONAL -->
+
+    The mask must be in the space of the images. All voxels with a non-zero
+    mask value are fitted, or only the voxels with the value in the
+    <mask_label>-tag, if given. The input function is read from the table in
+    named_obj (e.g. from a ROIMeans task), and must have a value for every
+    image in the series.
+    If the <out_path>-tag is given, every map is written to the file
+    PARAM_NAME.nrrd in that directory, together with the fit quality maps
+    redchi.nrrd and rsquared.nrrd. If the <res_name>-tag is given, the maps
+    are stored in named_obj as a dict-object of images.
+    """
+
+    print("Starting parametric mapping.")
+
+    img_path = str(task['img_path'])
+    mask_path = str(task['mask_path'])
+
+    mask_label: Optional[int] = None
+    if 'mask_label' in task:
+        mask_label = int(task['mask_label'])
+
+    # Get labels of relevant TACs
+    tac_name = str(task['tac_name'])
+    inp_label = str(task['inp_label'])
+    time_label = str(task['time_label'])
+
+    # Get required fit model
+    fit_model = str(task['model'])
+
+    # Put parameters into a dict
+    params = _read_params(task)
+
+    # Load TAC data
+    print("Loading TAC-data as ", tac_name, " in named_obj...")
+    tac = named_obj[tac_name]
+    print("... done!")
+    print()
+
+    # Get tcut if required
+    t_cut = len(tac[time_label])
+    if 'tcut' in task:
+        t_cut = int(task['tcut'])
+
+    workers: Optional[int] = None
+    if 'workers' in task:
+        workers = int(task['workers'])
+
+    chunk_size = 256
+    if 'chunk_size' in task:
+        chunk_size = int(task['chunk_size'])
+
+    print("Reading images from ", img_path, ".")
+    series = colibri.load_dynamic_array(img_path)
+    print("Reading mask image from ", mask_path, ".")
+    mask = sitk.ReadImage(mask_path)
+    print()
+
+    print("Fitting voxel TACs to model", fit_model, ".")
+    maps = colibri.parametric_maps(series, mask,
+                                   time_data=tac[time_label],
+                                   input_data=tac[inp_label],
+                                   model=_get_models()[fit_model],
+                                   params=params,
+                                   tcut=t_cut,
+                                   mask_label=mask_label,
+                                   workers=workers,
+                                   chunk_size=chunk_size)
+    print()
+
+    if 'out_path' in task:
+        out_path = str(task['out_path'])
+        print("Writing maps to ", out_path, "...")
+        os.makedirs(out_path, exist_ok=True)
+        for name in maps:
+            sitk.WriteImage(maps[name], os.path.join(out_path, name + '.nrrd'))
+        print("... done!")
+        print()
+
+    if 'res_name' in task:
+        res_name = str(task['res_name'])
+        print("Storing maps as ", res_name, " in named_obj...")
+        named_obj[res_name] = maps
+        print("... done!")
+        print()
@@ -2,6 +2,52 @@ from typing import OrderedDict, Any, Optional
 import colibri
 
 
+def _roi_set(tags: OrderedDict[str, Any],
+             path_tag: str,
+             resample: Optional[str],
+             stats: list[str]) -> dict[str, Any]:
+    # Create a ROI set description (see colibri.lazy_series_multi_roi_means)
+    # from the xml tags of a ROI set
+
+    # Create label dictionary
+    labels = {}
+    if 'labels' in tags:
+        # This section transforms the string "X,a;Y,b;Z,c" into a dict of the
+        # form {'X': 'a', 'Y': 'b', 'Z': 'c'}
+        label_string = str(tags['labels']).split(';')
+        for label in label_string:
+            label_split = label.split(',')
+            labels[label_split[0]] = label_split[1]
+
+    # Create ignore list
+    if 'ignore' in tags:
+        # This section transforms the string "a,b,c" into a list of the
+        # form ['a','b','c']
+        ignore = tags['ignore'].split(',')
+    else:
+        ignore = []
+
+    # Check if resampling is required
+    if 'resample' in tags:
+        resample = str(tags['resample'])
+
+    # Check if other statistics than the mean are required
+    if 'stats' in tags:
+        stats = _stats_list(tags['stats'])
+
+    return {'roi_path': str(tags[path_tag]),
+            'name': str(tags['res_name']),
+            'resample': resample,
+            'labels': labels,
+            'ignore': ignore,
+            'stats': stats}
+
+
+def _stats_list(stats_string: str) -> list[str]:
+    # This transforms the string "a,b,c" into a list of the form ['a','b','c']
+    return [stat.strip() for stat in str(stats_string).split(',')]
+
+
 def task_roi_means(task: OrderedDict[str, Any],
                    named_obj: dict[str, Any]):
     """Run the ROIMeans task. Loads an image series and a ROI image, and
@@ -17,8 +63,30 @@ def task_roi_means(task: OrderedDict[str, Any],
     <ignore>LABEL_1,LABEL_2,...</ignore> <!-- OPTIONAL -->
     <resample>img_OR_roi</resample> <!-- OPTIONAL -->
     <frame_dur>true_OR_false</frame_dur> <!-- OPTIONAL -->
+    <prefetch>NUMBER_OF_IMAGES</prefetch> <!-- OPTIONAL -->
+    <engine>sitk_OR_numpy</engine> <!-- OPTIONAL -->
+    <stats>STAT_1,STAT_2,...</stats> <!-- OPTIONAL -->
     <res_name>TABLE_KEY_IN_NAMED_OBJ</res_name>
 
+    Several ROI sets can be used on the same image series with <roi>-tags in
+    place of the <roi_path>- and <res_name>-tags. Every image is then read
+    once and the means of all ROI sets are computed from it:
+
+    <roi>
+        <path>PATH_TO_ROI_IMAGE_FILE</path>
+        <res_name>TABLE_KEY_IN_NAMED_OBJ</res_name>
+        <labels>...</labels> <!-- OPTIONAL -->
+        <ignore>...</ignore> <!-- OPTIONAL -->
+        <resample>img_OR_roi</resample> <!-- OPTIONAL -->
+        <stats>...</stats> <!-- OPTIONAL -->
+    </roi>
+    <roi>
+        ...
+    </roi>
+
+    The <resample>- and <stats>-tags outside the <roi>-tags are used for
+    every ROI set that does not have its own.
+
     With the <labels>-tag, new labels can be chosen if the ROI-labels in the
     ROI-file are not descriptive.
     The <ignore> tag can be used to avoid computing roi-means for certain
@@ -30,59 +98,75 @@ def task_roi_means(task: OrderedDict[str, Any],
     The <frame_dur>-tag can be used to also output the frame duration for each
     frame. If the tag is not included, the frame duration will be ignored and
     only relative acquisition times are output.
+    The <prefetch>-tag can be used to read the next images in the series on
+    a thread pool while the current image is being processed. At most this
+    number of images is held in memory at once (besides the current image).
+    The <engine>-tag selects how the means are computed: 'sitk' (default)
+    uses a SimpleITK label statistics filter, while 'numpy' precomputes the
+    voxel indices of every ROI label and is faster for ROIs with many labels.
+    The <stats>-tag can be used to compute other statistics than the mean in
+    the same pass over the series, e.g. std,count,min,max,p95 (see
+    colibri.lazy_series_roi_means). The values are stored in the table under
+    the keys LABEL_STAT, e.g. 1_std.
     """
 
     print("Starting image read and ROI-mean calculation.")
 
-    # Get the image and output paths
+    # Get the image path
     img_path = str(task['img_path'])
-    roi_path = str(task['roi_path'])
-    res_name = str(task['res_name'])
-
-    # Create label dictionary
-    labels = {}
-    if 'labels' in task:
-        # This section transforms the string "X,a;Y,b;Z,c" into a dict of the
-        # form {'X': 'a', 'Y': 'b', 'Z': 'c'}
-        label_string = str(task['labels']).split(';')
-        for label in label_string:
-            label_split = label.split(',')
-            labels[label_split[0]] = label_split[1]
-
-    # Create ignore list
-    if 'ignore' in task:
-        # This section transforms the string "a,b,c" into a list of the
-        # form ['a','b','c']
-        ignore = task['ignore'].split(',')
-    else:
-        ignore = []
 
     # Check if resampling is required
     resample: Optional[str] = None
     if 'resample' in task:
         resample = str(task['resample'])
 
+    # Check if other statistics than the mean are required
+    stats: list[str] = []
+    if 'stats' in task:
+        stats = _stats_list(task['stats'])
+
+    # Create the ROI sets
+    if 'roi' in task:
+        roi_tags = task['roi']
+        if not isinstance(roi_tags, list):
+            roi_tags = [roi_tags]
+        roi_sets = [_roi_set(tags, 'path', resample, stats)
+                    for tags in roi_tags]
+    else:
+        roi_sets = [_roi_set(task, 'roi_path', resample, stats)]
+
     # Check if frame duration should be included
     frame_dur = False
     if 'frame_dur' in task:
         if task['frame_dur'] == 'true':
             frame_dur = True
 
+    # Check if images should be prefetched
+    prefetch = 0
+    if 'prefetch' in task:
+        prefetch = int(task['prefetch'])
+
+    # Check which engine should compute the means
+    engine = 'sitk'
+    if 'engine' in task:
+        engine = str(task['engine'])
+
     print("Reading images from ", img_path, ".")
-    print("Reading ROI image from ", roi_path, ".")
+    for roi_set in roi_sets:
+        print("Reading ROI image from ", roi_set['roi_path'], ".")
     print("Processing...")
     # Run the task!
-    dyn = colibri.lazy_series_roi_means(img_path,
-                                        roi_path,
-                                        resample=resample,
-                                        labels=labels,
-                                        ignore=ignore,
-                                        frame_dur=frame_dur)
+    res = colibri.lazy_series_multi_roi_means(img_path,
+                                              roi_sets,
+                                              frame_dur=frame_dur,
+                                              prefetch=prefetch,
+                                              engine=engine)
     print("... done!")
     print()
 
-    print("Storing result as ", res_name, " in named_obj...")
-    # Put result in named_obj
-    named_obj[res_name] = dyn
-    print("... done!")
-    print()
+    for res_name in res:
+        print("Storing result as ", res_name, " in named_obj...")
+        # Put result in named_obj
+        named_obj[res_name] = res[res_name]
+        print("... done!")
+        print()
@@ -4,27 +4,44 @@ import colibri
 
 def task_save_table(task: OrderedDict[str, Any],
                     named_obj: dict[str, Any]):
-    """Save a table (represented as a dict-object) stored in named_obj
+    """Save a table (a Table or dict-object) stored in named_obj
     to a file. The XML-structure of the task should look like this:
 
     <name>TABLE_KEY_IN_NAMED_OBJ</name>
     <file>FILE_PATH_TO_WRITE</file>
+    <format>text_OR_binary</format> <!-- OPTIONAL -->
+
+    The format is described in colibri.save_table. If it is not
+    given, files ending in .ctab are binary and all other files are text.
     """
 
     file_path = task['file']
     table_name = task['name']
-    colibri.save_table(named_obj[table_name], file_path)
+    table_format = task.get('format')
+    colibri.save_table(named_obj[table_name], file_path,
+                       table_format=table_format)
 
 
 def task_load_table(task: OrderedDict[str, Any],
                     named_obj: dict[str, Any]):
-    """Load a table (represented as a dict-object) from a file
+    """Load a table (as a Table) from a file
     to named_obj. The XML-structure of the task should look like this:
 
     <name>TABLE_NAME_IN_NAMED_OBJ</name>
     <file>FILE_PATH_TO_READ</file>
+    <format>text_OR_binary</format> <!-- OPTIONAL -->
+    <mmap>true_OR_false</mmap> <!-- OPTIONAL -->
+
+    The format is described in colibri.save_table. If it is not
+    given, files ending in .ctab are binary and all other files are text.
+    If <mmap> is true, the columns of a binary file are memory-mapped instead
+    of read into memory.
     """
 
     file_path = task['file']
     table_name = task['name']
-    named_obj[table_name] = colibri.load_table(file_path)
+    table_format = task.get('format')
+    mmap = task.get('mmap') == 'true'
+    named_obj[table_name] = colibri.load_table(file_path,
+                                               table_format=table_format,
+                                               mmap=mmap)
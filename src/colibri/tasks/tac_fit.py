@@ -1,36 +1,87 @@
-from typing import OrderedDict, Callable, Any
+from typing import TYPE_CHECKING, OrderedDict, Callable, Any, Optional, \
+    Union
 
 import colibri
 import lmfit
-import matplotlib.pyplot as plt
+import numpy as np
+import re
 
+if TYPE_CHECKING:
+    import matplotlib.axes
 
-def _fit_lmfit(time_data: list[float],
-               tissue_data: list[float],
-               input_data: list[float],
+
+def _get_models() -> dict[str, Callable[..., list[float]]]:
+    # Dict of possible models
+    return {
+        'step2': colibri.model.model_step_2,
+        'fermi2': colibri.model.model_fermi_2,
+        'step_fermi': colibri.model.model_step_fermi,
+        'step': colibri.model.model_step,
+        'patlak': colibri.model.model_patlak
+    }
+
+
+def _read_params(task: OrderedDict[str, Any]) -> dict[str, dict[str, float]]:
+    # Put the <param>-tags of a task into a dict
+    params = {}
+    for param in task['param']:
+        # Initial parameter value
+        param_dict = {'value': float(param['init'])}
+        # Optional parameter minimum
+        if 'min' in param:
+            param_dict['min'] = float(param['min'])
+        # Optional parameter maximum
+        if 'max' in param:
+            param_dict['max'] = float(param['max'])
+        # Get parameter name and store in dict
+        params[param['name']] = param_dict
+    return params
+
+
+def _fit_lmfit(time_data: Union[list[float], np.ndarray],
+               tissue_data: Union[list[float], np.ndarray],
+               input_data: Union[list[float], np.ndarray],
                model: Callable[..., list[float]],
                params: dict[str, dict[str, float]],
                labels: dict[str, str],
-               tcut: int) -> None:
-    # Fit a TAC to a given function using lmfit
+               tcut: int,
+               model_kws: Optional[dict[str, Any]] = None,
+               plot_file: Optional[str] = None,
+               show_plot: bool = True) -> lmfit.model.ModelResult:
+    # Fit a TAC to a given function using lmfit. The model_kws are passed
+    # to the model function as fixed (non-fitted) arguments. The analytic
+    # jacobian of the model is used by the optimizer, if the model has one.
+    # The fit is plotted to plot_file in the background if given, or else
+    # shown in a window if show_plot is True.
+    if model_kws is None:
+        model_kws = {}
 
     # Create lmfit Parameters-object
     parameters = lmfit.create_params(**params)
 
+    # Prepare the input function once for all model evaluations
+    in_func = colibri.model.InputFunction(time_data[0:tcut],
+                                          input_data[0:tcut])
+
     # Define model to fit
-    fit_model = lmfit.Model(model, independent_vars=['t', 'in_func'])
+    fit_model = lmfit.Model(model,
+                            independent_vars=['t', 'in_func'] +
+                            list(model_kws.keys()))
     # Run fit from initial values
     res = fit_model.fit(tissue_data[0:tcut],
                         t=time_data[0:tcut],
-                        in_func=input_data[0:tcut],
-                        params=parameters)
+                        in_func=in_func,
+                        params=parameters,
+                        fit_kws=colibri.fit_kws(model, fit_model),
+                        **model_kws)
 
     # Report!
     lmfit.report_fit(res)
     # Calculate best fitting model
-    best_fit = model(time_data[0:tcut],
-                     input_data[0:tcut],
-                     **res.best_values)
+    best_fit = np.asarray(model(time_data[0:tcut],
+                                in_func,
+                                **res.best_values,
+                                **model_kws))
     # Calculate prediction interval
     e_fit = res.eval_uncertainty(t=time_data[0:tcut], sigma=2)
     p_fit = res.dely_predicted
@@ -38,8 +89,41 @@ def _fit_lmfit(time_data: list[float],
     print("... done!")
     print()
 
-    print("Plotting...")
-    fig, ax = plt.subplots()
+    # Copy the data, since the figure may be drawn after the task is done
+    data = (list(time_data), list(tissue_data), list(input_data))
+
+    def draw(ax: 'matplotlib.axes.Axes'):
+        _draw_fit(ax, *data, tcut, best_fit, e_fit, p_fit, labels)
+
+    if plot_file is not None:
+        # Write the figure in the background and continue
+        print("Writing plot to ", plot_file, " in the background.")
+        print()
+        colibri.save_figure(draw, plot_file)
+    elif show_plot:
+        print("Plotting...")
+        # pyplot is only imported when a window is shown
+        import matplotlib.pyplot as plt
+        fig, ax = plt.subplots()
+        draw(ax)
+        plt.show()
+        plt.close(fig)
+        print("... done!")
+        print()
+
+    return res
+
+
+def _draw_fit(ax: 'matplotlib.axes.Axes',
+              time_data: Union[list[float], np.ndarray],
+              tissue_data: Union[list[float], np.ndarray],
+              input_data: Union[list[float], np.ndarray],
+              tcut: int,
+              best_fit: np.ndarray,
+              e_fit: np.ndarray,
+              p_fit: np.ndarray,
+              labels: dict[str, str]):
+    # Draw the data, the fit and the confidence and prediction bands
     ax.plot(time_data, tissue_data, 'gx', label=labels['tissue'])
     ax.plot(time_data, input_data, 'rx--', label=labels['input'])
     ax.plot(time_data[0:tcut], best_fit, 'k-', label="Fit")
@@ -54,18 +138,17 @@ def _fit_lmfit(time_data: list[float],
     ax.set_xlabel('Time [sec]')
     ax.set_ylabel('Mean ROI-activity concentration [Bq/mL]')
 
-    plt.legend()
-    plt.grid(visible=True)
-    plt.show()
-    print("... done!")
-    print()
+    ax.legend()
+    ax.grid(visible=True)
 
 
 def task_tac_fit(task: OrderedDict[str, Any],
                  named_obj: dict[str, Any]):
     """Run the TACFit task. Fits model parameters to a measured TAC. The fit
     is shown in standard out and a figure of the fitted curve and the data is
-    shown.
+    shown. Several TACs can be fitted with the same input function at once,
+    in which case they are fitted in parallel (see colibri.fit_tacs) and no
+    figures are shown.
     The input is an xml-structure, which must have the following content (in
     any order):
 
@@ -73,6 +156,9 @@ def task_tac_fit(task: OrderedDict[str, Any],
     <time_label>LABEL_OF_TIME_DATA</time_label>
     <inp_label>LABEL_OF_INPUT_FUNCTION_DATA</inp_label>
     <tis_label>LABEL_OF_TISSUE_DATA</tis_label>
+    <tis_label>LABEL_OF_MORE_TISSUE_DATA</tis_label> <!-- OPTIONAL -->
+    <exclude>LABEL_NOT_FITTED_BY_*</exclude> <!-- OPTIONAL -->
+    ...
     <model>FIT_MODEL</model>
     <param>
         <name>PARAM1_NAME</name>
@@ -85,6 +171,62 @@ def task_tac_fit(task: OrderedDict[str, Any],
         <init>PARAM2_INIT_VALUE</init>
     </param>
     ...
+    <grid_step>GRID_STEP</grid_step> <!-- OPTIONAL -->
+    <plot>show_OR_none</plot> <!-- OPTIONAL -->
+    <plot_file>PATH_TO_FIGURE_FILE</plot_file> <!-- OPTIONAL -->
+    <workers>NUMBER_OF_PROCESSES</workers> <!-- OPTIONAL -->
+    <res_name>RESULT_KEY_IN_NAMED_OBJ</res_name> <!-- OPTIONAL -->
+    <multi_start> <!-- OPTIONAL -->
+        <starts>NUMBER_OF_STARTS</starts>
+        <sampling>lhs_OR_grid</sampling> <!-- OPTIONAL -->
+        <max_starts>MAX_NUMBER_OF_GRID_FITS</max_starts> <!-- OPTIONAL -->
+        <target_chisqr>TARGET_CHI_SQUARE</target_chisqr> <!-- OPTIONAL -->
+        <seed>RANDOM_SEED</seed> <!-- OPTIONAL -->
+        <res_name>OPTIMA_KEY_IN_NAMED_OBJ</res_name> <!-- OPTIONAL -->
+    </multi_start>
+    <bootstrap> <!-- OPTIONAL -->
+        <samples>NUMBER_OF_REPLICATES</samples>
+        <method>residual_OR_wild</method> <!-- OPTIONAL -->
+        <level>CONFIDENCE_LEVEL</level> <!-- OPTIONAL -->
+        <seed>RANDOM_SEED</seed> <!-- OPTIONAL -->
+        <res_name>SAMPLES_KEY_IN_NAMED_OBJ</res_name> <!-- OPTIONAL -->
+    </bootstrap>
+
+    The <grid_step>-tag sets the step (in seconds) of the convolution grid of
+    the models with fermi functions (fermi2 and step_fermi). The default is
+    0.05 seconds.
+    By default, the figure of the fit is shown in a window, and the task
+    waits until the window is closed. If the <plot_file>-tag is given, the
+    figure is instead written to that file (e.g. fit.png) in the background,
+    and the next task can start at once. If the <plot>-tag is none, no
+    figure is made.
+    The <tis_label>-tag can be repeated to fit several TACs, or it can be *
+    to fit all the TACs of the table except the time and input function
+    data, the frame durations (frame_dur), the ROI statistics of ROIMeans
+    (e.g. 1_std or 1_p95) and the labels in the <exclude>-tags. The TACs
+    are fitted in parallel with the number of processes in the
+    <workers>-tag (default is given by colibri.default_workers).
+    If the <res_name>-tag is given, the fit results are stored in named_obj
+    as a table with a row for every tissue label (see colibri.fit_tacs).
+    If the <multi_start>-tag is given, every TAC is first fitted in parallel
+    from many initial values sampled within the <min> and <max> of the
+    parameters (see colibri.multi_start_fit), and the final fit starts from
+    the best optimum found. The <starts>-tag is the number of fits with lhs
+    sampling (the default), or the number of grid points along each bounded
+    parameter with grid sampling, which gives starts ** (number of bounded
+    parameters) fits. A grid of more than the <max_starts>-tag (default
+    100000) fits is an error. The search stops early if a fit reaches the
+    chi-square in the <target_chisqr>-tag. The optima found for every TAC,
+    and how often each was found, are printed and stored in named_obj as a
+    table, if the <res_name>-tag of <multi_start> is given.
+    If the <bootstrap>-tag is given, the uncertainty of the fitted parameters
+    of every TAC is estimated with a residual (default) or wild bootstrap
+    with the number of replicates in the <samples>-tag, fitted in parallel
+    from the best fit (see colibri.bootstrap_fit). Percentile confidence
+    intervals at the level in the <level>-tag (default 0.95) are printed and
+    added to the result table as the columns PARAM_NAME_lower and
+    PARAM_NAME_upper. The parameters of every replicate are stored in
+    named_obj as a table, if the <res_name>-tag of <bootstrap> is given.
     """
 
     print("Starting TAC-fitting.")
@@ -95,54 +237,217 @@ def task_tac_fit(task: OrderedDict[str, Any],
     # Get labels of relevant TACs
     inp_label = str(task['inp_label'])
     time_label = str(task['time_label'])
-    tis_label = str(task['tis_label'])
+    tis_labels = task['tis_label']
+    if not isinstance(tis_labels, list):
+        tis_labels = [tis_labels]
+    tis_labels = [str(label) for label in tis_labels]
 
     # Get required fit model:
     fit_model = str(task['model'])
 
     # Load TAC data
     print("Loading TAC-data as ", tac_name, " in named_obj...")
-    tac = named_obj[tac_name]
+    tac = colibri.Table(named_obj[tac_name])
     print("... done!")
     print()
 
+    if tis_labels == ['*']:
+        exclude = task.get('exclude', [])
+        if not isinstance(exclude, list):
+            exclude = [exclude]
+        tis_labels = _all_tac_labels(tac, [time_label, inp_label] +
+                                     [str(label) for label in exclude])
+
     # Get tcut if required
-    t_cut = len(tac[time_label])
+    t_cut = tac.rows
     if 'tcut' in task:
         t_cut = int(task['tcut'])
 
     print("Fitting TAC data to model", fit_model, ".")
 
     # Dict of possible models
-    models = {
-        'step2': colibri.model.model_step_2,
-        'fermi2': colibri.model.model_fermi_2,
-        'step_fermi': colibri.model.model_step_fermi,
-        'step': colibri.model.model_step,
-        'patlak': colibri.model.model_patlak
-    }
+    models = _get_models()
 
     # Put parameters into a dict
-    params = {}
-    for param in task['param']:
-        # Initial parameter value
-        param_dict = {'value': float(param['init'])}
-        # Optional parameter minimum
-        if 'min' in param:
-            param_dict['min'] = float(param['min'])
-        # Optional parameter maximum
-        if 'max' in param:
-            param_dict['max'] = float(param['max'])
-        # Get parameter name and store in dict
-        params[param['name']] = param_dict
+    params = _read_params(task)
+
+    # Get the convolution grid step of the fermi models if required
+    model_kws = {}
+    if 'grid_step' in task:
+        model_kws['grid_step'] = float(task['grid_step'])
+
+    workers: Optional[int] = None
+    if 'workers' in task:
+        workers = int(task['workers'])
+
+    # Get the plot output
+    plot_file: Optional[str] = None
+    if 'plot_file' in task:
+        plot_file = str(task['plot_file'])
+    show_plot = str(task.get('plot', 'show')) != 'none'
+
+    # Search for the best initial values of every TAC if required
+    label_params = {label: params for label in tis_labels}
+    if 'multi_start' in task:
+        ms = task['multi_start']
+        summary: list[colibri.Table] = []
+        for label in tis_labels:
+            print("Multi-start search for", label, ".")
+            optima = colibri.multi_start_fit(
+                time_data=tac[time_label],
+                tissue_data=tac[label],
+                input_data=tac[inp_label],
+                model=models[fit_model],  # type: ignore
+                params=params,
+                starts=int(ms['starts']),
+                sampling=str(ms.get('sampling', 'lhs')),
+                target_chisqr=(float(ms['target_chisqr'])
+                               if 'target_chisqr' in ms else None),
+                tcut=t_cut,
+                model_kws=model_kws,
+                workers=workers,
+                seed=int(ms['seed']) if 'seed' in ms else None,
+                max_starts=(int(ms['max_starts'])
+                            if 'max_starts' in ms else 100000)
+            )
+            print("Found", len(optima['chisqr']), "optima:")
+            _print_table(optima,
+                         list(params.keys()) + ['chisqr', 'count'])
+            print()
+            # Fit from the best optimum
+            label_params[label] = {
+                name: dict(params[name], value=optima[name][0])
+                for name in params}
+            summary.append(colibri.Table({'label': [label] * optima.rows,
+                                          **optima}))
+
+        if 'res_name' in ms:
+            ms_name = str(ms['res_name'])
+            print("Storing multi-start optima as ", ms_name,
+                  " in named_obj...")
+            named_obj[ms_name] = _concat_tables(summary)
+            print("... done!")
+            print()
+
+    if len(tis_labels) == 1:
+        # Fit using lmfit and show the fit
+        res = _fit_lmfit(
+            time_data=tac[time_label],
+            tissue_data=tac[tis_labels[0]],
+            input_data=tac[inp_label],
+            model=models[fit_model],  # type: ignore
+            params=label_params[tis_labels[0]],
+            labels={'input': inp_label, 'tissue': tis_labels[0]},
+            tcut=t_cut,
+            model_kws=model_kws,
+            plot_file=plot_file,
+            show_plot=show_plot
+        )
+        table = colibri.fit_result_table(tis_labels, [res],
+                                         list(params.keys()))
+    else:
+        # Fit all TACs in parallel, every TAC from its own best optimum if
+        # there was a multi-start search
+        table = colibri.fit_tacs(
+            time_data=tac[time_label],
+            tacs={label: tac[label] for label in tis_labels},
+            input_data=tac[inp_label],
+            model=models[fit_model],  # type: ignore
+            params=params,
+            tcut=t_cut,
+            model_kws=model_kws,
+            workers=workers,
+            label_params=label_params
+        )
+        print()
+        _print_table(table, ['label'] + list(params.keys()) + ['redchi'])
+        print()
+
+    # Estimate the parameter uncertainties with a bootstrap if required
+    if 'bootstrap' in task:
+        bs = task['bootstrap']
+        level = float(bs.get('level', 0.95))
+        all_samples: list[colibri.Table] = []
+        intervals_table: dict[str, list[float]] = {}
+        for i, label in enumerate(table['label']):
+            print("Bootstrap of", label, ".")
+            # Start from the best fit, unless it failed
+            best = label_params[label]
+            if not any(np.isnan(table[name][i]) for name in params):
+                best = {name: dict(params[name], value=table[name][i])
+                        for name in params}
+            samples = colibri.bootstrap_fit(
+                time_data=tac[time_label],
+                tissue_data=tac[label],
+                input_data=tac[inp_label],
+                model=models[fit_model],  # type: ignore
+                params=best,
+                samples=int(bs['samples']),
+                method=str(bs.get('method', 'residual')),
+                tcut=t_cut,
+                model_kws=model_kws,
+                workers=workers,
+                seed=int(bs['seed']) if 'seed' in bs else None
+            )
+            intervals = colibri.bootstrap_intervals(samples, level)
+            print(f"{100.0 * level:g}% confidence intervals:")
+            for name in params:
+                lower, upper = intervals[name]
+                print(f"{name:>14}{table[name][i]:>14.6g}   "
+                      f"[{lower:.6g}, {upper:.6g}]")
+                intervals_table.setdefault(name + '_lower', []).append(lower)
+                intervals_table.setdefault(name + '_upper', []).append(upper)
+            print()
+            all_samples.append(colibri.Table({'label': [label] * samples.rows,
+                                              **samples}))
+        for key in intervals_table:
+            table[key] = intervals_table[key]
+
+        if 'res_name' in bs:
+            bs_name = str(bs['res_name'])
+            print("Storing bootstrap samples as ", bs_name,
+                  " in named_obj...")
+            named_obj[bs_name] = _concat_tables(all_samples)
+            print("... done!")
+            print()
+
+    if 'res_name' in task:
+        res_name = str(task['res_name'])
+        print("Storing fit results as ", res_name, " in named_obj...")
+        named_obj[res_name] = table
+        print("... done!")
+        print()
+
+
+def _all_tac_labels(tac: colibri.Table, exclude: list[str]) -> list[str]:
+    # The tissue labels of <tis_label>*: all columns of the table except the
+    # excluded columns, the frame durations and the ROI statistics of other
+    # columns (LABEL_STAT, e.g. 1_std or 1_p95, see ROIMeans)
+    labels = []
+    for label in tac:
+        if label in exclude or label == 'frame_dur':
+            continue
+        base, _, stat = label.rpartition('_')
+        if base in tac and (stat in ('std', 'count', 'sum', 'min', 'max',
+                                     'median') or
+                            re.fullmatch(r'p\d+(\.\d*)?', stat)):
+            continue
+        labels.append(label)
+    return labels
+
+
+def _concat_tables(tables: list[colibri.Table]) -> colibri.Table:
+    # Put the rows of tables with the same columns into one table
+    if not tables:
+        return colibri.Table()
+    return colibri.Table({key: np.concatenate([t[key] for t in tables])
+                          for key in tables[0]})
+
 
-    # Fit using lmfit
-    _fit_lmfit(
-        time_data=tac[time_label],
-        tissue_data=tac[tis_label],
-        input_data=tac[inp_label],
-        model=models[fit_model],  # type: ignore
-        params=params,
-        labels={'input': inp_label, 'tissue': tis_label},
-        tcut=t_cut
-    )
+def _print_table(table: colibri.Table, columns: list[str]):
+    # Print the columns of a table
+    print("".join(f"{col:>14}" for col in columns))
+    for i in range(len(table[columns[0]])):
+        print("".join(f"{table[col][i]:>14.6g}"
+                      if not isinstance(table[col][i], str)
+                      else f"{table[col][i]:>14}" for col in columns))
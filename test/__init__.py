@@ -1 +1,12 @@
 # This is a meaningless comment
+
+import atexit
+import os
+import shutil
+import tempfile
+
+# The tests use a temporary colibri cache directory, so they never write to
+# the cache of the user
+_cache_dir = tempfile.mkdtemp(prefix='colibri-test-cache-')
+os.environ['COLIBRI_CACHE_DIR'] = _cache_dir
+atexit.register(shutil.rmtree, _cache_dir, ignore_errors=True)
@@ -0,0 +1,134 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from typing import Any, Optional
+import colibri
+import colibri.batch
+
+_run_study = colibri.batch._run_study
+
+
+def _crash_study(study: dict[str, str],
+                 template: str,
+                 log_path: Optional[str]) -> dict[str, Any]:
+    # Run a study, where the worker process dies in the study 'missing'
+    if study['id'] == 'missing':
+        os._exit(1)
+    return _run_study(study, template, log_path)
+
+
+class TestReadManifest(unittest.TestCase):
+
+    def test_read_manifest_csv(self):
+        studies = colibri.read_manifest(
+            os.path.join('test', 'xml_input', 'test_batch_manifest.csv'))
+        self.assertEqual([s['id'] for s in studies], ['a', 'missing', 'b'])
+        self.assertEqual(studies[0], {'id': 'a',
+                                      'img_path': 'test/data/8_3V',
+                                      'labels': '1,x;2,y'})
+
+    def test_read_manifest_xml(self):
+        studies = colibri.read_manifest(
+            os.path.join('test', 'xml_input', 'test_batch_manifest.xml'))
+        studies2 = colibri.read_manifest(
+            os.path.join('test', 'xml_input', 'test_batch_manifest.csv'))
+        self.assertEqual(studies, studies2)
+
+    def test_read_manifest_duplicate_id(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp, 'manifest.csv')
+            with open(path, 'w') as f:
+                f.write("id,img_path\na,x\na,y\n")
+            with self.assertRaises(ValueError):
+                colibri.read_manifest(path)
+        finally:
+            shutil.rmtree(tmp)
+
+
+class TestFillTemplate(unittest.TestCase):
+
+    def test_fill_template(self):
+        xml = colibri.fill_template("<a>${img_path}</a><b>$id</b>",
+                                    {'id': 'p1', 'img_path': 'x&y'})
+        self.assertEqual(xml, "<a>x&amp;y</a><b>p1</b>")
+
+    def test_fill_template_missing_key(self):
+        with self.assertRaises(KeyError):
+            colibri.fill_template("<a>${img_path}</a>", {'id': 'p1'})
+
+
+class TestRunBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def test_run_batch(self):
+        log_dir = os.path.join(self.tmp, 'logs')
+        results = colibri.run_batch(
+            os.path.join('test', 'xml_input', 'test_batch_manifest.csv'),
+            os.path.join('test', 'xml_input', 'test_batch_template.xml'),
+            workers=2, log_dir=log_dir)
+
+        # The missing series fails without affecting the other studies
+        self.assertEqual([r['id'] for r in results], ['a', 'missing', 'b'])
+        self.assertEqual([r['success'] for r in results],
+                         [True, False, True])
+        self.assertIsNone(results[0]['error'])
+        self.assertIsNotNone(results[1]['error'])
+        self.assertTrue(all(r['time'] >= 0 for r in results))
+        for study_id in ['a', 'missing', 'b']:
+            self.assertTrue(
+                os.path.isfile(os.path.join(log_dir, study_id + '.log')))
+
+        tac_a = colibri.load_table(os.path.join('test', 'batch_a.txt'))
+        tac_b = colibri.load_table(os.path.join('test', 'batch_b.txt'))
+        self.assertEqual(sorted(tac_a.keys()), ['0', 'tacq', 'x', 'y'])
+        self.assertEqual(sorted(tac_b.keys()), ['0', '1', 'tacq', 'y'])
+        self.assertAlmostEqual(tac_a['x'][3], 12019.3, places=1)
+        self.assertEqual(tac_a['y'].tolist(), tac_b['y'].tolist())
+        self.assertFalse(
+            os.path.exists(os.path.join('test', 'batch_missing.txt')))
+
+    def test_run_batch_worker_died(self):
+        # A dead worker process only fails its own study
+        with mock.patch('colibri.batch._run_study', _crash_study):
+            results = colibri.run_batch(
+                os.path.join('test', 'xml_input', 'test_batch_manifest.csv'),
+                os.path.join('test', 'xml_input', 'test_batch_template.xml'),
+                workers=2)
+        self.assertEqual([r['id'] for r in results], ['a', 'missing', 'b'])
+        self.assertEqual([r['success'] for r in results],
+                         [True, False, True])
+        self.assertEqual(results[1]['error'], "The worker process died.")
+        self.assertTrue(os.path.isfile(os.path.join('test', 'batch_b.txt')))
+
+    def test_run_study_fit_workers(self):
+        with mock.patch.dict(os.environ):
+            os.environ.pop('COLIBRI_FIT_WORKERS', None)
+            self.assertEqual(colibri.default_workers(), os.cpu_count())
+            res = colibri.batch._run_study({'id': 'a'}, '<colibri/>', None)
+            self.assertEqual(os.environ['COLIBRI_FIT_WORKERS'], '1')
+            self.assertEqual(colibri.default_workers(), 1)
+        self.assertFalse(res['success'])
+
+    def test_save_batch_summary(self):
+        results = [{'id': 'a', 'success': True, 'time': 1.5, 'error': None},
+                   {'id': 'b', 'success': False, 'time': 0.5,
+                    'error': "ValueError('x')"}]
+        path = os.path.join(self.tmp, 'summary.csv')
+        colibri.save_batch_summary(results, path)
+        with open(path) as f:
+            lines = f.read().splitlines()
+        self.assertEqual(lines, ['id,success,time,error',
+                                 'a,True,1.5,',
+                                 "b,False,0.5,ValueError('x')"])
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+        for study_id in ['a', 'b', 'missing']:
+            path = os.path.join('test', 'batch_' + study_id + '.txt')
+            if os.path.exists(path):
+                os.remove(path)
@@ -0,0 +1,158 @@
+import os
+import shutil
+import tempfile
+import unittest
+from collections import OrderedDict
+from typing import Any
+from unittest import mock
+import colibri
+import SimpleITK as sitk
+
+
+class TestGetCacheDir(unittest.TestCase):
+
+    def test_cache_dir_env(self):
+        with mock.patch.dict(os.environ, {'COLIBRI_CACHE_DIR': 'abc'}):
+            self.assertEqual(colibri.get_cache_dir(), 'abc')
+
+
+class TestGetSeriesIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.dcm_path = os.path.join(self.tmp, 'series')
+        shutil.copytree(os.path.join('test', 'data', '8_3V'), self.dcm_path)
+        self.env = mock.patch.dict(
+            os.environ, {'COLIBRI_CACHE_DIR': os.path.join(self.tmp, 'c')})
+        self.env.start()
+
+    def test_series_index_8_3V(self):
+        index = colibri.get_series_index(self.dcm_path)
+        self.assertEqual(len(index['files']), 9)
+        self.assertEqual(index['acq'],
+                         [0, 3.0, 6.3, 9.5, 12.8, 16.0, 19.3, 22.5, 25.8])
+        self.assertEqual(index['frame_dur'][0], 3.04)
+        self.assertEqual(index['size'], (128, 128, 64))
+        self.assertEqual(index['spacing'], (4.92, 4.92, 4.92))
+
+    def test_series_index_cache_hit(self):
+        index = colibri.get_series_index(self.dcm_path)
+        with mock.patch.object(sitk.ImageSeriesReader,
+                               'GetGDCMSeriesFileNames') as scan:
+            index2 = colibri.get_series_index(self.dcm_path)
+            scan.assert_not_called()
+        self.assertEqual(index, index2)
+
+    def test_series_index_stale(self):
+        index = colibri.get_series_index(self.dcm_path)
+
+        # Remove the last frame from the directory
+        os.remove(index['files'][-1])
+        index2 = colibri.get_series_index(self.dcm_path)
+        self.assertEqual(len(index2['files']), 8)
+        self.assertEqual(index2['acq'],
+                         [0, 3.0, 6.3, 9.5, 12.8, 16.0, 19.3, 22.5])
+
+    def test_series_index_no_cache(self):
+        colibri.get_series_index(self.dcm_path, use_cache=False)
+        self.assertFalse(
+            os.path.exists(os.path.join(self.tmp, 'c', 'series_index')))
+
+    def tearDown(self):
+        self.env.stop()
+        shutil.rmtree(self.tmp)
+
+
+class TestTaskCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.tac_path = os.path.join(self.tmp, 'tac.txt')
+        shutil.copy(os.path.join('test', 'data', 'tac', 'ex_tac.dat'),
+                    self.tac_path)
+        self.env = mock.patch.dict(
+            os.environ, {'COLIBRI_CACHE_DIR': os.path.join(self.tmp, 'c')})
+        self.env.start()
+        self.task = OrderedDict([('@name', 'LoadTable'), ('name', 'tac'),
+                                 ('file', self.tac_path)])
+        self.func = mock.Mock(side_effect=colibri.tasks.task_load_table)
+
+    def test_task_cache_hit(self):
+        named_obj: dict[str, Any] = {}
+        colibri.run_cached_task(self.func, self.task, named_obj)
+        named_obj2: dict[str, Any] = {}
+        colibri.run_cached_task(self.func, self.task, named_obj2)
+        self.assertEqual(self.func.call_count, 1)
+        self.assertEqual(named_obj2['tac'], named_obj['tac'])
+
+    def test_task_cache_file_changed(self):
+        colibri.run_cached_task(self.func, self.task, {})
+        with open(self.tac_path, 'a') as f:
+            f.write('100 1 2\n')
+        named_obj: dict[str, Any] = {}
+        colibri.run_cached_task(self.func, self.task, named_obj)
+        self.assertEqual(self.func.call_count, 2)
+        self.assertEqual(named_obj['tac']['tacq'][-1], 100.0)
+
+    def test_task_cache_tags_changed(self):
+        colibri.run_cached_task(self.func, self.task, {})
+        self.task['name'] = 'tac2'
+        named_obj: dict[str, Any] = {}
+        colibri.run_cached_task(self.func, self.task, named_obj)
+        self.assertEqual(self.func.call_count, 2)
+        self.assertIn('tac2', named_obj)
+
+    def test_task_cache_code_changed(self):
+        colibri.run_cached_task(self.func, self.task, {})
+        with mock.patch('colibri.cache._source_hash', 'changed'):
+            colibri.run_cached_task(self.func, self.task, {})
+        self.assertEqual(self.func.call_count, 2)
+
+    def test_task_cache_obj_changed(self):
+        task = OrderedDict([('@name', 'SaveTable'), ('name', 'tac'),
+                            ('file', os.path.join(self.tmp, 'out.txt'))])
+        func = mock.Mock(side_effect=colibri.tasks.task_save_table)
+        colibri.run_cached_task(func, task, {'tac': {'x': [1.0, 2.0]}})
+        colibri.run_cached_task(func, task, {'tac': {'x': [1.0, 2.0]}})
+        self.assertEqual(func.call_count, 1)
+        colibri.run_cached_task(func, task, {'tac': {'x': [1.0, 3.0]}})
+        self.assertEqual(func.call_count, 2)
+
+    def test_task_cache_output_deleted(self):
+        out_path = os.path.join(self.tmp, 'out.txt')
+        task = OrderedDict([('@name', 'SaveTable'), ('name', 'tac'),
+                            ('file', out_path)])
+        func = mock.Mock(side_effect=colibri.tasks.task_save_table)
+        colibri.run_cached_task(func, task, {'tac': {'x': [1.0, 2.0]}})
+        os.remove(out_path)
+        colibri.run_cached_task(func, task, {'tac': {'x': [1.0, 2.0]}})
+        self.assertEqual(func.call_count, 2)
+        self.assertTrue(os.path.isfile(out_path))
+
+    def test_task_cache_evict(self):
+        with mock.patch.dict(os.environ, {'COLIBRI_TASK_CACHE_SIZE': '0'}):
+            colibri.run_cached_task(self.func, self.task, {})
+            colibri.run_cached_task(self.func, self.task, {})
+        self.assertEqual(self.func.call_count, 2)
+        self.assertEqual(
+            os.listdir(os.path.join(self.tmp, 'c', 'tasks')), [])
+
+    def test_clear_task_cache(self):
+        colibri.run_cached_task(self.func, self.task, {})
+        colibri.clear_task_cache()
+        colibri.run_cached_task(self.func, self.task, {})
+        self.assertEqual(self.func.call_count, 2)
+
+    def test_run_xml_cache(self):
+        with open(os.path.join('test', 'xml_input',
+                               'test_load_table.xml')) as f:
+            xml_text = f.read()
+        named_obj = colibri.run_xml(xml_text, cache=True)
+        with mock.patch.object(colibri.tasks, 'task_load_table') as func:
+            named_obj2 = colibri.run_xml(xml_text, cache=True)
+            func.assert_not_called()
+        self.assertEqual(named_obj2['table'], named_obj['table'])
+
+    def tearDown(self):
+        self.env.stop()
+        shutil.rmtree(self.tmp)
@@ -1,8 +1,10 @@
 import os
 import unittest
+import warnings
 from datetime import datetime
 import colibri
-from typing import Union
+import numpy as np
+from typing import Any, Union
 
 
 class TestGetAcqDateTime(unittest.TestCase):
@@ -22,6 +24,22 @@ class TestGetAcqDateTime(unittest.TestCase):
         self.assertEqual(dt, datetime(2023, 12, 1, 13, 30, 40, 800000))
 
 
+class TestReadDicomHeader(unittest.TestCase):
+
+    def test_read_dicom_header_8_3V_1(self):
+        dcm_path = os.path.join(
+            'test', 'data', '8_3V',
+            'Patient_test_Study_10_Scan_10_Bed_1_Dyn_1.dcm')
+        reader = colibri.read_dicom_header(dcm_path)
+        self.assertEqual(reader.GetSize(), (128, 128, 64))
+        self.assertEqual(reader.GetSpacing(), (4.92, 4.92, 4.92))
+        self.assertEqual(reader.GetMetaData('0018|1242'), '3040')
+
+    def test_dicom_datetime(self):
+        dt = colibri.dicom_datetime('20231201', '133040.8')
+        self.assertEqual(dt, datetime(2023, 12, 1, 13, 30, 40, 800000))
+
+
 class TestShiftTime(unittest.TestCase):
 
     def test_shift_time_one_step(self):
@@ -48,10 +66,86 @@ class TestSaveLoadDict(unittest.TestCase):
              }
         colibri.save_table(tac, os.path.join('test', 'tac.txt'))
         tac2 = colibri.load_table(os.path.join('test', 'tac.txt'))
-        self.assertEqual(tac2['tacq'], [0.0, 1.2, 5.4])
-        self.assertEqual(tac2['1'], [1.0, 2.0, 3.0])
-        self.assertEqual(tac2['2'], [0.5, 0.1, 3.0])
+        self.assertEqual(tac2['tacq'].tolist(), [0.0, 1.2, 5.4])
+        self.assertEqual(tac2['1'].tolist(), [1.0, 2.0, 3.0])
+        self.assertEqual(tac2['2'].tolist(), [0.5, 0.1, 3.0])
+
+    def test_load_table_text_strings(self):
+        path = os.path.join('test', 'tac.txt')
+        with open(path, 'w') as f:
+            f.write('# tacq label\n0.0 liver\n1.5 spleen\n\n')
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            tac = colibri.load_table(path)
+        self.assertEqual(tac['tacq'].dtype, np.float64)
+        self.assertEqual(tac['tacq'].tolist(), [0.0, 1.5])
+        self.assertEqual(tac['label'].tolist(), ['liver', 'spleen'])
+
+    def test_load_table_text_no_warning(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            tac = colibri.load_table(
+                os.path.join('test', 'data', 'tac', 'ex_tac.dat'))
+        self.assertEqual(tac['tacq'].dtype, np.float64)
+
+    def test_save_load_table_binary(self):
+        tac: dict[Union[str, int], Any] = \
+            {1: [1.0, 2.0, 3.0],
+             'tacq': np.array([0.0, 1.0 / 3.0, np.pi]),
+             'n': np.array([1, 2, 3], dtype=np.int32),
+             'label': ['liver', 'spleen', 'heart']
+             }
+        path = os.path.join('test', 'tac.ctab')
+        colibri.save_table(tac, path)
+        tac2 = colibri.load_table(path)
+        self.assertEqual(list(tac2.keys()), ['1', 'tacq', 'n', 'label'])
+        self.assertEqual(tac2['1'].tolist(), [1.0, 2.0, 3.0])
+        # Floats are stored exactly
+        np.testing.assert_array_equal(tac2['tacq'], tac['tacq'])
+        self.assertEqual(tac2['n'].dtype, np.int32)
+        self.assertEqual(tac2['n'].tolist(), [1, 2, 3])
+        self.assertEqual(tac2['label'].tolist(), ['liver', 'spleen', 'heart'])
+
+    def test_save_load_table_binary_mmap(self):
+        tac: dict[Union[str, int], Any] = \
+            {'tacq': np.linspace(0.0, 1.0, 1000),
+             'x': np.arange(1000.0)}
+        path = os.path.join('test', 'tac.txt')
+        colibri.save_table(tac, path, table_format='binary')
+        tac2 = colibri.load_table(path, table_format='binary', mmap=True)
+        self.assertIsInstance(tac2['x'], np.memmap)
+        self.assertFalse(tac2['x'].flags.writeable)
+        np.testing.assert_array_equal(tac2['tacq'], tac['tacq'])
+        np.testing.assert_array_equal(tac2['x'], tac['x'])
+        del tac2
+
+    def test_save_load_table_binary_empty(self):
+        tac: dict[Union[str, int], Any] = {'tacq': [], 'x': []}
+        path = os.path.join('test', 'tac.ctab')
+        colibri.save_table(tac, path)
+        tac2 = colibri.load_table(path, mmap=True)
+        self.assertEqual(tac2['tacq'].tolist(), [])
+        self.assertEqual(tac2['x'].tolist(), [])
+
+    def test_save_table_binary_length(self):
+        tac: dict[Union[str, int], Any] = {'tacq': [0.0, 1.0], 'x': [1.0]}
+        with self.assertRaises(ValueError):
+            colibri.save_table(tac, os.path.join('test', 'tac.ctab'))
+
+    def test_load_table_binary_not_table(self):
+        tac: dict[Union[str, int], Any] = {'tacq': [0.0, 1.0]}
+        colibri.save_table(tac, os.path.join('test', 'tac.txt'))
+        with self.assertRaises(ValueError):
+            colibri.load_table(os.path.join('test', 'tac.txt'),
+                               table_format='binary')
+
+    def test_table_format_unknown(self):
+        tac: dict[Union[str, int], Any] = {'tacq': [0.0, 1.0]}
+        with self.assertRaises(ValueError):
+            colibri.save_table(tac, os.path.join('test', 'tac.txt'),
+                               table_format='csv')
 
     def tearDown(self):
-        if os.path.exists(os.path.join('test', 'tac.txt')):
-            os.remove(os.path.join('test', 'tac.txt'))
+        for name in ['tac.txt', 'tac.ctab']:
+            if os.path.exists(os.path.join('test', name)):
+                os.remove(os.path.join('test', name))
@@ -0,0 +1,204 @@
+import unittest
+from unittest import mock
+import colibri
+import lmfit
+import numpy as np
+
+
+class TestFitTacs(unittest.TestCase):
+
+    def setUp(self):
+        self.t = [2.0 * i for i in range(30)]
+        self.inp = [1000.0 * np.exp(-(ti - 8.0)**2 / 10.0) + 50.0
+                    for ti in self.t]
+        rng = np.random.default_rng(0)
+        self.tacs = {}
+        for label, amp, extent in [('a', 0.3, 4.0), ('b', 0.1, 10.0),
+                                   ('c', 0.2, 6.0)]:
+            tac = colibri.model.model_step(self.t, self.inp, amp, extent)
+            self.tacs[label] = list(np.array(tac) +
+                                    rng.normal(0.0, 1.0, len(self.t)))
+        self.params = {'amp': {'value': 0.15, 'min': 0.0},
+                       'extent': {'value': 5.0, 'min': 0.0}}
+
+    def test_fit_tacs(self):
+        model = lmfit.Model(colibri.model.model_step,
+                            independent_vars=['t', 'in_func'])
+        for workers in [1, 2]:
+            table = colibri.fit_tacs(self.t, self.tacs, self.inp,
+                                     colibri.model.model_step, self.params,
+                                     tcut=25, workers=workers)
+            self.assertEqual(table['label'].tolist(), ['a', 'b', 'c'])
+            self.assertEqual(list(table.keys()),
+                             ['label', 'amp', 'amp_stderr', 'extent',
+                              'extent_stderr', 'chisqr', 'redchi',
+                              'rsquared', 'aic', 'bic', 'nfev'])
+            for i, label in enumerate(table['label']):
+                fit = model.fit(self.tacs[label][:25], t=self.t[:25],
+                                in_func=self.inp[:25],
+                                params=lmfit.create_params(**self.params))
+                self.assertAlmostEqual(table['amp'][i],
+                                       fit.best_values['amp'], places=5)
+                self.assertAlmostEqual(table['extent'][i],
+                                       fit.best_values['extent'], places=3)
+                self.assertAlmostEqual(table['redchi'][i], fit.redchi,
+                                       places=3)
+                self.assertGreater(table['rsquared'][i], 0.9)
+
+    def test_fit_tacs_label_params(self):
+        # Label b is fitted from its own parameters, with a fixed extent
+        label_params = {'b': {'amp': {'value': 0.15, 'min': 0.0},
+                              'extent': {'value': 5.0, 'vary': False}}}
+        for workers in [1, 2]:
+            table = colibri.fit_tacs(self.t, self.tacs, self.inp,
+                                     colibri.model.model_step, self.params,
+                                     workers=workers,
+                                     label_params=label_params)
+            self.assertEqual(table['extent'][1], 5.0)
+            self.assertAlmostEqual(table['extent'][0], 4.0, delta=1.0)
+
+    def test_fit_result_table(self):
+        model = lmfit.Model(colibri.model.model_step,
+                            independent_vars=['t', 'in_func'])
+        fit = model.fit(self.tacs['a'], t=self.t, in_func=self.inp,
+                        params=lmfit.create_params(**self.params))
+        table = colibri.fit_result_table(['a', 'b'], [fit, None],
+                                         ['amp', 'extent'])
+        self.assertEqual(table['label'].tolist(), ['a', 'b'])
+        self.assertEqual(table['amp'][0], fit.best_values['amp'])
+        self.assertEqual(table['nfev'][0], fit.nfev)
+        self.assertTrue(np.isnan(table['chisqr'][1]))
+
+    def test_fit_tacs_failed(self):
+        # A TAC that cannot be fitted gives a row of NaN
+        tacs = {'a': self.tacs['a'], 'bad': [np.nan] * len(self.t)}
+        table = colibri.fit_tacs(self.t, tacs, self.inp,
+                                 colibri.model.model_step, self.params,
+                                 workers=1)
+        self.assertFalse(np.isnan(table['amp'][0]))
+        self.assertTrue(np.isnan(table['amp'][1]))
+        self.assertTrue(np.isnan(table['redchi'][1]))
+
+
+class TestMultiStartFit(unittest.TestCase):
+
+    def setUp(self):
+        self.t = [2.0 * i for i in range(30)]
+        self.inp = [1000.0 * np.exp(-(ti - 8.0)**2 / 10.0) + 50.0
+                    for ti in self.t]
+        true = {'amp1': 0.1, 'extent1': 3.0, 'amp2': 0.3, 'extent2': 12.0,
+                'width2': 3.0}
+        rng = np.random.default_rng(0)
+        self.tac = list(
+            np.array(colibri.model.model_step_fermi(self.t, self.inp,
+                                                    **true)) +
+            rng.normal(0.0, 2.0, len(self.t)))
+        self.params = {'amp1': {'value': 0.05, 'min': 0.0, 'max': 1.0},
+                       'extent1': {'value': 4.0, 'min': 0.0, 'max': 30.0},
+                       'amp2': {'value': 0.2, 'min': 0.0, 'max': 1.0},
+                       'extent2': {'value': 10.0, 'min': 0.0, 'max': 30.0},
+                       'width2': {'value': 2.0, 'min': 0.1, 'max': 10.0}}
+
+    def test_multi_start_fit(self):
+        tables = []
+        for workers in [1, 2]:
+            table = colibri.multi_start_fit(
+                self.t, self.tac, self.inp, colibri.model.model_step_fermi,
+                self.params, starts=20, workers=workers, seed=1)
+            tables.append(table)
+            self.assertEqual(list(table.keys()),
+                             ['amp1', 'extent1', 'amp2', 'extent2', 'width2',
+                              'chisqr', 'count'])
+            self.assertEqual(sum(table['count']), 20)
+            self.assertEqual(table['chisqr'].tolist(),
+                             sorted(table['chisqr']))
+            self.assertAlmostEqual(table['amp1'][0], 0.0988, places=4)
+            self.assertAlmostEqual(table['extent1'][0], 3.0785, places=3)
+            self.assertAlmostEqual(table['extent2'][0], 12.0013, places=3)
+        self.assertEqual(tables[0]['count'].tolist(),
+                         tables[1]['count'].tolist())
+
+    def test_multi_start_fit_grid(self):
+        params = dict(self.params)
+        params['amp1'] = {'value': 0.1}
+        params['amp2'] = {'value': 0.3}
+        params['width2'] = {'value': 3.0, 'min': 0.1}
+        table = colibri.multi_start_fit(
+            self.t, self.tac, self.inp, colibri.model.model_step_fermi,
+            params, starts=3, sampling='grid', workers=1)
+        # A 3 x 3 grid of the two parameters with both bounds
+        self.assertEqual(sum(table['count']), 9)
+
+    def test_multi_start_fit_grid_too_large(self):
+        # 10 ** 5 grid points is rejected before any fit is run
+        with mock.patch('colibri.fitting._fit_start') as fit:
+            with self.assertRaisesRegex(ValueError, 'lhs'):
+                colibri.multi_start_fit(
+                    self.t, self.tac, self.inp,
+                    colibri.model.model_step_fermi, self.params, starts=10,
+                    sampling='grid', workers=1, max_starts=1000)
+            fit.assert_not_called()
+
+    def test_multi_start_fit_target(self):
+        table = colibri.multi_start_fit(
+            self.t, self.tac, self.inp, colibri.model.model_step_fermi,
+            self.params, starts=20, workers=1, seed=1, target_chisqr=100.0)
+        self.assertLess(sum(table['count']), 20)
+        self.assertLessEqual(table['chisqr'][0], 100.0)
+
+    def test_multi_start_fit_errors(self):
+        with self.assertRaises(ValueError):
+            colibri.multi_start_fit(
+                self.t, self.tac, self.inp, colibri.model.model_step,
+                {'amp': {'value': 0.1}, 'extent': {'value': 3.0}},
+                starts=5)
+        with self.assertRaises(ValueError):
+            colibri.multi_start_fit(
+                self.t, self.tac, self.inp, colibri.model.model_step_fermi,
+                self.params, starts=5, sampling='random')
+
+
+class TestBootstrapFit(unittest.TestCase):
+
+    def setUp(self):
+        self.t = [2.0 * i for i in range(30)]
+        self.inp = [1000.0 * np.exp(-(ti - 8.0)**2 / 10.0) + 50.0
+                    for ti in self.t]
+        rng = np.random.default_rng(0)
+        self.tac = list(
+            np.array(colibri.model.model_step(self.t, self.inp, 0.2, 6.0)) +
+            rng.normal(0.0, 2.0, len(self.t)))
+        self.params = {'amp': {'value': 0.1, 'min': 0.0},
+                       'extent': {'value': 5.0, 'min': 0.0}}
+
+    def test_bootstrap_fit(self):
+        for method in ['residual', 'wild']:
+            samples = []
+            for workers in [1, 2]:
+                s = colibri.bootstrap_fit(
+                    self.t, self.tac, self.inp, colibri.model.model_step,
+                    self.params, 40, method=method, workers=workers,
+                    seed=3, chunk_size=7)
+                self.assertEqual(list(s.keys()), ['amp', 'extent'])
+                self.assertEqual(len(s['amp']), 40)
+                samples.append(s)
+            # The replicates do not depend on the number of workers
+            self.assertEqual(samples[0], samples[1])
+
+            intervals = colibri.bootstrap_intervals(samples[0], 0.9)
+            self.assertLess(intervals['amp'][0], 0.2)
+            self.assertGreater(intervals['amp'][1], 0.2)
+            self.assertLess(intervals['extent'][0], 6.0)
+            self.assertGreater(intervals['extent'][1], 6.0)
+
+    def test_bootstrap_fit_method(self):
+        with self.assertRaises(ValueError):
+            colibri.bootstrap_fit(
+                self.t, self.tac, self.inp, colibri.model.model_step,
+                self.params, 10, method='pairs')
+
+    def test_bootstrap_intervals(self):
+        samples = {'a': [float(i) for i in range(101)] + [np.nan]}
+        intervals = colibri.bootstrap_intervals(samples, 0.9)
+        self.assertAlmostEqual(intervals['a'][0], 5.0)
+        self.assertAlmostEqual(intervals['a'][1], 95.0)
@@ -1,7 +1,29 @@
 import os.path
+import shutil
+import tempfile
 import unittest
 import colibri
+import numpy as np
 import SimpleITK as sitk
+from typing import Any
+
+
+class TestReadSeriesInfo(unittest.TestCase):
+
+    def test_read_series_info_8_3V(self):
+        dcm_path = os.path.join('test', 'data', '8_3V')
+        dcm_names = sitk.ImageSeriesReader.GetGDCMSeriesFileNames(dcm_path)
+        info = colibri.read_series_info(dcm_names)
+        self.assertEqual(info['acq'],
+                         [0, 3.0, 6.3, 9.5, 12.8, 16.0, 19.3, 22.5, 25.8])
+        self.assertEqual(info['frame_dur'],
+                         [3.04, 3.26, 3.26, 3.26, 3.25,
+                          3.26, 3.25, 3.26, 3.26])
+        self.assertEqual(info['size'], (128, 128, 64))
+        self.assertEqual(info['spacing'], (4.92, 4.92, 4.92))
+        self.assertEqual(info['origin'], (-309.28, -299.14, 906.47))
+        self.assertEqual(info['direction'],
+                         (1.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 1.0))
 
 
 class TestLoadDynamicSeries(unittest.TestCase):
@@ -138,6 +160,22 @@ class TestSeriesRoiMeans(unittest.TestCase):
         self.assertEqual(r[1][8], 0)
         self.assertAlmostEqual(r[2][8], 0.0727437, places=7)
 
+    def test_series_roi_means_8_3V_numpy(self):
+        dcm_path = os.path.join('test', 'data', '8_3V')
+        roi_path = os.path.join(
+            'test', 'data', '8_3V_seg', 'Segmentation.nrrd')
+        dyn = colibri.load_dynamic_series(dcm_path)
+        roi = sitk.ReadImage(roi_path)
+
+        r = colibri.series_roi_means(dyn['img'], roi)
+        r2 = colibri.series_roi_means(dyn['img'], roi, engine='numpy')
+
+        self.assertEqual(list(r.keys()), [0, 1, 2])
+        self.assertEqual(list(r.keys()), list(r2.keys()))
+        for label in r:
+            for i in range(9):
+                self.assertAlmostEqual(r[label][i], r2[label][i], places=6)
+
 
 class TestLazySeriesRoiMeans(unittest.TestCase):
 
@@ -148,7 +186,7 @@ class TestLazySeriesRoiMeans(unittest.TestCase):
         dyn = colibri.lazy_series_roi_means(dcm_path, roi_path)
 
         tacq = dyn['tacq']
-        self.assertEqual(tacq,
+        self.assertEqual(tacq.tolist(),
                          [0, 3.0, 6.3, 9.5, 12.8, 16.0, 19.3, 22.5, 25.8])
 
         r1 = dyn['1']
@@ -236,6 +274,85 @@ class TestLazySeriesRoiMeans(unittest.TestCase):
         self.assertEqual(3.26, frame_durs[7])
         self.assertEqual(3.26, frame_durs[8])
 
+    def test_prefetch(self):
+        dcm_path = os.path.join('test', 'data', '8_3V')
+        roi_path = os.path.join(
+            'test', 'data', '8_3V_seg', 'Segmentation.nrrd')
+        dyn = colibri.lazy_series_roi_means(dcm_path, roi_path)
+        for prefetch in [1, 2, 20]:
+            dyn2 = colibri.lazy_series_roi_means(dcm_path, roi_path,
+                                                 prefetch=prefetch)
+            self.assertEqual(dyn, dyn2)
+
+    def test_engine_numpy(self):
+        dcm_path = os.path.join('test', 'data', '8_3V')
+        roi_path = os.path.join(
+            'test', 'data', '8_3V_seg', 'Segmentation.nrrd')
+        dyn = colibri.lazy_series_roi_means(dcm_path, roi_path,
+                                            labels={'2': 'b'},
+                                            ignore=['0'])
+        dyn2 = colibri.lazy_series_roi_means(dcm_path, roi_path,
+                                             labels={'2': 'b'},
+                                             ignore=['0'],
+                                             engine='numpy')
+        self.assertEqual(list(dyn2.keys()), ['tacq', '1', 'b'])
+        self.assertEqual(dyn['tacq'].tolist(), dyn2['tacq'].tolist())
+        for label in ['1', 'b']:
+            for i in range(9):
+                self.assertAlmostEqual(dyn[label][i], dyn2[label][i],
+                                       places=6)
+
+    def test_engine_key_order(self):
+        # Both engines give the labels (and statistics) in the same order
+        dcm_path = os.path.join('test', 'data', '8_3V')
+        roi_path = os.path.join(
+            'test', 'data', '8_3V_seg', 'Segmentation.nrrd')
+        for resample in [None, 'roi']:
+            res = [colibri.lazy_series_roi_means(dcm_path, roi_path,
+                                                 resample=resample,
+                                                 stats=['std'],
+                                                 engine=engine)
+                   for engine in ['sitk', 'numpy']]
+            self.assertEqual(list(res[0].keys()),
+                             ['tacq', '0', '1', '2', '0_std', '1_std',
+                              '2_std'])
+            self.assertEqual(list(res[0].keys()), list(res[1].keys()))
+
+    def test_ignore_background_region(self):
+        # Only the bounding box of labels 1 and 2 is read from each frame
+        dcm_path = os.path.join('test', 'data', '8_3V')
+        roi_path = os.path.join(
+            'test', 'data', '8_3V_seg', 'Segmentation.nrrd')
+        dyn = colibri.load_dynamic_series(dcm_path)
+        expected = colibri.series_roi_means(dyn['img'],
+                                            sitk.ReadImage(roi_path))
+        for engine in ['sitk', 'numpy']:
+            r = colibri.lazy_series_roi_means(dcm_path, roi_path,
+                                              ignore=['0'], engine=engine)
+            for label in [1, 2]:
+                for i in range(9):
+                    self.assertAlmostEqual(r[str(label)][i],
+                                           expected[label][i], places=6)
+
+    def test_engine_numpy_size_mismatch(self):
+        dcm_path = os.path.join('test', 'data', '8_3V')
+        dyn = colibri.load_dynamic_series(dcm_path)
+        roi = sitk.Image(10, 10, 10, sitk.sitkUInt8)
+        with self.assertRaises(ValueError):
+            colibri.series_roi_means(dyn['img'], roi, engine='numpy')
+
+    def test_engine_unknown(self):
+        dcm_path = os.path.join('test', 'data', '8_3V')
+        roi_path = os.path.join(
+            'test', 'data', '8_3V_seg', 'Segmentation.nrrd')
+        dyn = colibri.load_dynamic_series(dcm_path)
+        with self.assertRaises(ValueError):
+            colibri.series_roi_means(dyn['img'], sitk.ReadImage(roi_path),
+                                     engine='numpi')
+        with self.assertRaises(ValueError):
+            colibri.lazy_series_roi_means(dcm_path, roi_path,
+                                          engine='numpi')
+
     def test_ignore_label(self):
         dcm_path = os.path.join('test', 'data', '8_3V')
         roi_path = os.path.join(
@@ -245,3 +362,149 @@ class TestLazySeriesRoiMeans(unittest.TestCase):
         self.assertTrue('1' in dyn.keys())
         self.assertFalse('0' in dyn.keys())
         self.assertFalse('2' in dyn.keys())
+
+
+class TestLazySeriesRoiStats(unittest.TestCase):
+
+    def test_lazy_series_roi_stats(self):
+        dcm_path = os.path.join('test', 'data', '8_3V')
+        roi_path = os.path.join(
+            'test', 'data', '8_3V_seg', 'Segmentation.nrrd')
+        dyn = colibri.load_dynamic_series(dcm_path)
+        roi = sitk.ReadImage(roi_path)
+        roi_arr = sitk.GetArrayFromImage(roi)
+        label_stats_filter = sitk.LabelStatisticsImageFilter()
+
+        for engine in ['sitk', 'numpy']:
+            r = colibri.lazy_series_roi_means(
+                dcm_path, roi_path, labels={'1': 'a'}, ignore=['0'],
+                stats=['std', 'count', 'sum', 'min', 'max', 'p95'],
+                engine=engine)
+            self.assertEqual(
+                sorted(r.keys()),
+                ['2', '2_count', '2_max', '2_min', '2_p95', '2_std', '2_sum',
+                 'a', 'a_count', 'a_max', 'a_min', 'a_p95', 'a_std', 'a_sum',
+                 'tacq'])
+            for i in range(9):
+                label_stats_filter.Execute(dyn['img'][i], roi)
+                arr = sitk.GetArrayFromImage(dyn['img'][i])
+                for label, name in [(1, 'a'), (2, '2')]:
+                    self.assertAlmostEqual(
+                        r[name + '_std'][i],
+                        label_stats_filter.GetSigma(label), places=6)
+                    self.assertEqual(r[name + '_count'][i],
+                                     label_stats_filter.GetCount(label))
+                    self.assertAlmostEqual(
+                        r[name + '_sum'][i],
+                        label_stats_filter.GetSum(label), places=3)
+                    self.assertEqual(r[name + '_min'][i],
+                                     label_stats_filter.GetMinimum(label))
+                    self.assertEqual(r[name + '_max'][i],
+                                     label_stats_filter.GetMaximum(label))
+                    self.assertAlmostEqual(
+                        r[name + '_p95'][i],
+                        np.quantile(arr[roi_arr == label], 0.95), places=6)
+
+    def test_lazy_series_roi_stats_unknown(self):
+        dcm_path = os.path.join('test', 'data', '8_3V')
+        roi_path = os.path.join(
+            'test', 'data', '8_3V_seg', 'Segmentation.nrrd')
+        with self.assertRaises(ValueError):
+            colibri.lazy_series_roi_means(dcm_path, roi_path,
+                                          stats=['std', 'mode'])
+
+
+class TestLazySeriesRoiMeansResampleMap(unittest.TestCase):
+
+    def setUp(self):
+        # A ROI in a finer space, which is partly outside the image space
+        roi = sitk.ReadImage(os.path.join(
+            'test', 'data', '8_3V_seg', 'Segmentation.nrrd'))
+        resampler = sitk.ResampleImageFilter()
+        resampler.SetInterpolator(sitk.sitkNearestNeighbor)
+        resampler.SetOutputSpacing((1.9, 2.3, 2.7))
+        resampler.SetOutputOrigin((-250.0, -240.0, 950.0))
+        resampler.SetSize((200, 180, 150))
+        self.roi = resampler.Execute(roi)
+        self.tmp = tempfile.mkdtemp()
+        self.roi_path = os.path.join(self.tmp, 'roi.nrrd')
+        sitk.WriteImage(self.roi, self.roi_path)
+        self.dcm_path = os.path.join('test', 'data', '8_3V')
+
+    def test_resample_img(self):
+        # Expected result from resampling every image with SimpleITK
+        dyn = colibri.load_dynamic_series(self.dcm_path)
+        resampler = sitk.ResampleImageFilter()
+        resampler.SetReferenceImage(self.roi)
+        resampler.SetInterpolator(sitk.sitkNearestNeighbor)
+        expected = colibri.series_roi_means(
+            [resampler.Execute(img) for img in dyn['img']], self.roi)
+
+        for engine in ['sitk', 'numpy']:
+            r = colibri.lazy_series_roi_means(self.dcm_path, self.roi_path,
+                                              resample='img', engine=engine)
+            for label in [0, 1, 2]:
+                for i in range(9):
+                    self.assertAlmostEqual(r[str(label)][i],
+                                           expected[label][i], places=6)
+
+    def test_resample_img_ignore(self):
+        # Only the bounding box of labels 1 and 2 is read from each frame
+        dyn = colibri.load_dynamic_series(self.dcm_path)
+        resampler = sitk.ResampleImageFilter()
+        resampler.SetReferenceImage(self.roi)
+        resampler.SetInterpolator(sitk.sitkNearestNeighbor)
+        expected = colibri.series_roi_means(
+            [resampler.Execute(img) for img in dyn['img']], self.roi)
+
+        for engine in ['sitk', 'numpy']:
+            r = colibri.lazy_series_roi_means(self.dcm_path, self.roi_path,
+                                              resample='img', engine=engine,
+                                              ignore=['0'])
+            self.assertFalse('0' in r.keys())
+            for label in [1, 2]:
+                for i in range(9):
+                    self.assertAlmostEqual(r[str(label)][i],
+                                           expected[label][i], places=6)
+
+    def test_resample_series_to_reference(self):
+        dyn = colibri.load_dynamic_series(self.dcm_path)
+        img = colibri.resample_series_to_reference(dyn['img'], self.roi)
+        resampler = sitk.ResampleImageFilter()
+        resampler.SetReferenceImage(self.roi)
+        resampler.SetInterpolator(sitk.sitkNearestNeighbor)
+        for i in range(9):
+            expected = resampler.Execute(dyn['img'][i])
+            self.assertEqual(img[i].GetSize(), expected.GetSize())
+            self.assertEqual(img[i].GetOrigin(), expected.GetOrigin())
+            self.assertEqual(img[i].GetPixelID(), expected.GetPixelID())
+            self.assertTrue(np.array_equal(
+                sitk.GetArrayViewFromImage(img[i]),
+                sitk.GetArrayViewFromImage(expected)))
+
+    def test_multi_roi_means(self):
+        seg_path = os.path.join(
+            'test', 'data', '8_3V_seg', 'Segmentation.nrrd')
+        roi_sets: list[dict[str, Any]] = [
+            {'roi_path': seg_path, 'name': 'a'},
+            {'roi_path': seg_path, 'name': 'b',
+             'labels': {'1': 'x', '2': 'y'}, 'ignore': ['0']},
+            {'roi_path': self.roi_path, 'name': 'c', 'resample': 'img'}]
+        for engine in ['sitk', 'numpy']:
+            res = colibri.lazy_series_multi_roi_means(
+                self.dcm_path, roi_sets, frame_dur=True, engine=engine)
+            self.assertEqual(list(res.keys()), ['a', 'b', 'c'])
+            for roi_set in roi_sets:
+                expected = colibri.lazy_series_roi_means(
+                    self.dcm_path, roi_set['roi_path'],
+                    resample=roi_set.get('resample'),
+                    labels=roi_set.get('labels'),
+                    ignore=roi_set.get('ignore'),
+                    frame_dur=True, engine=engine)
+                r = res[roi_set['name']]
+                self.assertEqual(list(r.keys()), list(expected.keys()))
+                for key in r:
+                    self.assertEqual(r[key].tolist(), expected[key].tolist())
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
@@ -0,0 +1,69 @@
+import unittest
+from typing import Any, Callable
+import colibri.model
+import numpy as np
+import scipy.integrate
+
+
+class TestInputFunction(unittest.TestCase):
+
+    def setUp(self):
+        self.tp = [0.0, 3.7, 7.1, 10.2, 13.5, 17.8]
+        self.in_func = [0.0, 572.1, 3021.5, 123.7, 50.21, 10.5]
+        self.inp = colibri.model.InputFunction(self.tp, self.in_func)
+
+    def test_call(self):
+        x = [-1.0, 0.0, 2.0, 7.1, 12.0, 20.0]
+        self.assertTrue(np.allclose(self.inp(x),
+                                    np.interp(x, self.tp, self.in_func)))
+
+    def test_integral_sample_points(self):
+        expected = scipy.integrate.cumulative_trapezoid(
+            self.in_func, self.tp, initial=0.0)
+        self.assertTrue(np.allclose(self.inp.cumulative, expected))
+        self.assertTrue(np.allclose(self.inp.integral(self.tp), expected))
+
+    def test_integral_between_points(self):
+        for x in [1.5, 5.0, 9.9, 16.0]:
+            xs = np.linspace(0.0, x, 20001)
+            expected = scipy.integrate.trapezoid(
+                np.interp(xs, self.tp, self.in_func), xs)
+            self.assertAlmostEqual(float(self.inp.integral(x)), expected,
+                                   places=3)
+
+    def test_integral_outside(self):
+        # The input function is constant outside the sample points
+        total = self.inp.cumulative[-1]
+        self.assertAlmostEqual(float(self.inp.integral(20.0)),
+                               total + 2.2 * 10.5)
+        self.assertAlmostEqual(float(self.inp.integral(-1.0)), 0.0)
+
+    def test_grid(self):
+        grid = self.inp.grid(0.5)
+        self.assertEqual(len(grid), 37)
+        self.assertTrue(np.allclose(
+            grid, np.interp(np.arange(37) * 0.5, self.tp, self.in_func)))
+        self.assertIs(self.inp.grid(0.5), grid)
+        self.assertFalse(grid.flags.writeable)
+
+    def test_size_mismatch(self):
+        with self.assertRaises(ValueError):
+            colibri.model.InputFunction([0.0, 1.0], [1.0])
+
+    def test_models(self):
+        # All models give the same result with an InputFunction
+        models: list[tuple[Callable[..., list[float]], dict[str, Any]]] = [
+            (colibri.model.model_patlak, {'k1': 0.3, 'v0': 0.1}),
+            (colibri.model.model_step, {'amp': 0.3, 'extent': 4.0}),
+            (colibri.model.model_step_2,
+             {'amp1': 0.3, 'extent1': 4.0, 'amp2': 0.1, 'extent2': 8.0}),
+            (colibri.model.model_fermi_2,
+             {'amp1': 0.3, 'extent1': 4.0, 'width1': 1.0,
+              'amp2': 0.1, 'extent2': 8.0, 'width2': 2.0}),
+            (colibri.model.model_step_fermi,
+             {'amp1': 0.1, 'extent1': 3.0, 'amp2': 0.3, 'extent2': 6.0,
+              'width2': 3.0})]
+        for model, args in models:
+            m = model(t=self.tp, in_func=self.in_func, **args)
+            m2 = model(t=self.tp, in_func=self.inp, **args)
+            self.assertTrue(np.allclose(m, m2))
@@ -0,0 +1,84 @@
+import unittest
+from typing import Any, Callable
+import colibri.model
+import colibri.fitting
+import lmfit
+import numpy as np
+
+
+def _numeric_jac(model: Callable[..., list[float]],
+                 t: list[float], in_func: list[float],
+                 params: dict[str, float]) -> np.ndarray:
+    # Central differences of the model with respect to each parameter
+    cols = []
+    for name in params:
+        h = 1e-6 * max(1.0, abs(params[name]))
+        up = dict(params, **{name: params[name] + h})
+        down = dict(params, **{name: params[name] - h})
+        cols.append((np.array(model(t, in_func, **up)) -
+                     np.array(model(t, in_func, **down))) / (2 * h))
+    return np.column_stack(cols)
+
+
+class TestModelJac(unittest.TestCase):
+
+    def setUp(self):
+        self.tp = [0.0, 3.7, 7.1, 10.2, 13.5, 17.8]
+        self.in_func = [0.0, 572.1, 3021.5, 123.7, 50.21, 10.5]
+
+    def test_model_jac(self):
+        cases: list[tuple[Callable[..., list[float]],
+                          Callable[..., np.ndarray],
+                          dict[str, Any]]] = [
+            (colibri.model.model_patlak, colibri.model.model_patlak_jac,
+             {'k1': 0.3, 'v0': 0.1}),
+            (colibri.model.model_step, colibri.model.model_step_jac,
+             {'amp': 0.3, 'extent': 4.0}),
+            (colibri.model.model_step_2, colibri.model.model_step_2_jac,
+             {'amp1': 0.3, 'extent1': 4.0, 'amp2': 0.1, 'extent2': 8.0}),
+            (colibri.model.model_step_2, colibri.model.model_step_2_jac,
+             {'amp1': 0.3, 'extent1': 8.0, 'amp2': 0.1, 'extent2': 4.0}),
+            (colibri.model.model_fermi_2, colibri.model.model_fermi_2_jac,
+             {'amp1': 0.3, 'extent1': 4.0, 'width1': 1.0,
+              'amp2': 0.1, 'extent2': 8.0, 'width2': 2.0}),
+            (colibri.model.model_step_fermi,
+             colibri.model.model_step_fermi_jac,
+             {'amp1': 0.1, 'extent1': 3.0, 'amp2': 0.3, 'extent2': 6.0,
+              'width2': 3.0})]
+        for model, jac, params in cases:
+            d = jac(self.tp, self.in_func, **params)
+            d2 = _numeric_jac(model, self.tp, self.in_func, params)
+            self.assertEqual(d.shape, (6, len(params)))
+            self.assertTrue(np.allclose(d, d2, rtol=1e-5, atol=1e-4))
+
+    def test_fit_residual_jac(self):
+        t = [2.0 * i for i in range(30)]
+        inp = colibri.model.InputFunction(
+            t, [1000.0 * np.exp(-(ti - 8.0)**2 / 10.0) + 50.0 for ti in t])
+        true = {'amp1': 0.1, 'extent1': 3.0, 'amp2': 0.3, 'extent2': 12.0,
+                'width2': 3.0}
+        rng = np.random.default_rng(0)
+        data = (np.array(colibri.model.model_step_fermi(t, inp, **true)) +
+                rng.normal(0.0, 2.0, len(t)))
+
+        model = colibri.model.model_step_fermi
+        fit_model = lmfit.Model(model, independent_vars=['t', 'in_func'])
+        dfun = colibri.fitting._residual_jacobian(
+            fit_model, colibri.fitting._get_jacobians()[model])
+
+        res = []
+        for fit_kws in [{}, {'Dfun': dfun}]:
+            params = lmfit.create_params(
+                amp1={'value': 0.05, 'min': 0.0},
+                extent1={'value': 4.0, 'min': 0.0},
+                amp2={'value': 0.2, 'min': 0.0},
+                extent2={'value': 10.0, 'min': 0.0},
+                width2={'value': 2.0, 'min': 0.0})
+            res.append(fit_model.fit(data, t=t, in_func=inp, params=params,
+                                     fit_kws=fit_kws))
+
+        # Same optimum with fewer model evaluations
+        self.assertLess(res[1].nfev, res[0].nfev)
+        for name in true:
+            self.assertAlmostEqual(res[0].best_values[name],
+                                   res[1].best_values[name], places=4)
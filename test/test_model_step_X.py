@@ -55,6 +55,70 @@ class TestModelStep2(unittest.TestCase):
                                        amp2=amp2, extent2=extent2,
                                        t=tp, in_func=in_func)
 
+        self.assertEqual(6, len(m))
+        self.assertAlmostEqual(0.0, m[0], places=4)
+        self.assertAlmostEqual(419.5657, m[1], places=1)
+        self.assertAlmostEqual(2704.4526, m[2], places=1)
+        self.assertAlmostEqual(3640.1819, m[3], places=3)
+        self.assertAlmostEqual(1233.5420, m[4], places=2)
+        self.assertAlmostEqual(81.7247, m[5], places=2)
+
+
+class TestModelStepQuad(unittest.TestCase):
+
+    def test_model_step_quad_case1(self):
+        amp = 0.1
+        extent = 3.0
+
+        tp = [0.0, 3.7, 7.1, 10.2, 13.5, 17.8]
+        in_func = [0.0, 572.1, 3021.5, 123.7, 50.21, 10.5]
+
+        m = colibri.model.model_step_quad(amp=amp, extent=extent,
+                                          t=tp, in_func=in_func)
+        m2 = colibri.model.model_step(amp=amp, extent=extent,
+                                      t=tp, in_func=in_func)
+
+        self.assertEqual(6, len(m))
+        self.assertAlmostEqual(0.0, m[0], places=4)
+        self.assertAlmostEqual(102.0502, m[1], places=3)
+        self.assertAlmostEqual(582.2645, m[2], places=1)
+        self.assertAlmostEqual(457.7583, m[3], places=3)
+        self.assertAlmostEqual(25.0844, m[4], places=3)
+        self.assertAlmostEqual(7.3057, m[5], places=3)
+
+        # The exact convolution agrees within the quad tolerance
+        for y, y2 in zip(m, m2):
+            self.assertLess(abs(y - y2), 1e-2 + 1e-4 * abs(y))
+
+    def test_model_step_extent(self):
+        tp = [0.0, 3.7, 7.1, 10.2, 13.5, 17.8]
+        in_func = [0.0, 572.1, 3021.5, 123.7, 50.21, 10.5]
+
+        # Extents beyond the last time point and non-positive extents
+        for extent in [-2.0, 0.0, 5.5, 30.0]:
+            m = colibri.model.model_step_quad(amp=0.4, extent=extent,
+                                              t=tp, in_func=in_func)
+            m2 = colibri.model.model_step(amp=0.4, extent=extent,
+                                          t=tp, in_func=in_func)
+            for y, y2 in zip(m, m2):
+                self.assertLess(abs(y - y2), 1e-2 + 1e-4 * abs(y))
+
+
+class TestModelStep2Quad(unittest.TestCase):
+
+    def test_model_step_2_quad_case1(self):
+        amp = 0.1
+        amp2 = 0.3
+        extent = 3.0
+        extent2 = 6.0
+
+        tp = [0.0, 3.7, 7.1, 10.2, 13.5, 17.8]
+        in_func = [0.0, 572.1, 3021.5, 123.7, 50.21, 10.5]
+
+        m = colibri.model.model_step_2_quad(amp1=amp, extent1=extent,
+                                            amp2=amp2, extent2=extent2,
+                                            t=tp, in_func=in_func)
+
         self.assertEqual(6, len(m))
         self.assertAlmostEqual(0.0, m[0], places=4)
         self.assertAlmostEqual(419.5657, m[1], places=1)
@@ -62,3 +126,18 @@ class TestModelStep2(unittest.TestCase):
         self.assertAlmostEqual(3640.1826, m[3], places=3)
         self.assertAlmostEqual(1233.5420, m[4], places=2)
         self.assertAlmostEqual(81.7247, m[5], places=2)
+
+    def test_model_step_2_extents(self):
+        tp = [0.0, 3.7, 7.1, 10.2, 13.5, 17.8]
+        in_func = [0.0, 572.1, 3021.5, 123.7, 50.21, 10.5]
+
+        # The second step may be shorter than the first
+        for extent1, extent2 in [(3.0, 6.0), (6.0, 3.0), (0.0, 25.0)]:
+            m = colibri.model.model_step_2_quad(amp1=0.2, extent1=extent1,
+                                                amp2=0.5, extent2=extent2,
+                                                t=tp, in_func=in_func)
+            m2 = colibri.model.model_step_2(amp1=0.2, extent1=extent1,
+                                            amp2=0.5, extent2=extent2,
+                                            t=tp, in_func=in_func)
+            for y, y2 in zip(m, m2):
+                self.assertLess(abs(y - y2), 1e-2 + 1e-4 * abs(y))
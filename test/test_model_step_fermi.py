@@ -4,7 +4,7 @@ import colibri.model
 
 class TestModelStepFermi(unittest.TestCase):
 
-    def test_model_step_fermi_case1(self):
+    def test_model_step_fermi_quad_case1(self):
         amp = 0.1
         amp2 = 0.3
         extent = 3.0
@@ -14,10 +14,10 @@ class TestModelStepFermi(unittest.TestCase):
         tp = [0.0, 3.7, 7.1, 10.2, 13.5, 17.8]
         in_func = [0.0, 572.1, 3021.5, 123.7, 50.21, 10.5]
 
-        m = colibri.model.model_step_fermi(amp1=amp, extent1=extent,
-                                           amp2=amp2, extent2=extent2,
-                                           width2=width2,
-                                           t=tp, in_func=in_func)
+        m = colibri.model.model_step_fermi_quad(amp1=amp, extent1=extent,
+                                                amp2=amp2, extent2=extent2,
+                                                width2=width2,
+                                                t=tp, in_func=in_func)
 
         self.assertEqual(6, len(m))
         self.assertAlmostEqual(0.0, m[0], places=4)
@@ -26,3 +26,51 @@ class TestModelStepFermi(unittest.TestCase):
         self.assertAlmostEqual(3199.0777, m[3], places=2)
         self.assertAlmostEqual(1839.3696, m[4], places=2)
         self.assertAlmostEqual(745.0176, m[5], places=2)
+
+    def test_model_step_fermi_case1(self):
+        amp = 0.1
+        amp2 = 0.3
+        extent = 3.0
+        extent2 = 6.0
+        width2 = 3.0
+
+        tp = [0.0, 3.7, 7.1, 10.2, 13.5, 17.8]
+        in_func = [0.0, 572.1, 3021.5, 123.7, 50.21, 10.5]
+
+        m = colibri.model.model_step_fermi(amp1=amp, extent1=extent,
+                                           amp2=amp2, extent2=extent2,
+                                           width2=width2,
+                                           t=tp, in_func=in_func)
+        m2 = colibri.model.model_step_fermi_quad(amp1=amp, extent1=extent,
+                                                 amp2=amp2, extent2=extent2,
+                                                 width2=width2,
+                                                 t=tp, in_func=in_func)
+
+        # The default grid agrees with quad within the quad tolerance
+        self.assertEqual(6, len(m))
+        for y, y2 in zip(m, m2):
+            self.assertLess(abs(y - y2), 1e-2 + 1e-4 * abs(y))
+        self.assertAlmostEqual(0.0, m[0], places=4)
+        self.assertAlmostEqual(400.0031, m[1], places=1)
+        self.assertAlmostEqual(2513.4537, m[2], places=1)
+        self.assertAlmostEqual(3199.0793, m[3], places=1)
+        self.assertAlmostEqual(1839.3696, m[4], places=1)
+        self.assertAlmostEqual(745.0173, m[5], places=1)
+
+    def test_model_step_fermi_grid_step(self):
+        tp = [0.0, 3.7, 7.1, 10.2, 13.5, 17.8]
+        in_func = [0.0, 572.1, 3021.5, 123.7, 50.21, 10.5]
+
+        m = colibri.model.model_step_fermi(amp1=0.1, extent1=3.0,
+                                           amp2=0.3, extent2=6.0,
+                                           width2=3.0,
+                                           t=tp, in_func=in_func,
+                                           grid_step=0.005)
+
+        # A finer grid is more accurate
+        self.assertAlmostEqual(0.0, m[0], places=4)
+        self.assertAlmostEqual(400.0031, m[1], places=3)
+        self.assertAlmostEqual(2513.4537, m[2], places=3)
+        self.assertAlmostEqual(3199.0793, m[3], places=3)
+        self.assertAlmostEqual(1839.3696, m[4], places=3)
+        self.assertAlmostEqual(745.0173, m[5], places=3)
@@ -0,0 +1,94 @@
+import contextlib
+import io
+import os
+import unittest
+from unittest import mock
+import colibri
+import lmfit
+import numpy as np
+import SimpleITK as sitk
+from typing import Any
+
+
+class TestParametricMaps(unittest.TestCase):
+
+    def setUp(self):
+        self.dyn = colibri.load_dynamic_array(
+            os.path.join('test', 'data', '8_3V'))
+        roi = sitk.ReadImage(os.path.join(
+            'test', 'data', '8_3V_seg', 'Segmentation.nrrd'))
+        tac = colibri.series_roi_means(self.dyn, roi, engine='numpy')
+        self.t = self.dyn.acq.tolist()
+        self.inp = tac[2]
+
+        # A mask of a few voxels of label 1, with a second label
+        roi_arr = sitk.GetArrayFromImage(roi)
+        self.voxels = np.flatnonzero(roi_arr == 1)[::200]
+        mask_arr = np.zeros(roi_arr.size, dtype=np.uint8)
+        mask_arr[self.voxels] = 1
+        mask_arr[np.flatnonzero(roi_arr == 2)[:3]] = 2
+        self.mask = sitk.GetImageFromArray(mask_arr.reshape(roi_arr.shape))
+        self.mask.CopyInformation(roi)
+
+        self.params = {'k1': {'value': 0.1, 'min': 0.0},
+                       'v0': {'value': 0.1}}
+
+    def expected(self, voxel):
+        # Fit the TAC of a single voxel directly
+        tac = self.dyn.data.reshape(len(self.dyn), -1)[:, voxel]
+        model = lmfit.Model(colibri.model.model_patlak,
+                            independent_vars=['t', 'in_func'])
+        return model.fit(tac.astype(np.float64), t=self.t,
+                         in_func=self.inp,
+                         params=lmfit.create_params(**self.params))
+
+    def test_parametric_maps(self):
+        for workers in [1, 2]:
+            maps = colibri.parametric_maps(
+                self.dyn, self.mask, self.t, self.inp,
+                colibri.model.model_patlak, self.params, mask_label=1,
+                workers=workers, chunk_size=7)
+            self.assertEqual(sorted(maps.keys()),
+                             ['k1', 'redchi', 'rsquared', 'v0'])
+            self.assertEqual(maps['k1'].GetSize(), (128, 128, 64))
+            self.assertEqual(maps['k1'].GetOrigin(), self.dyn.origin)
+
+            k1 = sitk.GetArrayViewFromImage(maps['k1']).ravel()
+            v0 = sitk.GetArrayViewFromImage(maps['v0']).ravel()
+            redchi = sitk.GetArrayViewFromImage(maps['redchi']).ravel()
+            for voxel in self.voxels[:5]:
+                fit = self.expected(voxel)
+                self.assertAlmostEqual(k1[voxel], fit.best_values['k1'])
+                self.assertAlmostEqual(v0[voxel], fit.best_values['v0'])
+                self.assertAlmostEqual(redchi[voxel], fit.redchi)
+
+            # Only the voxels of the mask label are fitted
+            self.assertEqual(np.count_nonzero(k1), len(self.voxels))
+            self.assertEqual(
+                np.flatnonzero(k1).tolist(), self.voxels.tolist())
+
+    def test_parametric_maps_workers(self):
+        # A small mask does not start more workers than chunks, and the
+        # voxel fits use the analytic jacobian of the model
+        out = io.StringIO()
+        kws: list[dict[str, Any]] = []
+
+        def fit_kws(*args: Any) -> dict[str, Any]:
+            kws.append(colibri.fit_kws(*args))
+            return kws[-1]
+
+        with mock.patch('colibri.parametric.fit_kws', side_effect=fit_kws):
+            with contextlib.redirect_stdout(out):
+                colibri.parametric_maps(
+                    self.dyn, self.mask, self.t, self.inp,
+                    colibri.model.model_patlak, self.params, mask_label=2,
+                    workers=8)
+        self.assertIn('Dfun', kws[0])
+        self.assertIn("Fitting 3 voxels in 1 chunks with 1 workers",
+                      out.getvalue())
+
+    def test_parametric_maps_size(self):
+        mask = sitk.Image(10, 10, 10, sitk.sitkUInt8)
+        with self.assertRaises(ValueError):
+            colibri.parametric_maps(self.dyn, mask, self.t, self.inp,
+                                    colibri.model.model_patlak, self.params)
@@ -0,0 +1,69 @@
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+import colibri
+import matplotlib.axes
+
+
+class TestSaveFigure(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def test_save_figure(self):
+        def draw(ax: matplotlib.axes.Axes):
+            ax.plot([0.0, 1.0, 2.0], [1.0, 3.0, 2.0])
+
+        paths = [os.path.join(self.tmp, 'fig.png'),
+                 os.path.join(self.tmp, 'fig.svg')]
+        futures = [colibri.save_figure(draw, path) for path in paths]
+        colibri.wait_for_figures()
+        for path, future in zip(paths, futures):
+            self.assertTrue(future.done())
+            self.assertTrue(os.path.exists(path))
+
+    def test_save_figure_error(self):
+        def draw(ax: matplotlib.axes.Axes):
+            raise ValueError("No data")
+
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            colibri.save_figure(draw, os.path.join(self.tmp, 'fig.png'))
+            colibri.wait_for_figures()
+        self.assertIn("Failed to write figure", out.getvalue())
+        self.assertFalse(os.path.exists(os.path.join(self.tmp, 'fig.png')))
+
+    def test_collect_figures(self):
+        def draw(ax: matplotlib.axes.Axes):
+            ax.plot([0.0, 1.0], [1.0, 3.0])
+
+        release = threading.Event()
+
+        def draw_other(ax: matplotlib.axes.Axes):
+            release.wait()
+            raise ValueError("No data")
+
+        path = os.path.join(self.tmp, 'fig.png')
+        with colibri.collect_figures() as figures:
+            colibri.save_figure(draw, path)
+        colibri.save_figure(draw_other, os.path.join(self.tmp, 'other.png'))
+        self.assertEqual(len(figures), 1)
+
+        # Only the collected figure is waited for, and the failure of the
+        # other figure is not reported
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            colibri.wait_for_figures(figures)
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(out.getvalue(), "")
+        release.set()
+        with contextlib.redirect_stdout(out):
+            colibri.wait_for_figures()
+        self.assertIn("Failed to write figure", out.getvalue())
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
@@ -0,0 +1,126 @@
+import contextlib
+import io
+import os
+import threading
+import unittest
+import xmltodict
+import colibri
+import colibri.schedule
+from typing import Any
+
+
+def _read_tasks(path: str) -> list[Any]:
+    with open(path) as f:
+        tree = xmltodict.parse(f.read(), force_list='task')
+    tasks: list[Any] = tree['colibri']['task']
+    return tasks
+
+
+class TestDependencies(unittest.TestCase):
+
+    def test_dependencies(self):
+        tasks = _read_tasks(
+            os.path.join('test', 'xml_input', 'test_schedule.xml'))
+        deps = colibri.schedule._dependencies(tasks)
+        self.assertEqual(deps, [set(), set(), {0}, {1}, {0, 2}, {4}])
+
+    def test_dependencies_roi_means(self):
+        # ROI sets in <roi>-tags and a TACFit of one of their tables
+        tasks = _read_tasks(
+            os.path.join('test', 'xml_input', 'test_roi_means_multi.xml'))
+        tasks.append({'@name': 'TACFit', 'tac_name': 'tac2',
+                      'plot': 'none'})
+        tasks.append({'@name': 'TACFit', 'tac_name': 'other',
+                      'plot': 'none'})
+        deps = colibri.schedule._dependencies(tasks)
+        # The second TACFit only waits for the first, since they share the
+        # worker setup of colibri.fitting
+        self.assertEqual(deps, [set(), {0}, {1}])
+
+    def test_dependencies_alone(self):
+        # A TACFit showing a plot window runs alone
+        tasks: list[Any] = [
+            {'@name': 'LoadTable', 'name': 'a', 'file': 'a.txt'},
+            {'@name': 'TACFit', 'tac_name': 'b'},
+            {'@name': 'LoadTable', 'name': 'c', 'file': 'c.txt'},
+            {'@name': 'LoadTable', 'name': 'd', 'file': 'd.txt'}]
+        deps = colibri.schedule._dependencies(tasks)
+        self.assertEqual(deps, [set(), {0}, {1}, {1}])
+
+    def test_dependencies_directory(self):
+        # A file in a directory written by an earlier task
+        tasks: list[Any] = [
+            {'@name': 'ConvertSeries', 'img_path': 'dcm',
+             'out_path': 'cache'},
+            {'@name': 'LoadTable', 'name': 'a',
+             'file': os.path.join('cache', 'series.json')}]
+        deps = colibri.schedule._dependencies(tasks)
+        self.assertEqual(deps, [set(), {0}])
+
+
+class TestRunTasks(unittest.TestCase):
+
+    def test_run_tasks_concurrent(self):
+        # The independent tasks can only pass the barrier together
+        barrier = threading.Barrier(2, timeout=10.0)
+
+        def wait(task: Any, named_obj: dict[str, Any]):
+            print("Task", task['name'])
+            barrier.wait()
+            named_obj[task['name']] = True
+
+        tasks: list[Any] = [{'@name': 'LoadTable', 'name': name,
+                             'file': name + '.txt'} for name in 'ab']
+        named_obj: dict[str, Any] = {}
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            colibri.schedule.run_tasks([wait, wait], tasks, named_obj,
+                                       workers=2)
+        self.assertEqual(named_obj, {'a': True, 'b': True})
+        self.assertEqual(out.getvalue(), "Task a\nTask b\n")
+
+    def test_run_tasks_error(self):
+        def fail(task: Any, named_obj: dict[str, Any]):
+            print("Failing")
+            raise ValueError(task['name'])
+
+        def store(task: Any, named_obj: dict[str, Any]):
+            named_obj[task['name']] = True
+
+        tasks: list[Any] = [
+            {'@name': 'LoadTable', 'name': 'a', 'file': 'a.txt'},
+            {'@name': 'SaveTable', 'name': 'a', 'file': 'b.txt'},
+            {'@name': 'LoadTable', 'name': 'c', 'file': 'c.txt'}]
+        named_obj: dict[str, Any] = {}
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            with self.assertRaises(ValueError):
+                colibri.schedule.run_tasks([store, fail, store], tasks,
+                                           named_obj)
+        self.assertIn('a', named_obj)
+        self.assertEqual(out.getvalue(), "Failing\n")
+
+
+class TestRunXmlSchedule(unittest.TestCase):
+
+    def test_run_xml_serial_concurrent(self):
+        with open(os.path.join('test', 'xml_input',
+                               'test_schedule.xml')) as f:
+            xml_text = f.read()
+        results = []
+        for serial in [True, False]:
+            out = io.StringIO()
+            with contextlib.redirect_stdout(out):
+                named_obj = colibri.run_xml(xml_text, serial=serial)
+            results.append((named_obj, out.getvalue()))
+        self.assertEqual(list(results[0][0].keys()),
+                         ['tac', 'tac2', 'tac3'])
+        self.assertEqual(set(results[1][0].keys()), {'tac', 'tac2', 'tac3'})
+        for name in ['tac', 'tac2', 'tac3']:
+            self.assertEqual(results[0][0][name], results[1][0][name])
+        self.assertIn('Right2', results[1][0]['tac3'])
+        self.assertEqual(results[0][1], results[1][1])
+
+    def tearDown(self):
+        if os.path.exists(os.path.join('test', 'schedule_out.txt')):
+            os.remove(os.path.join('test', 'schedule_out.txt'))
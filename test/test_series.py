@@ -0,0 +1,166 @@
+import os.path
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import colibri
+import numpy as np
+import SimpleITK as sitk
+
+
+class TestLoadDynamicArray(unittest.TestCase):
+
+    def test_load_dynamic_array_8_3V(self):
+        dcm_path = os.path.join('test', 'data', '8_3V')
+        dyn = colibri.load_dynamic_array(dcm_path)
+        self.assertEqual(len(dyn), 9)
+        self.assertEqual(dyn.data.shape, (9, 64, 128, 128))
+        self.assertEqual(dyn.data.dtype, np.float32)
+        self.assertEqual(dyn.size(), (128, 128, 64))
+        self.assertEqual(dyn.spacing, (4.92, 4.92, 4.92))
+        self.assertEqual(dyn.acq.tolist(),
+                         [0, 3.0, 6.3, 9.5, 12.8, 16.0, 19.3, 22.5, 25.8])
+        self.assertEqual(dyn.frame_dur[0], 3.04)
+
+    def test_load_dynamic_array_dtype(self):
+        dcm_path = os.path.join('test', 'data', '8_3V')
+        dyn = colibri.load_dynamic_array(dcm_path, dtype=np.float64)
+        dyn2 = colibri.load_dynamic_series(dcm_path)
+        self.assertEqual(dyn.data.dtype, np.float64)
+        for i in range(9):
+            self.assertTrue(np.array_equal(
+                dyn.data[i], sitk.GetArrayViewFromImage(dyn2['img'][i])))
+
+    def test_frame(self):
+        dcm_path = os.path.join('test', 'data', '8_3V')
+        dyn = colibri.load_dynamic_array(dcm_path)
+        img = dyn.frame(3)
+        self.assertEqual(img.GetSize(), (128, 128, 64))
+        self.assertEqual(img.GetSpacing(), (4.92, 4.92, 4.92))
+        self.assertEqual(img.GetOrigin(), (-309.28, -299.14, 906.47))
+        self.assertTrue(np.array_equal(sitk.GetArrayViewFromImage(img),
+                                       dyn.data[3]))
+
+
+class TestDynamicSeriesRoiMeans(unittest.TestCase):
+
+    def test_series_roi_means_dynamic_series(self):
+        dcm_path = os.path.join('test', 'data', '8_3V')
+        roi_path = os.path.join(
+            'test', 'data', '8_3V_seg', 'Segmentation.nrrd')
+        dyn = colibri.load_dynamic_array(dcm_path, dtype=np.float64)
+        roi = sitk.ReadImage(roi_path)
+
+        r = colibri.series_roi_means(dyn, roi, engine='numpy')
+        r2 = colibri.series_roi_means(dyn, roi)
+
+        self.assertEqual(list(r.keys()), [0, 1, 2])
+        for label in r:
+            for i in range(9):
+                self.assertAlmostEqual(r[label][i], r2[label][i], places=6)
+
+        self.assertAlmostEqual(r[1][3], 12019.3, places=1)
+        self.assertAlmostEqual(r[2][3], 38544.1, places=1)
+
+
+class TestDynamicSeriesResample(unittest.TestCase):
+
+    def test_resample_dynamic_series(self):
+        dcm_path = os.path.join('test', 'data', '8_3V')
+        dyn = colibri.load_dynamic_array(dcm_path, dtype=np.float64)
+
+        # A reference space partly outside the image space
+        ref = sitk.Image(60, 50, 40, sitk.sitkUInt8)
+        ref.SetSpacing((3.1, 2.7, 6.3))
+        ref.SetOrigin((-200.0, -150.0, 1000.0))
+
+        res = colibri.resample_series_to_reference(dyn, ref)
+        res2 = colibri.resample_series_to_reference(dyn.images(), ref)
+
+        self.assertEqual(len(res), 9)
+        self.assertEqual(res.size(), (60, 50, 40))
+        self.assertEqual(res.spacing, (3.1, 2.7, 6.3))
+        self.assertEqual(res.acq.tolist(), dyn.acq.tolist())
+        for i in range(9):
+            self.assertTrue(np.array_equal(
+                res.data[i], sitk.GetArrayViewFromImage(res2[i])))
+
+
+class TestSeriesCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.cache_path = os.path.join(self.tmp, 'cache')
+        self.dcm_path = os.path.join('test', 'data', '8_3V')
+        colibri.convert_dynamic_series(self.dcm_path, self.cache_path,
+                                       dtype=np.float64)
+
+    def test_is_series_cache(self):
+        self.assertTrue(colibri.is_series_cache(self.cache_path))
+        self.assertFalse(colibri.is_series_cache(self.dcm_path))
+
+    def test_convert_interrupted(self):
+        # An interrupted conversion into an existing cache leaves no cache
+        with mock.patch('colibri.image._read_frames',
+                        side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                colibri.convert_dynamic_series(self.dcm_path,
+                                               self.cache_path)
+        self.assertFalse(colibri.is_series_cache(self.cache_path))
+        colibri.convert_dynamic_series(self.dcm_path, self.cache_path)
+        self.assertTrue(colibri.is_series_cache(self.cache_path))
+        self.assertEqual(sorted(os.listdir(self.cache_path)),
+                         ['data.npy', 'series.json'])
+
+    def test_load_dynamic_array_cache(self):
+        dyn = colibri.load_dynamic_array(self.cache_path)
+        dyn2 = colibri.load_dynamic_array(self.dcm_path, dtype=np.float64)
+        self.assertIsInstance(dyn.data, np.memmap)
+        self.assertTrue(np.array_equal(dyn.data, dyn2.data))
+        self.assertEqual(dyn.acq.tolist(), dyn2.acq.tolist())
+        self.assertEqual(dyn.frame_dur.tolist(), dyn2.frame_dur.tolist())
+        self.assertEqual(dyn.origin, dyn2.origin)
+        self.assertEqual(dyn.spacing, dyn2.spacing)
+        self.assertEqual(dyn.direction, dyn2.direction)
+
+    def test_load_dynamic_series_cache(self):
+        dyn = colibri.load_dynamic_series(self.cache_path)
+        self.assertEqual(len(dyn['img']), 9)
+        self.assertEqual(dyn['img'][0].GetSize(), (128, 128, 64))
+        self.assertEqual(dyn['img'][0].GetSpacing(), (4.92, 4.92, 4.92))
+        self.assertEqual(dyn['acq'],
+                         [0, 3.0, 6.3, 9.5, 12.8, 16.0, 19.3, 22.5, 25.8])
+
+    def test_lazy_series_roi_means_cache(self):
+        roi_path = os.path.join(
+            'test', 'data', '8_3V_seg', 'Segmentation.nrrd')
+        dyn = colibri.lazy_series_roi_means(self.dcm_path, roi_path,
+                                            frame_dur=True)
+        for engine in ['sitk', 'numpy']:
+            dyn2 = colibri.lazy_series_roi_means(self.cache_path, roi_path,
+                                                 frame_dur=True,
+                                                 engine=engine)
+            self.assertEqual(dyn['tacq'].tolist(), dyn2['tacq'].tolist())
+            self.assertEqual(dyn['frame_dur'].tolist(),
+                             dyn2['frame_dur'].tolist())
+            for label in ['0', '1', '2']:
+                for i in range(9):
+                    self.assertAlmostEqual(dyn[label][i], dyn2[label][i],
+                                           places=6)
+
+    def test_lazy_series_roi_means_cache_ignore(self):
+        roi_path = os.path.join(
+            'test', 'data', '8_3V_seg', 'Segmentation.nrrd')
+        dyn = colibri.lazy_series_roi_means(self.dcm_path, roi_path)
+        for engine in ['sitk', 'numpy']:
+            dyn2 = colibri.lazy_series_roi_means(self.cache_path, roi_path,
+                                                 ignore=['0'],
+                                                 engine=engine)
+            self.assertEqual(list(dyn2.keys()), ['tacq', '1', '2'])
+            for label in ['1', '2']:
+                for i in range(9):
+                    self.assertAlmostEqual(dyn[label][i], dyn2[label][i],
+                                           places=6)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
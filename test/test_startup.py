@@ -0,0 +1,39 @@
+import os
+import subprocess
+import sys
+import unittest
+
+
+# Dependencies that are only imported by the tasks that need them
+HEAVY = ['SimpleITK', 'lmfit', 'matplotlib', 'scipy']
+
+
+def _imported_modules(code: str) -> list[str]:
+    # Run the code in a new interpreter and return the names of the modules
+    # that were imported
+    code += "\nimport sys\nprint('\\n'.join(sys.modules))"
+    proc = subprocess.run([sys.executable, '-c', code],
+                          capture_output=True, text=True, check=True,
+                          env=dict(os.environ, PYTHONPATH='src'))
+    return proc.stdout.splitlines()
+
+
+class TestStartup(unittest.TestCase):
+
+    def test_import_colibri(self):
+        modules = _imported_modules("import colibri")
+        self.assertIn('colibri', modules)
+        for name in HEAVY + ['numpy', 'colibri.tasks']:
+            self.assertNotIn(name, modules)
+
+    def test_run_load_table(self):
+        # A task file with only light tasks does not import the heavy
+        # dependencies
+        xml_path = os.path.join('test', 'xml_input', 'test_load_table.xml')
+        modules = _imported_modules(
+            "import colibri\n"
+            "colibri.run_xml(open(" + repr(xml_path) + ").read())")
+        self.assertIn('colibri.tasks.table_save_load', modules)
+        self.assertNotIn('colibri.tasks.tac_fit', modules)
+        for name in HEAVY:
+            self.assertNotIn(name, modules)
@@ -0,0 +1,60 @@
+import unittest
+import colibri
+import numpy as np
+
+
+class TestTable(unittest.TestCase):
+
+    def test_table_columns(self):
+        tab = colibri.Table({'tacq': [0.0, 1.0, 2.0],
+                             1: [1.0, 3.0, 3.5],
+                             'label': ['a', 'b', 'c']})
+        self.assertEqual(list(tab.keys()), ['tacq', '1', 'label'])
+        self.assertEqual(len(tab), 3)
+        self.assertEqual(tab.rows, 3)
+        self.assertEqual(tab['tacq'].dtype, np.float64)
+        self.assertIs(tab[1], tab['1'])
+        self.assertIn(1, tab)
+        self.assertEqual(tab['label'].tolist(), ['a', 'b', 'c'])
+
+    def test_table_no_copy(self):
+        arr = np.arange(5.0)
+        tab = colibri.Table({'x': arr})
+        self.assertIs(tab['x'], arr)
+        tab['y'] = arr * 2.0
+        tab.rename('x', 'z')
+        self.assertEqual(list(tab.keys()), ['z', 'y'])
+        self.assertIs(tab['z'], arr)
+
+    def test_table_slice_rows(self):
+        tab = colibri.Table({'x': np.arange(5.0), 'y': np.arange(5.0) * 2})
+        head = tab.slice_rows(stop=3)
+        self.assertEqual(head.rows, 3)
+        self.assertTrue(np.shares_memory(head['x'], tab['x']))
+        self.assertEqual(head['y'].tolist(), [0.0, 2.0, 4.0])
+        self.assertEqual(tab.rows, 5)
+
+    def test_table_copy(self):
+        tab = colibri.Table({'x': np.arange(3.0)})
+        tab2 = tab.copy()
+        tab2['x'][0] = 5.0
+        self.assertEqual(tab['x'][0], 0.0)
+        self.assertEqual(tab.to_dict(), {'x': [0.0, 1.0, 2.0]})
+
+    def test_table_equal(self):
+        tab = colibri.Table({'x': [1.0, 2.0], 'y': [3.0, 4.0]})
+        self.assertEqual(tab, {'x': [1.0, 2.0], 'y': [3.0, 4.0]})
+        self.assertNotEqual(tab, {'x': [1.0, 2.0], 'y': [3.0, 5.0]})
+        self.assertNotEqual(tab, {'y': [3.0, 4.0], 'x': [1.0, 2.0]})
+
+    def test_table_rows_mismatch(self):
+        tab = colibri.Table({'x': [1.0, 2.0]})
+        with self.assertRaises(ValueError):
+            tab['y'] = [1.0, 2.0, 3.0]
+        # The only column can be replaced with any number of rows
+        tab['x'] = [1.0, 2.0, 3.0]
+        self.assertEqual(tab.rows, 3)
+
+    def test_table_not_1d(self):
+        with self.assertRaises(ValueError):
+            colibri.Table({'x': np.zeros((2, 2))})
@@ -0,0 +1,30 @@
+import os
+import shutil
+import unittest
+import xmltodict
+import colibri
+import numpy as np
+from typing import Any
+
+
+class TestTaskConvertSeries(unittest.TestCase):
+
+    def test_task_convert_series(self):
+        f = open(
+            os.path.join('test', 'xml_input', 'test_convert_series.xml'))
+        tree = xmltodict.parse(f.read(), xml_attribs=True)
+        task = tree['colibri']['task']
+        no: dict[str, Any] = {}
+        colibri.tasks.task_convert_series(task, no)
+
+        cache_path = os.path.join('test', 'series_cache')
+        self.assertTrue(colibri.is_series_cache(cache_path))
+        dyn = colibri.load_dynamic_array(cache_path)
+        self.assertEqual(dyn.data.dtype, np.float64)
+        self.assertEqual(dyn.data.shape, (9, 64, 128, 128))
+        self.assertEqual(dyn.acq.tolist(),
+                         [0, 3.0, 6.3, 9.5, 12.8, 16.0, 19.3, 22.5, 25.8])
+
+    def tearDown(self):
+        if os.path.exists(os.path.join('test', 'series_cache')):
+            shutil.rmtree(os.path.join('test', 'series_cache'))
@@ -0,0 +1,53 @@
+import os
+import shutil
+import unittest
+import xmltodict
+import colibri
+import numpy as np
+import SimpleITK as sitk
+from typing import Any
+
+
+class TestTaskParametricMap(unittest.TestCase):
+
+    def setUp(self):
+        # A mask of a few voxels of label 1
+        roi = sitk.ReadImage(os.path.join(
+            'test', 'data', '8_3V_seg', 'Segmentation.nrrd'))
+        roi_arr = sitk.GetArrayFromImage(roi)
+        self.voxels = np.flatnonzero(roi_arr == 1)[::500]
+        mask_arr = np.zeros(roi_arr.size, dtype=np.uint8)
+        mask_arr[self.voxels] = 1
+        mask = sitk.GetImageFromArray(mask_arr.reshape(roi_arr.shape))
+        mask.CopyInformation(roi)
+        sitk.WriteImage(mask, os.path.join('test', 'parametric_mask.nrrd'))
+
+    def test_task_parametric_map(self):
+        f = open(os.path.join(
+            'test', 'xml_input', 'test_parametric_map.xml'))
+        tree = xmltodict.parse(f.read(), xml_attribs=True)
+        task = tree['colibri']['task']
+        no: dict[str, Any] = {}
+        no['tac'] = colibri.lazy_series_roi_means(
+            os.path.join('test', 'data', '8_3V'),
+            os.path.join('test', 'data', '8_3V_seg', 'Segmentation.nrrd'))
+        colibri.tasks.task_parametric_map(task, no)
+
+        self.assertEqual(sorted(no['maps'].keys()),
+                         ['k1', 'redchi', 'rsquared', 'v0'])
+        for name in ['k1', 'redchi', 'rsquared', 'v0']:
+            img = sitk.ReadImage(
+                os.path.join('test', 'parametric_out', name + '.nrrd'))
+            self.assertTrue(np.array_equal(
+                sitk.GetArrayViewFromImage(img),
+                sitk.GetArrayViewFromImage(no['maps'][name]),
+                equal_nan=True))
+
+        k1 = sitk.GetArrayViewFromImage(no['maps']['k1']).ravel()
+        self.assertEqual(np.flatnonzero(k1).tolist(), self.voxels.tolist())
+        self.assertTrue(np.all(k1[self.voxels] >= 0))
+
+    def tearDown(self):
+        os.remove(os.path.join('test', 'parametric_mask.nrrd'))
+        if os.path.exists(os.path.join('test', 'parametric_out')):
+            shutil.rmtree(os.path.join('test', 'parametric_out'))
@@ -16,7 +16,7 @@ class TestTaskROIMeans(unittest.TestCase):
         colibri.tasks.task_roi_means(task, no)
         dyn = no['tac']
         tacq = dyn['tacq']
-        self.assertEqual(tacq,
+        self.assertEqual(tacq.tolist(),
                          [0, 3.0, 6.3, 9.5, 12.8, 16.0, 19.3, 22.5, 25.8])
 
         r1 = dyn['1']
@@ -58,7 +58,7 @@ class TestTaskROIMeans(unittest.TestCase):
         colibri.tasks.task_roi_means(task, no)
         dyn = no['tac']
         tacq = dyn['tacq']
-        self.assertEqual(tacq,
+        self.assertEqual(tacq.tolist(),
                          [0, 3.0, 6.3, 9.5, 12.8, 16.0, 19.3, 22.5, 25.8])
 
         r1 = dyn['a']
@@ -100,7 +100,7 @@ class TestTaskROIMeans(unittest.TestCase):
         colibri.tasks.task_roi_means(task, no)
         dyn = no['tac']
         tacq = dyn['tacq']
-        self.assertEqual(tacq,
+        self.assertEqual(tacq.tolist(),
                          [0, 3.0, 6.3, 9.5, 12.8, 16.0, 19.3, 22.5, 25.8])
 
         r1 = dyn['1']
@@ -118,7 +118,7 @@ class TestTaskROIMeans(unittest.TestCase):
         colibri.tasks.task_roi_means(task, no)
         dyn = no['tac']
         tacq = dyn['tacq']
-        self.assertEqual(tacq,
+        self.assertEqual(tacq.tolist(),
                          [0, 3.0, 6.3, 9.5, 12.8, 16.0, 19.3, 22.5, 25.8])
 
         r1 = dyn['1']
@@ -136,7 +136,7 @@ class TestTaskROIMeans(unittest.TestCase):
         colibri.tasks.task_roi_means(task, no)
         dyn = no['tac']
         frame_dur = dyn['frame_dur']
-        self.assertEqual(frame_dur,
+        self.assertEqual(frame_dur.tolist(),
                          [3.04, 3.26, 3.26, 3.26, 3.25,
                           3.26, 3.25, 3.26, 3.26])
 
@@ -152,6 +152,91 @@ class TestTaskROIMeans(unittest.TestCase):
         self.assertFalse('0' in dyn.keys())
         self.assertFalse('2' in dyn.keys())
 
+    def test_task_prefetch(self):
+        f = open(os.path.join(
+            'test', 'xml_input', 'test_roi_means_prefetch.xml'))
+        tree = xmltodict.parse(f.read(), xml_attribs=True)
+        task = tree['colibri']['task']
+        no: dict[str, Any] = {}
+        colibri.tasks.task_roi_means(task, no)
+        dyn = no['tac']
+        tacq = dyn['tacq']
+        self.assertEqual(tacq.tolist(),
+                         [0, 3.0, 6.3, 9.5, 12.8, 16.0, 19.3, 22.5, 25.8])
+
+        r1 = dyn['1']
+        r2 = dyn['2']
+
+        self.assertAlmostEqual(r1[3], 12019.3, places=1)
+        self.assertAlmostEqual(r2[3], 38544.1, places=1)
+
+        self.assertEqual(r1[8], 0)
+        self.assertAlmostEqual(r2[8], 0.0727437, places=7)
+
+    def test_task_engine(self):
+        f = open(os.path.join(
+            'test', 'xml_input', 'test_roi_means_engine.xml'))
+        tree = xmltodict.parse(f.read(), xml_attribs=True)
+        task = tree['colibri']['task']
+        no: dict[str, Any] = {}
+        colibri.tasks.task_roi_means(task, no)
+        dyn = no['tac']
+        self.assertEqual(list(dyn.keys()), ['tacq', 'a', 'b'])
+
+        r1 = dyn['a']
+        r2 = dyn['b']
+
+        self.assertEqual(r1[0], 0)
+        self.assertAlmostEqual(r2[0], 31.3157, places=4)
+
+        self.assertAlmostEqual(r1[3], 12019.3, places=1)
+        self.assertAlmostEqual(r2[3], 38544.1, places=1)
+
+        self.assertEqual(r1[8], 0)
+        self.assertAlmostEqual(r2[8], 0.0727437, places=7)
+
+    def test_task_engine_unknown(self):
+        f = open(os.path.join(
+            'test', 'xml_input', 'test_roi_means_engine.xml'))
+        tree = xmltodict.parse(f.read(), xml_attribs=True)
+        task = tree['colibri']['task']
+        task['engine'] = 'numpi'
+        no: dict[str, Any] = {}
+        with self.assertRaises(ValueError):
+            colibri.tasks.task_roi_means(task, no)
+        self.assertNotIn('tac', no)
+
+    def test_task_multi(self):
+        f = open(os.path.join(
+            'test', 'xml_input', 'test_roi_means_multi.xml'))
+        tree = xmltodict.parse(f.read(), xml_attribs=True)
+        task = tree['colibri']['task']
+        no: dict[str, Any] = {}
+        colibri.tasks.task_roi_means(task, no)
+        self.assertEqual(sorted(no['tac'].keys()), ['0', '1', '2', 'tacq'])
+        self.assertEqual(list(no['tac2'].keys()), ['tacq', 'b'])
+
+        self.assertEqual(no['tac']['tacq'].tolist(),
+                         no['tac2']['tacq'].tolist())
+        self.assertEqual(no['tac']['2'].tolist(), no['tac2']['b'].tolist())
+        self.assertAlmostEqual(no['tac']['1'][3], 12019.3, places=1)
+        self.assertAlmostEqual(no['tac2']['b'][3], 38544.1, places=1)
+
+    def test_task_stats(self):
+        f = open(os.path.join(
+            'test', 'xml_input', 'test_roi_means_stats.xml'))
+        tree = xmltodict.parse(f.read(), xml_attribs=True)
+        task = tree['colibri']['task']
+        no: dict[str, Any] = {}
+        colibri.tasks.task_roi_means(task, no)
+        dyn = no['tac']
+        self.assertEqual(sorted(dyn.keys()),
+                         ['1', '1_count', '1_std', '2', '2_count', '2_std',
+                          'tacq'])
+        self.assertAlmostEqual(dyn['1'][3], 12019.3, places=1)
+        self.assertEqual(dyn['1_count'].tolist(), [dyn['1_count'][0]] * 9)
+        self.assertTrue(all(std > 0 for std in dyn['2_std']))
+
     def tearDown(self):
         if os.path.exists(os.path.join('test', 'out.txt')):
             os.remove(os.path.join('test', 'out.txt'))
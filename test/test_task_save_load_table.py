@@ -2,6 +2,7 @@ import unittest
 import xmltodict
 import colibri
 import os
+import numpy as np
 from typing import Any
 
 
@@ -65,6 +66,51 @@ class TestTaskSaveLoadTable(unittest.TestCase):
         self.assertAlmostEqual(r1[2], 3.5, places=7)
         self.assertAlmostEqual(r2[2], -2.0, places=7)
 
+    def test_task_save_table_labels(self):
+        f = open(
+            os.path.join('test', 'xml_input', 'test_save_table.xml'))
+        tree = xmltodict.parse(f.read(), xml_attribs=True)
+        task = tree['colibri']['task']
+        no: dict[str, Any] = {
+            'table': {
+                'label': ['liver', 'spleen'],
+                'amp':   [0.25, 0.125]
+            }
+        }
+
+        colibri.tasks.task_save_table(task, no)
+        dyn = colibri.load_table(os.path.join('test', 'out.txt'))
+
+        self.assertEqual(dyn['label'].tolist(), ['liver', 'spleen'])
+        self.assertEqual(dyn['amp'].tolist(), [0.25, 0.125])
+
+    def test_task_save_load_table_binary(self):
+        f = open(
+            os.path.join('test', 'xml_input', 'test_save_table_binary.xml'))
+        tree = xmltodict.parse(f.read(), xml_attribs=True)
+        task = tree['colibri']['task']
+        no: dict[str, Any] = {
+            'table': {
+                'label': ['liver', 'spleen'],
+                'amp':   [0.1, 1.0 / 3.0]
+            }
+        }
+        colibri.tasks.task_save_table(task, no)
+
+        f = open(
+            os.path.join('test', 'xml_input', 'test_load_table_binary.xml'))
+        tree = xmltodict.parse(f.read(), xml_attribs=True)
+        task = tree['colibri']['task']
+        no2: dict[str, Any] = {}
+        colibri.tasks.task_load_table(task, no2)
+        dyn = no2['table']
+
+        self.assertEqual(dyn['label'].tolist(), ['liver', 'spleen'])
+        self.assertEqual(dyn['amp'].tolist(), [0.1, 1.0 / 3.0])
+        self.assertIsInstance(dyn['amp'], np.memmap)
+        del dyn, no2
+
     def tearDown(self):
-        if os.path.exists(os.path.join('test', 'out.txt')):
-            os.remove(os.path.join('test', 'out.txt'))
+        for name in ['out.txt', 'out.bin']:
+            if os.path.exists(os.path.join('test', name)):
+                os.remove(os.path.join('test', name))
@@ -0,0 +1,124 @@
+import os
+import unittest
+import xmltodict
+import colibri
+import matplotlib.pyplot as plt
+import numpy as np
+from typing import Any
+
+
+class TestTaskTACFit(unittest.TestCase):
+
+    def setUp(self):
+        t = [2.0 * i for i in range(30)]
+        inp = [1000.0 * np.exp(-(ti - 8.0)**2 / 10.0) + 50.0 for ti in t]
+        self.no: dict[str, Any] = {'tac': {'tacq': t, 'inp': inp}}
+        for label, amp, extent in [('1', 0.3, 4.0), ('2', 0.1, 10.0)]:
+            self.no['tac'][label] = colibri.model.model_step(t, inp,
+                                                             amp, extent)
+
+    def test_task_tac_fit_multi(self):
+        f = open(
+            os.path.join('test', 'xml_input', 'test_tac_fit_multi.xml'))
+        tree = xmltodict.parse(f.read(), xml_attribs=True)
+        task = tree['colibri']['task']
+
+        no = self.no
+        colibri.tasks.task_tac_fit(task, no)
+        fits = no['fits']
+
+        self.assertEqual(fits['label'].tolist(), ['1', '2'])
+        self.assertAlmostEqual(fits['amp'][0], 0.3, places=5)
+        self.assertAlmostEqual(fits['extent'][0], 4.0, places=4)
+        self.assertAlmostEqual(fits['amp'][1], 0.1, places=5)
+        self.assertAlmostEqual(fits['extent'][1], 10.0, places=4)
+
+    def test_task_tac_fit_all_roi_stats(self):
+        # The frame durations and ROI statistics of ROIMeans are not fitted
+        with open(os.path.join('test', 'xml_input',
+                               'test_tac_fit_roi_stats.xml')) as f:
+            no = colibri.run_xml(f.read(), serial=True)
+        self.assertIn('frame_dur', no['tac'])
+        self.assertIn('1_p95', no['tac'])
+        self.assertEqual(no['fits']['label'].tolist(), ['1'])
+        self.assertFalse(np.isnan(no['fits']['k1'][0]))
+
+    def test_task_tac_fit_all_exclude(self):
+        f = open(
+            os.path.join('test', 'xml_input', 'test_tac_fit_multi.xml'))
+        tree = xmltodict.parse(f.read(), xml_attribs=True)
+        task = tree['colibri']['task']
+        task['exclude'] = '2'
+
+        no = self.no
+        no['tac']['1_std'] = [1.0] * 30
+        no['tac']['inp_median'] = [1.0] * 30
+        colibri.tasks.task_tac_fit(task, no)
+        self.assertEqual(no['fits']['label'].tolist(), ['1'])
+
+    def test_task_tac_fit_multi_start(self):
+        f = open(
+            os.path.join('test', 'xml_input', 'test_tac_fit_multi_start.xml'))
+        tree = xmltodict.parse(f.read(), xml_attribs=True)
+        task = tree['colibri']['task']
+
+        no = self.no
+        colibri.tasks.task_tac_fit(task, no)
+        fits = no['fits']
+        optima = no['optima']
+
+        self.assertEqual(fits['label'].tolist(), ['1', '2'])
+        self.assertAlmostEqual(fits['amp'][0], 0.3, places=5)
+        self.assertAlmostEqual(fits['extent'][0], 4.0, places=4)
+        self.assertAlmostEqual(fits['amp'][1], 0.1, places=5)
+        self.assertAlmostEqual(fits['extent'][1], 10.0, places=4)
+
+        # Every label has its optima in order, with 6 starts each
+        for label in ['1', '2']:
+            rows = [i for i, lab in enumerate(optima['label'])
+                    if lab == label]
+            self.assertEqual(sum(optima['count'][i] for i in rows), 6)
+            self.assertAlmostEqual(optima['chisqr'][rows[0]], 0.0, places=6)
+
+    def test_task_tac_fit_bootstrap(self):
+        f = open(
+            os.path.join('test', 'xml_input', 'test_tac_fit_bootstrap.xml'))
+        tree = xmltodict.parse(f.read(), xml_attribs=True)
+        task = tree['colibri']['task']
+
+        no = self.no
+        rng = np.random.default_rng(0)
+        for label in ['1', '2']:
+            no['tac'][label] = list(np.array(no['tac'][label]) +
+                                    rng.normal(0.0, 1.0, 30))
+        colibri.tasks.task_tac_fit(task, no)
+        fits = no['fits']
+        samples = no['samples']
+
+        self.assertEqual(samples['label'].tolist(), ['1'] * 20 + ['2'] * 20)
+        self.assertEqual(len(samples['amp']), 40)
+        for i in range(2):
+            for name in ['amp', 'extent']:
+                self.assertLess(fits[name + '_lower'][i], fits[name][i])
+                self.assertGreater(fits[name + '_upper'][i], fits[name][i])
+
+    def test_task_tac_fit_plot_file(self):
+        f = open(
+            os.path.join('test', 'xml_input', 'test_tac_fit_plot_file.xml'))
+        tree = xmltodict.parse(f.read(), xml_attribs=True,
+                               force_list='task')
+        no = self.no
+        for task in tree['colibri']['task']:
+            colibri.tasks.task_tac_fit(task, no)
+        colibri.wait_for_figures()
+
+        self.assertTrue(os.path.exists(
+            os.path.join('test', 'tac_fit_plot.png')))
+        self.assertAlmostEqual(no['fits']['amp'][0], 0.3, places=5)
+        self.assertAlmostEqual(no['fits2']['extent'][0], 10.0, places=4)
+        # No figures are left open
+        self.assertEqual(plt.get_fignums(), [])
+
+    def tearDown(self):
+        if os.path.exists(os.path.join('test', 'tac_fit_plot.png')):
+            os.remove(os.path.join('test', 'tac_fit_plot.png'))